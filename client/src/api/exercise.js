@@ -49,7 +49,46 @@ export const fetchExerciseProgress = async (exerciseId) => {
   return response.data;
 };
 
-export const fetchPersonalRecords = async () => {
-  const response = await api.get('/progress/personal-records');
+// One entry per exercise and record type (and load, for "reps"):
+// { exercise_id, record_type, weight, value, progress_id, achieved_at }.
+// record_type is one of weight, estimated_1rm, volume, reps, distance, duration.
+export const fetchPersonalRecords = async ({ exerciseId, recordType } = {}) => {
+  const params = new URLSearchParams();
+  if (exerciseId) params.append('exercise_id', exerciseId);
+  if (recordType) params.append('record_type', recordType);
+
+  const response = await api.get(`/progress/personal-records?${params.toString()}`);
+  return response.data;
+};
+
+export const fetchPersonalRecordBoard = async (exerciseId, { recordType, weight, limit } = {}) => {
+  const params = new URLSearchParams({ exercise_id: exerciseId });
+  if (recordType) params.append('record_type', recordType);
+  if (weight) params.append('weight', weight);
+  if (limit) params.append('limit', limit);
+
+  const response = await api.get(`/progress/personal-records/board?${params.toString()}`);
   return response.data;
-};
\ No newline at end of file
+};
+
+export const importExercises = async (file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await api.post('/exercises/import', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+  return response.data;
+};
+
+export const fetchExerciseProgressSeries = async (exerciseId, { bucket, points, metric } = {}) => {
+  const params = new URLSearchParams();
+  if (bucket) params.append('bucket', bucket);
+  if (points) params.append('points', points);
+  if (metric) params.append('metric', metric);
+
+  const response = await api.get(`/progress/${exerciseId}/series?${params.toString()}`);
+  return response.data;
+};
@@ -19,6 +19,12 @@ interface Post {
   achievement_id?: number;
 }
 
+interface FeedPage {
+  posts: Post[];
+  nextCursor: string | null;
+  prevCursor: string | null;
+}
+
 interface Comment {
   id: number;
   content: string;
@@ -41,7 +47,27 @@ interface Challenge {
   current_progress?: number;
 }
 
+export type LiveEvent =
+  | { type: 'ready'; channels: number }
+  | { type: 'resync' }
+  | { type: 'post.created'; post_id: number; user_id: number }
+  | { type: 'post.liked'; post_id: number; user_id: number; delta: number }
+  | { type: 'post.commented'; post_id: number; comment_id: number; user_id: number; delta: number }
+  | { type: 'leaderboard.updated'; challenge_id: number; user_id: number; total: number; rank: number | null };
+
+const LIVE_URL = 'ws://localhost:8000/api/live';
+
 export const socialApi = {
+  // Live updates: new posts and like/comment deltas from followed users and
+  // leaderboard changes in joined challenges. Returns a function that closes
+  // the socket. On `resync` the client fell behind and should refetch.
+  subscribeLive: (onEvent: (event: LiveEvent) => void): (() => void) => {
+    const token = localStorage.getItem('token');
+    const socket = new WebSocket(`${LIVE_URL}?token=${encodeURIComponent(token ?? '')}`);
+    socket.onmessage = message => onEvent(JSON.parse(message.data) as LiveEvent);
+    return () => socket.close();
+  },
+
   // Friend system
   getFriends: async (): Promise<User[]> => {
     const response = await axios.get<ApiResponse<User[]>>('/social/friends');
@@ -54,9 +80,18 @@ export const socialApi = {
   },
 
   // Posts and comments
-  getFeed: async (skip = 0, limit = 20): Promise<Post[]> => {
-    const response = await axios.get<ApiResponse<Post[]>>(`/social/feed?skip=${skip}&limit=${limit}`);
-    return response.data.data;
+  // Pass nextCursor as `before` for older posts, prevCursor as `after` for newer ones
+  getFeed: async (
+    { before, after, limit = 20 }: { before?: string; after?: string; limit?: number } = {}
+  ): Promise<FeedPage> => {
+    const response = await axios.get<Post[]>('/social/feed', {
+      params: { before, after, limit },
+    });
+    return {
+      posts: response.data,
+      nextCursor: response.headers['x-next-cursor'] ?? null,
+      prevCursor: response.headers['x-prev-cursor'] ?? null,
+    };
   },
 
   createPost: async (data: { content: string; workout_id?: number; achievement_id?: number }): Promise<Post> => {
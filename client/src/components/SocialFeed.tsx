@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import {
   Box,
   Paper,
@@ -27,7 +27,8 @@ import {
   Share as ShareIcon,
 } from '@mui/icons-material';
 import { useNotification } from '../context/NotificationContext';
-import { socialApi } from '../api/social';
+import { useAuth } from '../context/AuthContext';
+import { socialApi, LiveEvent } from '../api/social';
 
 interface Post {
   id: number;
@@ -57,6 +58,7 @@ interface Comment {
 
 export const SocialFeed: React.FC = () => {
   const { showNotification } = useNotification();
+  const { user } = useAuth();
   const [posts, setPosts] = useState<Post[]>([]);
   const [loading, setLoading] = useState(true);
   const [newPost, setNewPost] = useState('');
@@ -64,6 +66,11 @@ export const SocialFeed: React.FC = () => {
   const [comments, setComments] = useState<Comment[]>([]);
   const [newComment, setNewComment] = useState('');
   const [commentsLoading, setCommentsLoading] = useState(false);
+  // Feed cursors: older posts come from nextCursor, newer ones from prevCursor
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [prevCursor, setPrevCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinelRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
     fetchPosts();
@@ -71,8 +78,10 @@ export const SocialFeed: React.FC = () => {
 
   const fetchPosts = async () => {
     try {
-      const data = await socialApi.getFeed();
-      setPosts(data);
+      const page = await socialApi.getFeed();
+      setPosts(page.posts);
+      setNextCursor(page.nextCursor);
+      setPrevCursor(page.prevCursor);
     } catch (error) {
       console.error('Error fetching posts:', error);
       showNotification('Failed to load posts', 'error');
@@ -81,13 +90,81 @@ export const SocialFeed: React.FC = () => {
     }
   };
 
+  const fetchOlderPosts = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await socialApi.getFeed({ before: nextCursor });
+      setPosts(current => [...current, ...page.posts]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching posts:', error);
+      showNotification('Failed to load posts', 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursor, loadingMore]);
+
+  const fetchNewerPosts = async () => {
+    if (!prevCursor) {
+      fetchPosts();
+      return;
+    }
+    try {
+      const page = await socialApi.getFeed({ after: prevCursor, limit: 100 });
+      setPosts(current => [...page.posts, ...current]);
+      setPrevCursor(page.prevCursor);
+    } catch (error) {
+      console.error('Error fetching posts:', error);
+    }
+  };
+
+  // Live updates replace polling: new posts are fetched from prevCursor,
+  // other people's likes and comments adjust the counts in place
+  const handleLiveEvent = useRef<(event: LiveEvent) => void>(() => {});
+  handleLiveEvent.current = (event: LiveEvent) => {
+    switch (event.type) {
+      case 'post.created':
+        // Our own posts are fetched by handlePostSubmit
+        if (event.user_id !== user?.id) fetchNewerPosts();
+        break;
+      case 'resync':
+        fetchPosts();
+        break;
+      case 'post.liked':
+      case 'post.commented': {
+        if (event.user_id === user?.id) break;
+        const field = event.type === 'post.liked' ? 'likes_count' : 'comments_count';
+        setPosts(current => current.map(post =>
+          post.id === event.post_id ? { ...post, [field]: post[field] + event.delta } : post
+        ));
+        break;
+      }
+    }
+  };
+
+  useEffect(() => socialApi.subscribeLive(event => handleLiveEvent.current(event)), []);
+
+  // Infinite scroll: load the next page when the end of the list comes into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) {
+        fetchOlderPosts();
+      }
+    });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [fetchOlderPosts]);
+
   const handlePostSubmit = async (event: React.FormEvent) => {
     event.preventDefault();
     try {
       await socialApi.createPost({ content: newPost });
       showNotification('Post created successfully', 'success');
       setNewPost('');
-      fetchPosts();
+      fetchNewerPosts();
     } catch (error) {
       console.error('Error creating post:', error);
       showNotification('Failed to create post', 'error');
@@ -217,6 +294,13 @@ export const SocialFeed: React.FC = () => {
         </Card>
       ))}
 
+      <div ref={sentinelRef} />
+      {loadingMore && (
+        <Box display="flex" justifyContent="center" my={2}>
+          <CircularProgress size={24} />
+        </Box>
+      )}
+
       <Dialog
         open={!!selectedPost}
         onClose={() => setSelectedPost(null)}
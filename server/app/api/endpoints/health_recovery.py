@@ -1,8 +1,9 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from ...database.database import get_db
+from ...database.database import get_async_db, get_async_read_db
 from ...utils.auth import get_current_user
 from ...schemas.health_recovery import (
     SleepDataCreate,
@@ -25,8 +26,7 @@ from ...models.health_recovery import (
     HealthDevice as HealthDeviceModel
 )
 from ...core.health_integration import HealthDeviceManager
-from ...utils.statistics import get_sleep_statistics, get_recovery_statistics, get_health_statistics
-from sqlalchemy import func
+from ...utils import statistics
 
 router = APIRouter()
 health_device_manager = HealthDeviceManager()
@@ -36,13 +36,13 @@ health_device_manager = HealthDeviceManager()
 async def create_sleep_data(
     sleep_data: SleepDataCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record sleep data for a user"""
     db_sleep = SleepDataModel(**sleep_data.dict(), user_id=current_user.id)
     db.add(db_sleep)
-    db.commit()
-    db.refresh(db_sleep)
+    await db.commit()
+    await db.refresh(db_sleep)
     return db_sleep
 
 @router.get("/sleep", response_model=List[SleepData])
@@ -50,27 +50,28 @@ async def get_sleep_data(
     start_date: datetime = None,
     end_date: datetime = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get sleep data for a user within a date range"""
-    query = db.query(SleepDataModel).filter(SleepDataModel.user_id == current_user.id)
+    query = select(SleepDataModel).where(SleepDataModel.user_id == current_user.id)
     if start_date:
-        query = query.filter(SleepDataModel.date >= start_date)
+        query = query.where(SleepDataModel.date >= start_date)
     if end_date:
-        query = query.filter(SleepDataModel.date <= end_date)
-    return query.order_by(SleepDataModel.date.desc()).all()
+        query = query.where(SleepDataModel.date <= end_date)
+    result = await db.scalars(query.order_by(SleepDataModel.date.desc()))
+    return result.all()
 
 @router.get("/sleep/statistics", response_model=SleepStatistics)
 async def get_sleep_statistics(
     days: int = Query(30, ge=1, le=365),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get sleep statistics for a user"""
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    return get_sleep_statistics(
-        current_user.id, start_date, end_date, db
+    return await db.run_sync(
+        lambda session: statistics.get_sleep_statistics(current_user.id, start_date, end_date, session)
     )
 
 # Recovery metrics endpoints
@@ -78,13 +79,13 @@ async def get_sleep_statistics(
 async def create_recovery_metrics(
     metrics: RecoveryMetricsCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record recovery metrics for a user"""
     db_metrics = RecoveryMetricsModel(**metrics.dict(), user_id=current_user.id)
     db.add(db_metrics)
-    db.commit()
-    db.refresh(db_metrics)
+    await db.commit()
+    await db.refresh(db_metrics)
     return db_metrics
 
 @router.get("/recovery", response_model=List[RecoveryMetrics])
@@ -92,29 +93,28 @@ async def get_recovery_metrics(
     start_date: datetime = None,
     end_date: datetime = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get recovery metrics for a user within a date range"""
-    query = db.query(RecoveryMetricsModel).filter(
-        RecoveryMetricsModel.user_id == current_user.id
-    )
+    query = select(RecoveryMetricsModel).where(RecoveryMetricsModel.user_id == current_user.id)
     if start_date:
-        query = query.filter(RecoveryMetricsModel.date >= start_date)
+        query = query.where(RecoveryMetricsModel.date >= start_date)
     if end_date:
-        query = query.filter(RecoveryMetricsModel.date <= end_date)
-    return query.order_by(RecoveryMetricsModel.date.desc()).all()
+        query = query.where(RecoveryMetricsModel.date <= end_date)
+    result = await db.scalars(query.order_by(RecoveryMetricsModel.date.desc()))
+    return result.all()
 
 @router.get("/recovery/statistics", response_model=RecoveryStatistics)
 async def get_recovery_statistics(
     days: int = Query(30, ge=1, le=365),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get recovery statistics for a user"""
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    return get_recovery_statistics(
-        current_user.id, start_date, end_date, db
+    return await db.run_sync(
+        lambda session: statistics.get_recovery_statistics(current_user.id, start_date, end_date, session)
     )
 
 # Health metrics endpoints
@@ -122,13 +122,13 @@ async def get_recovery_statistics(
 async def create_health_metrics(
     metrics: HealthMetricsCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record health metrics for a user"""
     db_metrics = HealthMetricsModel(**metrics.dict(), user_id=current_user.id)
     db.add(db_metrics)
-    db.commit()
-    db.refresh(db_metrics)
+    await db.commit()
+    await db.refresh(db_metrics)
     return db_metrics
 
 @router.get("/health", response_model=List[HealthMetrics])
@@ -136,29 +136,28 @@ async def get_health_metrics(
     start_date: datetime = None,
     end_date: datetime = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get health metrics for a user within a date range"""
-    query = db.query(HealthMetricsModel).filter(
-        HealthMetricsModel.user_id == current_user.id
-    )
+    query = select(HealthMetricsModel).where(HealthMetricsModel.user_id == current_user.id)
     if start_date:
-        query = query.filter(HealthMetricsModel.date >= start_date)
+        query = query.where(HealthMetricsModel.date >= start_date)
     if end_date:
-        query = query.filter(HealthMetricsModel.date <= end_date)
-    return query.order_by(HealthMetricsModel.date.desc()).all()
+        query = query.where(HealthMetricsModel.date <= end_date)
+    result = await db.scalars(query.order_by(HealthMetricsModel.date.desc()))
+    return result.all()
 
 @router.get("/health/statistics", response_model=HealthStatistics)
 async def get_health_statistics(
     days: int = Query(30, ge=1, le=365),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get health statistics for a user"""
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    return get_health_statistics(
-        current_user.id, start_date, end_date, db
+    return await db.run_sync(
+        lambda session: statistics.get_health_statistics(current_user.id, start_date, end_date, session)
     )
 
 # Health device endpoints
@@ -166,15 +165,17 @@ async def get_health_statistics(
 async def connect_health_device(
     device: HealthDeviceCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Connect a new health device for a user"""
     # Check if device already exists
-    existing_device = db.query(HealthDeviceModel).filter(
-        HealthDeviceModel.user_id == current_user.id,
-        HealthDeviceModel.device_type == device.device_type,
-        HealthDeviceModel.device_id == device.device_id
-    ).first()
+    existing_device = await db.scalar(
+        select(HealthDeviceModel).where(
+            HealthDeviceModel.user_id == current_user.id,
+            HealthDeviceModel.device_type == device.device_type,
+            HealthDeviceModel.device_id == device.device_id
+        )
+    )
     
     if existing_device:
         raise HTTPException(
@@ -198,32 +199,37 @@ async def connect_health_device(
         token_expires=device_data.get('token_expires')
     )
     db.add(db_device)
-    db.commit()
-    db.refresh(db_device)
+    await db.commit()
+    await db.refresh(db_device)
     return db_device
 
 @router.get("/devices", response_model=List[HealthDevice])
 async def get_connected_devices(
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all connected health devices for a user"""
-    return db.query(HealthDeviceModel).filter(
-        HealthDeviceModel.user_id == current_user.id
-    ).all()
+    result = await db.scalars(
+        select(HealthDeviceModel).where(
+            HealthDeviceModel.user_id == current_user.id
+        )
+    )
+    return result.all()
 
 @router.put("/devices/{device_id}", response_model=HealthDevice)
 async def update_health_device(
     device_id: int,
     device_update: HealthDeviceUpdate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update health device settings"""
-    device = db.query(HealthDeviceModel).filter(
-        HealthDeviceModel.id == device_id,
-        HealthDeviceModel.user_id == current_user.id
-    ).first()
+    device = await db.scalar(
+        select(HealthDeviceModel).where(
+            HealthDeviceModel.id == device_id,
+            HealthDeviceModel.user_id == current_user.id
+        )
+    )
     
     if not device:
         raise HTTPException(
@@ -234,21 +240,23 @@ async def update_health_device(
     for key, value in device_update.dict(exclude_unset=True).items():
         setattr(device, key, value)
     
-    db.commit()
-    db.refresh(device)
+    await db.commit()
+    await db.refresh(device)
     return device
 
 @router.delete("/devices/{device_id}")
 async def disconnect_health_device(
     device_id: int,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Disconnect a health device"""
-    device = db.query(HealthDeviceModel).filter(
-        HealthDeviceModel.id == device_id,
-        HealthDeviceModel.user_id == current_user.id
-    ).first()
+    device = await db.scalar(
+        select(HealthDeviceModel).where(
+            HealthDeviceModel.id == device_id,
+            HealthDeviceModel.user_id == current_user.id
+        )
+    )
     
     if not device:
         raise HTTPException(
@@ -263,6 +271,6 @@ async def disconnect_health_device(
         current_user.id
     )
     
-    db.delete(device)
-    db.commit()
+    await db.delete(device)
+    await db.commit()
     return {"message": "Device disconnected successfully"}
\ No newline at end of file
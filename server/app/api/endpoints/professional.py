@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.core.database import get_db
+from app.database.database import get_db
 from app.core.professional_auth import get_current_professional
 from app.schemas.professional import (
     ProfessionalCreate, ProfessionalUpdate, ProfessionalResponse,
@@ -19,6 +19,7 @@ from app.crud import (
     specialization as specialization_crud,
     certification as certification_crud
 )
+from app.crud.base import NEXT_CURSOR_HEADER
 from app.models.professional import Professional
 
 router = APIRouter(prefix="/professional", tags=["professional"])
@@ -60,14 +61,29 @@ async def create_specialization(
     """Create a new specialization."""
     return specialization_crud.create_specialization(db, specialization)
 
+@router.post("/specialization/bulk", response_model=List[SpecializationResponse])
+async def import_specializations(
+    specializations: List[SpecializationCreate],
+    db: Session = Depends(get_db),
+    current_professional = Depends(get_current_professional)
+):
+    """Create or update many specializations at once, matched by name."""
+    return specialization_crud.import_specializations(db, specializations)
+
 @router.get("/specialization", response_model=List[SpecializationResponse])
 async def list_specializations(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    """List all specializations."""
-    return specialization_crud.get_specializations(db, skip=skip, limit=limit)
+    """List all specializations. The next page's cursor is in X-Next-Cursor."""
+    specializations, next_cursor = specialization_crud.get_specializations_keyset(
+        db, cursor=cursor, limit=limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return specializations
 
 @router.put("/specialization/{specialization_id}", response_model=SpecializationResponse)
 async def update_specialization(
@@ -79,6 +95,16 @@ async def update_specialization(
     """Update a specialization."""
     return specialization_crud.update_specialization(db, specialization_id, specialization)
 
+# Certifications
+@router.post("/certification/bulk", response_model=List[CertificationResponse])
+async def import_certifications(
+    certifications: List[CertificationCreate],
+    db: Session = Depends(get_db),
+    current_professional = Depends(get_current_professional)
+):
+    """Create or update many certifications at once, matched by name."""
+    return certification_crud.import_certifications(db, certifications)
+
 # Professional Services
 @router.post("/service", response_model=ProfessionalServiceResponse)
 async def create_service(
@@ -198,18 +224,25 @@ async def update_client_note(
 # Search and Discovery
 @router.get("/search", response_model=List[ProfessionalResponse])
 async def search_professionals(
+    response: Response,
     search_params: ProfessionalSearchParams = Depends(),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    """Search for professionals based on various criteria."""
-    return professional_crud.search_professionals(
+    """Search for professionals based on various criteria.
+
+    The next page's cursor is in X-Next-Cursor.
+    """
+    professionals, next_cursor = professional_crud.search_professionals_keyset(
         db,
         search_params,
-        skip=skip,
+        cursor=cursor,
         limit=limit
     )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return professionals
 
 @router.get("/stats", response_model=ProfessionalStats)
 async def get_professional_stats(
@@ -1,13 +1,4 @@
 import os
-try:
-    import cv2
-    import numpy as np
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-    cv2 = None
-    np = None
-
 from typing import List, Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
@@ -22,11 +13,10 @@ from ...schemas.smart_features import (
     FormFeedbackItem
 )
 from ...models.smart_features import FormCheck, WorkoutRecommendation as WorkoutRecommendationModel
-from ...core.ai_model import AIModel
+from ...core.ai_model import get_ai_model
 from ...utils.storage import save_video, get_video_url
 
 router = APIRouter()
-ai_model = AIModel()
 
 @router.post("/form-check/upload", response_model=FormCheckResult)
 async def upload_form_check_video(
@@ -106,7 +96,7 @@ async def process_form_check(check_id: str, db: Session):
         video_path = await get_video_url(form_check.video_url)
         
         # Process video with AI model
-        results = ai_model.analyze_form(video_path)
+        results = get_ai_model().analyze_form(video_path)
         
         # Update form check with results
         form_check.status = FormCheckStatus.COMPLETED
@@ -160,10 +150,10 @@ async def get_workout_recommendations(
 ):
     """Get personalized workout recommendations"""
     # Get user's workout history and preferences
-    user_data = ai_model.get_user_data(current_user.id)
+    user_data = get_ai_model().get_user_data(current_user.id)
     
     # Generate recommendations based on user data and filters
-    recommendations = ai_model.generate_recommendations(user_data, filters)
+    recommendations = get_ai_model().generate_recommendations(user_data, filters)
     
     # Save recommendations to database
     db_recommendations = []
@@ -207,7 +197,7 @@ async def update_recommendation_feedback(
     db.commit()
     
     # Update AI model with feedback
-    ai_model.update_from_feedback(recommendation_id, feedback)
+    get_ai_model().update_from_feedback(recommendation_id, feedback)
     
     return {"status": "success"}
 
@@ -227,7 +217,7 @@ async def generate_new_recommendation(
         raise HTTPException(status_code=404, detail="Recommendation not found")
     
     # Generate alternative recommendation
-    alternative = ai_model.generate_alternative(original)
+    alternative = get_ai_model().generate_alternative(original)
     
     # Save new recommendation
     db_rec = WorkoutRecommendationModel(
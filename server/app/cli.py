@@ -0,0 +1,176 @@
+"""Management commands
+
+Usage (from the server directory):
+    python -m app.cli init-db
+    python -m app.cli startup-report [--top 25] [--module app.main]
+    python -m app.cli rebuild-timelines
+    python -m app.cli reconcile-counters
+    python -m app.cli rebuild-leaderboards
+    python -m app.cli backfill-personal-records
+    python -m app.cli rebuild-substitutes
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+def init_db(args: argparse.Namespace):
+    """Create any missing tables and upgrade existing ones. Run once per
+    deploy instead of on every worker start."""
+    from app.database.database import Base, engine
+    from app.database.upgrades import upgrade_schema
+    import app.models  # noqa: F401 - registers every model on Base.metadata
+
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    for name in upgrade_schema(engine):
+        print(f"Applied upgrade {name}")
+    print(f"Schema is up to date ({time.perf_counter() - started:.2f}s)")
+
+def rebuild_timelines(args: argparse.Namespace):
+    """Recompute every user's feed timeline from posts and friendships."""
+    from app.database.database import SessionLocal
+    from app.services.timeline import rebuild_timelines as rebuild
+    import app.models  # noqa: F401
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        entries = rebuild(db)
+    finally:
+        db.close()
+    print(f"Wrote {entries} timeline entries ({time.perf_counter() - started:.2f}s)")
+
+def reconcile_counters(args: argparse.Namespace):
+    """Recount post like/comment counters from the likes and comments tables."""
+    from app.database.database import SessionLocal
+    from app.services.counters import reconcile_post_counters
+    import app.models  # noqa: F401
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile_post_counters(db)
+    finally:
+        db.close()
+    print(f"Corrected counters on {fixed} posts")
+
+def rebuild_leaderboards(args: argparse.Namespace):
+    """Recompute challenge leaderboard totals from the activity log."""
+    from app.database.database import SessionLocal
+    from app.services.leaderboard import rebuild_leaderboards as rebuild
+    import app.models  # noqa: F401
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"Wrote {rows} leaderboard totals ({time.perf_counter() - started:.2f}s)")
+
+def backfill_personal_records(args: argparse.Namespace):
+    """Recompute the personal records ledger from all logged exercise progress."""
+    from app.database.database import SessionLocal
+    from app.services.personal_records import rebuild_personal_records
+    import app.models  # noqa: F401
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        records = rebuild_personal_records(db)
+    finally:
+        db.close()
+    print(f"Wrote {records} personal records ({time.perf_counter() - started:.2f}s)")
+
+def rebuild_substitutes(args: argparse.Namespace):
+    """Recompute every exercise's precomputed substitutes."""
+    from app.database.database import SessionLocal
+    from app.services.substitutes import rebuild_substitutes as rebuild
+    import app.models  # noqa: F401
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"Wrote {rows} exercise substitutes ({time.perf_counter() - started:.2f}s)")
+
+def _parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """Parse `python -X importtime` lines into (module, self_us, cumulative_us)."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def startup_report(args: argparse.Namespace):
+    """Show where the time goes when a worker imports the application."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+
+    rows = _parse_importtime(result.stderr)
+    total_us = sum(self_us for _, self_us, _ in rows)
+
+    by_package: Dict[str, int] = defaultdict(int)
+    for module, self_us, _ in rows:
+        by_package[module.split(".")[0]] += self_us
+
+    print(f"import {args.module}: {total_us / 1e6:.3f}s in {len(rows)} modules "
+          f"({wall:.3f}s including interpreter start)\n")
+
+    print(f"{'package':<40}{'self (ms)':>12}{'share':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<40}{self_us / 1000:>12.1f}{self_us / total_us:>8.1%}")
+
+    print(f"\n{'module':<60}{'cumulative (ms)':>16}{'self (ms)':>12}")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{module:<60}{cumulative_us / 1000:>16.1f}{self_us / 1000:>12.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help="create missing tables and upgrade existing ones").set_defaults(func=init_db)
+
+    commands.add_parser(
+        "rebuild-timelines", help="recompute social feed timelines"
+    ).set_defaults(func=rebuild_timelines)
+
+    commands.add_parser(
+        "reconcile-counters", help="recount post likes and comments"
+    ).set_defaults(func=reconcile_counters)
+
+    commands.add_parser(
+        "rebuild-leaderboards", help="recompute challenge leaderboard totals"
+    ).set_defaults(func=rebuild_leaderboards)
+    commands.add_parser(
+        "backfill-personal-records", help="recompute personal records from exercise progress"
+    ).set_defaults(func=backfill_personal_records)
+    commands.add_parser(
+        "rebuild-substitutes", help="recompute exercise substitutes"
+    ).set_defaults(func=rebuild_substitutes)
+
+    report = commands.add_parser("startup-report", help="break down application import time")
+    report.add_argument("--module", default="app.main", help="module to import")
+    report.add_argument("--top", type=int, default=25, help="rows to show per table")
+    report.set_defaults(func=startup_report)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,56 @@
+import importlib.util
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
-try:
-    import torch
-    import cv2
-    import numpy as np
-    from transformers import AutoModel, AutoFeatureExtractor
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
-    torch = None
-    cv2 = None
-    np = None
-    AutoModel = None
-    AutoFeatureExtractor = None
+
+from app.core.model_registry import model_registry
+
+# torch/transformers take seconds to import, so only probe for them here and
+# import them when a model is actually loaded.
+ML_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None
+    for module in ("torch", "cv2", "numpy", "transformers")
+)
+
+FORM_CHECK_CHECKPOINT = "google/vit-base-patch16-224"
+POSE_MODEL = "form_check.pose_model"
+FEATURE_EXTRACTOR = "form_check.feature_extractor"
+FORM_CHECK_MODELS = (POSE_MODEL, FEATURE_EXTRACTOR)
+
+def _load_pose_model():
+    """Load the pose estimation model"""
+    from transformers import AutoModel
+    # For demonstration, using a placeholder. In production, use a real pose estimation model
+    model = AutoModel.from_pretrained(FORM_CHECK_CHECKPOINT)
+    model.eval()
+    return model
+
+def _load_feature_extractor():
+    """Load the image preprocessor (config only, no weights)"""
+    from transformers import AutoFeatureExtractor
+    return AutoFeatureExtractor.from_pretrained(FORM_CHECK_CHECKPOINT)
+
+if ML_AVAILABLE:
+    model_registry.register(POSE_MODEL, _load_pose_model)
+    model_registry.register(FEATURE_EXTRACTOR, _load_feature_extractor)
+
+def preload_models(pin: bool = True):
+    """Load the form-check models now; see ModelRegistry.preload."""
+    if ML_AVAILABLE:
+        model_registry.preload(FORM_CHECK_MODELS, pin=pin)
 
 class AIModel:
     def __init__(self):
-        if not ML_AVAILABLE:
-            self.pose_model = None
-            self.recommendation_model = None
-            self.feature_extractor = None
-            return
-        # Initialize models and processors
-        self.pose_model = self._load_pose_model()
+        # Weights live in the model registry and load on first use
         self.recommendation_model = self._load_recommendation_model()
-        self.feature_extractor = AutoFeatureExtractor.from_pretrained("google/vit-base-patch16-224")
-        
-    def _load_pose_model(self):
-        """Load the pose estimation model"""
-        # For demonstration, using a placeholder. In production, use a real pose estimation model
-        return AutoModel.from_pretrained("google/vit-base-patch16-224")
-    
+
+    @property
+    def pose_model(self):
+        return model_registry.get(POSE_MODEL) if ML_AVAILABLE else None
+
+    @property
+    def feature_extractor(self):
+        return model_registry.get(FEATURE_EXTRACTOR) if ML_AVAILABLE else None
+
     def _load_recommendation_model(self):
         """Load the recommendation model"""
         # For demonstration, using a placeholder. In production, use a real recommendation model
@@ -56,6 +77,8 @@ class AIModel:
                 ]
             }
         
+        import cv2
+
         # Read video
         cap = cv2.VideoCapture(video_path)
         frames = []
@@ -215,4 +238,9 @@ class AIModel:
         alternative['name'] = f"Alternative {alternative['name']}"
         alternative['description'] = f"A different approach to {original_recommendation['description'].lower()}"
         
-        return alternative
\ No newline at end of file
+        return alternative
+
+@lru_cache(maxsize=None)
+def get_ai_model() -> AIModel:
+    """Shared AIModel, built on first use instead of at import time."""
+    return AIModel()
@@ -1,15 +1,97 @@
 """Application configuration settings"""
 
+from typing import Optional
 from pydantic import BaseModel
 
 class Settings(BaseModel):
     # Database
     database_url: str = "sqlite:///./test.db"
+    # Optional read replica for read-only endpoints; falls back to database_url
+    database_replica_url: Optional[str] = None
+    # After a write, the client reads from the primary for this many seconds
+    replica_read_after_write_seconds: int = 5
+
+    # Database connection pool (per engine, per worker process)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: Optional[int] = None  # Postgres only
+
+    # Per-request SQL statistics; always aggregated per route for
+    # /api/internal/db/queries, optionally sent as X-DB-* headers and logged
+    db_query_debug_headers: bool = False
+    db_query_log: bool = False
+
+    # Startup: "full" creates missing tables and loads ML models when the app
+    # starts; "fast" does neither (run `python -m app.cli init-db` to manage the
+    # schema, models load on first use). Importing the app never does either.
+    startup_mode: str = "full"
+
+    # ML models not used for this many seconds are unloaded (0 keeps them).
+    # Models preloaded in the gunicorn master are shared and never unloaded.
+    ml_model_idle_ttl_seconds: int = 1800
+
+    # Social feed: posts are copied into each follower's timeline when
+    # written, except for authors with more followers than this, whose posts
+    # are merged in when the feed is read
+    feed_fanout_max_followers: int = 5000
+    # Recent posts copied into a timeline when a new friend is added
+    feed_backfill_posts: int = 100
+
+    # Post like/comment counters: 0 writes each increment immediately
+    # (atomically); otherwise increments are batched and flushed this often
+    post_counter_flush_seconds: float = 0
+    # `reconcile-counters` skips posts liked/commented on more recently than
+    # this, as their increments may still be buffered in a worker; keep it
+    # well above post_counter_flush_seconds
+    post_counter_reconcile_settle_seconds: int = 300
+
+    # Exercise catalog snapshot lifetime per worker; local writes rebuild it at once
+    catalog_cache_seconds: int = 300
+
+    # Most activities accepted by one POST /challenges/activity/batch
+    challenge_activity_batch_max: int = 5000
+
+    # Rows validated and committed together by POST /exercises/import
+    exercise_import_chunk_size: int = 500
+
+    # Alternatives precomputed per exercise for GET /exercises/{id}/substitutes
+    exercise_substitutes_per_exercise: int = 20
+    # Exercises a new one is compared with when fitted in (a rebuild compares all)
+    exercise_substitutes_related_max: int = 5000
+    # New exercises are fitted in together after this delay; 0 fits each at once
+    exercise_substitutes_refresh_delay_seconds: float = 1.0
+
+    # Friend-id sets cached per worker, and friends-of-friends suggestions
+    friend_graph_cache_size: int = 10000
+    friend_graph_cache_seconds: int = 60
+    friend_suggestions_cache_seconds: int = 300
+
+    # Live updates: "memory" for a single process, or "package.module:Class"
+    # for a Broker that relays between workers
+    realtime_broker: str = "memory"
+    # Events buffered per connection before a slow client is told to resync
+    realtime_queue_size: int = 100
+    realtime_max_connections: int = 10000
 
     # Security
     secret_key: str = "test-secret-key"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Authenticated users are cached per worker by token subject (0 disables)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+
+    # Password hashing. Stored hashes with a different bcrypt cost are
+    # re-hashed at the next successful login, so this can be changed freely.
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 2  # hashes running at once, per worker process
+    password_hash_max_pending: int = 64  # further requests get a 503
+
+    # Token required by the /api/internal endpoints; they are disabled when unset
+    internal_api_token: Optional[str] = None
 
     # Health API keys (mock for testing)
     fitbit_client_id: str = "mock"
@@ -0,0 +1,93 @@
+"""Process-wide registry for heavy ML models
+
+Each registered model is loaded once per process, on first use. Models can be
+preloaded in a pre-fork master (gunicorn `preload_app`) so worker processes
+share the weights copy-on-write instead of holding one copy each, and models
+that are not pinned are unloaded again after sitting idle.
+"""
+
+import gc
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+class _Entry:
+    __slots__ = ("loader", "model", "loaded_at", "last_used", "pinned", "lock")
+
+    def __init__(self, loader: Callable[[], Any]):
+        self.loader = loader
+        self.model = None
+        self.loaded_at = None
+        self.last_used = None
+        self.pinned = False
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register a zero-argument loader under `name`; nothing is loaded yet."""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(loader)
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it on first use. Concurrent callers share one load."""
+        entry = self._entries[name]
+        # Under the lock, so unload_idle can't drop the model between the
+        # check and the return
+        with entry.lock:
+            if entry.model is None:
+                entry.model = entry.loader()
+                entry.loaded_at = time.time()
+            entry.last_used = time.monotonic()
+            return entry.model
+
+    def preload(self, names: Iterable[str], pin: bool = True):
+        """Load models ahead of time.
+
+        Call this in the master process before workers fork with `pin=True`:
+        pinned models are never unloaded, because dropping a shared copy in one
+        worker would only make that worker reload a private one. The GC is
+        frozen afterwards so collections in the workers don't write to (and
+        un-share) the pages holding the preloaded objects.
+        """
+        for name in names:
+            self.get(name)
+            self._entries[name].pinned = self._entries[name].pinned or pin
+        if pin:
+            gc.collect()
+            if hasattr(gc, "freeze"):
+                gc.freeze()
+
+    def unload_idle(self, ttl_seconds: float) -> List[str]:
+        """Drop unpinned models unused for `ttl_seconds`; returns their names."""
+        now = time.monotonic()
+        unloaded = []
+        for name, entry in list(self._entries.items()):
+            if entry.model is None or entry.pinned:
+                continue
+            with entry.lock:
+                if entry.model is not None and now - entry.last_used >= ttl_seconds:
+                    entry.model = None
+                    entry.loaded_at = None
+                    unloaded.append(name)
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "pinned": entry.pinned,
+                "loaded_at": entry.loaded_at,
+                "idle_seconds": round(now - entry.last_used, 1) if entry.last_used else None,
+            }
+            for name, entry in self._entries.items()
+        }
+
+model_registry = ModelRegistry()
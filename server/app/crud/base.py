@@ -1,15 +1,47 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import and_, or_, tuple_, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 
-from app.core.database import Base
+from app.database.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Response headers carrying the cursors of the neighbouring pages
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for the sort key of the last row on a page."""
+    raw = json.dumps(jsonable_encoder(list(values)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """Inverse of encode_cursor, coercing values back to the columns' types."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if value is not None and python_type in (datetime, date):
+                value = python_type.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -30,6 +62,59 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Get multiple records."""
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def paginate(
+        self,
+        query: Query,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Sequence[str] = ("id",),
+        descending: bool = False
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Keyset-paginate `query` on the `order_by` columns.
+
+        Instead of OFFSET, each page continues after the sort key of the last
+        row of the previous one, so deep pages cost the same as the first and
+        concurrent inserts don't shift rows between pages. The id is appended
+        to the key to make it unique; index the key columns in that order.
+        Returns the page and the cursor for the next one (None on the last).
+        """
+        if "id" not in order_by:
+            order_by = (*order_by, "id")
+        columns = [getattr(self.model, name) for name in order_by]
+
+        if cursor:
+            key = tuple_(*columns)
+            values = tuple_(*decode_cursor(cursor, columns))
+            query = query.filter(key < values if descending else key > values)
+
+        query = query.order_by(*(column.desc() if descending else column for column in columns))
+        rows = query.limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([getattr(rows[-1], name) for name in order_by])
+        return rows, next_cursor
+
+    def get_multi_keyset(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Sequence[str] = ("id",),
+        descending: bool = False
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Get multiple records, one keyset page at a time."""
+        return self.paginate(
+            db.query(self.model),
+            cursor=cursor,
+            limit=limit,
+            order_by=order_by,
+            descending=descending
+        )
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """Create a new record."""
         obj_in_data = jsonable_encoder(obj_in)
@@ -47,19 +132,134 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
         """Update a record."""
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field in self._column_keys().intersection(update_data):
+            setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
+    def _column_keys(self) -> set:
+        return {attr.key for attr in inspect(self.model).column_attrs}
+
+    def _column_values(self, obj_in: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+        data = obj_in if isinstance(obj_in, dict) else obj_in.dict()
+        keys = self._column_keys()
+        return {key: value for key, value in data.items() if key in keys}
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[Row]:
+        """Insert many records with one multi-row INSERT ... RETURNING and one commit.
+
+        Returns the inserted rows (column values, in input order) rather than
+        session-bound ORM objects, so nothing is re-loaded after the commit.
+        """
+        rows = [self._column_values(obj_in) for obj_in in objs_in]
+        if not rows:
+            return []
+        table = self.model.__table__
+        result = db.execute(
+            insert(table).returning(*table.columns, sort_by_parameter_order=True),
+            rows
+        )
+        inserted = result.all()
+        db.commit()
+        return inserted
+
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        index_elements: Sequence[str],
+        update_fields: Optional[Sequence[str]] = None
+    ) -> List[Row]:
+        """Insert many records, updating the ones whose `index_elements` (a
+        unique key) already exist, in one transaction.
+
+        Postgres and SQLite use INSERT ... ON CONFLICT DO UPDATE; other
+        databases look up the existing keys first and split the batch into
+        create_many / update_many. `update_fields` defaults to every supplied
+        column outside the key. Returns the affected rows.
+        """
+        # Last one wins for repeated keys; Postgres rejects a batch that
+        # updates the same row twice
+        deduplicated = {}
+        for obj_in in objs_in:
+            row = self._column_values(obj_in)
+            deduplicated[tuple(row[key] for key in index_elements)] = row
+        rows = list(deduplicated.values())
+        if not rows:
+            return []
+        table = self.model.__table__
+        if update_fields is None:
+            update_fields = [key for key in rows[0] if key not in index_elements]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(table)
+            set_ = {field: stmt.excluded[field] for field in update_fields}
+            if set_:
+                stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            result = db.execute(stmt.returning(*table.columns), rows)
+            upserted = result.all()
+            db.commit()
+            return upserted
+
+        key_columns = [getattr(self.model, key) for key in index_elements]
+        keys = list(deduplicated)
+        existing = {
+            tuple(found[1:]): found[0]
+            for found in db.execute(
+                select(self.model.id, *key_columns).where(tuple_(*key_columns).in_(keys))
+            )
+        }
+        to_create = [row for row, key in zip(rows, keys) if key not in existing]
+        to_update = [
+            {"id": existing[key], **{field: row[field] for field in update_fields if field in row}}
+            for row, key in zip(rows, keys) if key in existing
+        ]
+        if to_update:
+            db.execute(update(self.model), to_update)
+        if to_create:
+            db.execute(insert(table), to_create)
+        db.commit()
+        return db.execute(
+            select(*table.columns).where(tuple_(*key_columns).in_(keys))
+        ).all()
+
+    def update_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Dict[str, Any]]
+    ) -> int:
+        """Update many records by primary key in one executemany and one commit.
+
+        Each dict needs the "id" plus the columns to change. This is a bulk
+        UPDATE: ORM events (e.g. cache invalidation hooks) do not fire for it.
+        Returns the number of records given.
+        """
+        rows = [self._column_values(obj_in) for obj_in in objs_in]
+        if not rows:
+            return 0
+        if any("id" not in row for row in rows):
+            raise ValueError("update_many needs an 'id' in every row")
+        db.execute(update(self.model), rows)
+        db.commit()
+        return len(rows)
+
     def remove(self, db: Session, *, id: int) -> ModelType:
         """Delete a record."""
         obj = db.query(self.model).get(id)
@@ -89,4 +289,24 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .offset(skip)
             .limit(limit)
             .all()
-        )
\ No newline at end of file
+        )
+
+    def get_by_filters_keyset(
+        self,
+        db: Session,
+        *,
+        filters: Dict[str, Any],
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Sequence[str] = ("id",),
+        descending: bool = False
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Get records by filters, one keyset page at a time."""
+        conditions = [getattr(self.model, k) == v for k, v in filters.items()]
+        return self.paginate(
+            db.query(self.model).filter(and_(*conditions)),
+            cursor=cursor,
+            limit=limit,
+            order_by=order_by,
+            descending=descending
+        )
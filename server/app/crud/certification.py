@@ -1,3 +1,4 @@
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from app.models.professional import Certification
 from app.schemas.professional import CertificationCreate, CertificationUpdate
@@ -18,6 +19,14 @@ class CRUDCertification(CRUDBase[Certification, CertificationCreate, Certificati
         db.refresh(db_certification)
         return db_certification
 
+    def import_certifications(
+        self,
+        db: Session,
+        certifications: List[CertificationCreate]
+    ) -> List[Row]:
+        """Create or update certifications in bulk, matched by name."""
+        return self.upsert_many(db, objs_in=certifications, index_elements=["name"])
+
     def get_certifications(
         self,
         db: Session,
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from app.models.professional import (
     Professional,
@@ -300,14 +300,7 @@ class CRUDProfessional(CRUDBase[Professional, ProfessionalCreate, ProfessionalUp
         db.refresh(db_note)
         return db_note
 
-    def search_professionals(
-        self,
-        db: Session,
-        search_params: ProfessionalSearchParams,
-        skip: int = 0,
-        limit: int = 100
-    ) -> List[Professional]:
-        """Search for professionals based on various criteria."""
+    def _search_query(self, db: Session, search_params: ProfessionalSearchParams):
         query = db.query(Professional)
 
         if search_params.professional_type:
@@ -347,7 +340,27 @@ class CRUDProfessional(CRUDBase[Professional, ProfessionalCreate, ProfessionalUp
                 )
             )
 
-        return query.offset(skip).limit(limit).all()
+        return query
+
+    def search_professionals(
+        self,
+        db: Session,
+        search_params: ProfessionalSearchParams,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Professional]:
+        """Search for professionals based on various criteria."""
+        return self._search_query(db, search_params).offset(skip).limit(limit).all()
+
+    def search_professionals_keyset(
+        self,
+        db: Session,
+        search_params: ProfessionalSearchParams,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Professional], Optional[str]]:
+        """Search for professionals, one keyset page (by id) at a time."""
+        return self.paginate(self._search_query(db, search_params), cursor=cursor, limit=limit)
 
     def get_professional_stats(
         self,
@@ -1,8 +1,9 @@
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from app.models.professional import Specialization
 from app.schemas.professional import SpecializationCreate, SpecializationUpdate
 from app.crud.base import CRUDBase
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
 
 class CRUDSpecialization(CRUDBase[Specialization, SpecializationCreate, SpecializationUpdate]):
@@ -18,6 +19,14 @@ class CRUDSpecialization(CRUDBase[Specialization, SpecializationCreate, Speciali
         db.refresh(db_specialization)
         return db_specialization
 
+    def import_specializations(
+        self,
+        db: Session,
+        specializations: List[SpecializationCreate]
+    ) -> List[Row]:
+        """Create or update specializations in bulk, matched by name."""
+        return self.upsert_many(db, objs_in=specializations, index_elements=["name"])
+
     def get_specializations(
         self,
         db: Session,
@@ -32,6 +41,15 @@ class CRUDSpecialization(CRUDBase[Specialization, SpecializationCreate, Speciali
             .all()
         )
 
+    def get_specializations_keyset(
+        self,
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Specialization], Optional[str]]:
+        """Get specializations, one keyset page (by id) at a time."""
+        return self.get_multi_keyset(db, cursor=cursor, limit=limit)
+
     def update_specialization(
         self,
         db: Session,
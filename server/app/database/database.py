@@ -1,13 +1,107 @@
+import time
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.database.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.database.query_stats import instrument_engine
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers used for the `async def` route handlers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)."""
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return db_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def get_engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool and timeout options from settings for the given database URL."""
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend == "sqlite" and (is_async or db_url.database in (None, "", ":memory:")):
+        # In-memory SQLite lives on a single connection, and every aiosqlite
+        # connection owns a worker thread, so keep the dialect's default pool
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if backend == "postgresql" and settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **get_engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **get_engine_options(ASYNC_DATABASE_URL, is_async=True)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read replica; without one, reads go to the primary engines
+if settings.database_replica_url:
+    read_engine = create_engine(
+        settings.database_replica_url,
+        **get_engine_options(settings.database_replica_url)
+    )
+    ASYNC_READ_DATABASE_URL = get_async_database_url(settings.database_replica_url)
+    async_read_engine = create_async_engine(
+        ASYNC_READ_DATABASE_URL,
+        **get_engine_options(ASYNC_READ_DATABASE_URL, is_async=True)
+    )
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+
+for _engine in {engine, async_engine.sync_engine, read_engine, async_read_engine.sync_engine}:
+    instrument_engine(_engine)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read-your-writes: set after a successful write, or sent explicitly by the client
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_CONSISTENCY_HEADER = "x-read-consistency"
+
+def should_read_from_primary(request: Request) -> bool:
+    """True when this request must see the caller's own recent writes."""
+    if request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary":
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
 Base = declarative_base()
 
 def get_db():
@@ -15,4 +109,23 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db(request: Request):
+    session_factory = SessionLocal if should_read_from_primary(request) else ReadSessionLocal
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    session_factory = (
+        AsyncSessionLocal if should_read_from_primary(request) else AsyncReadSessionLocal
+    )
+    async with session_factory() as db:
+        yield db
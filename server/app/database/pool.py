@@ -0,0 +1,87 @@
+"""Connection pools that record checkout wait times"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class PoolMetrics:
+    """Checkout counters for one pool, shared across pool re-creation."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.recent_waits.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self.recent_waits)
+            attempts = self.checkouts + self.timeouts
+        p95 = recent[int(len(recent) * 0.95) - 1] if len(recent) >= 20 else (recent[-1] if recent else 0.0)
+        return {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+class _TimedCheckoutMixin:
+    def __init__(self, *args, **kwargs):
+        self.metrics = PoolMetrics()
+        super().__init__(*args, **kwargs)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool that tracks how long callers wait for a connection."""
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that tracks how long callers wait for a connection."""
+
+def get_pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Live usage of an engine's pool plus its checkout wait metrics."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow_in_use": max(pool.overflow(), 0),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,131 @@
+"""Per-request SQL statistics
+
+Engine event hooks add every statement's time, and the rows changed by
+INSERT/UPDATE/DELETE statements, to the QueryStats of the current request (held in a context variable, so it
+follows the request into threadpool handlers and async sessions), and
+finished requests are rolled up per route for /api/internal/db/queries.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOWEST_STATEMENT_LENGTH = 500
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    # Rows inserted, updated or deleted; drivers don't report the rows a
+    # SELECT returns (rowcount is -1 or meaningless for them)
+    rows_affected: int = 0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float, rows_affected: int = 0):
+        self.count += 1
+        self.total_time += elapsed
+        self.rows_affected += max(rows_affected, 0)
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = " ".join(statement.split())[:SLOWEST_STATEMENT_LENGTH]
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Collect the statements run inside the block, e.g. to hold code to a query budget:
+
+        with capture_queries() as stats:
+            build_feed(db, user_id)
+        assert stats.count <= 3
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    is_dml = context is not None and (context.isinsert or context.isupdate or context.isdelete)
+    stats.record(statement, elapsed, cursor.rowcount if is_dml else 0)
+
+def instrument_engine(engine: Engine):
+    """Attach the statement hooks to a (sync) engine; use `.sync_engine` for async ones."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class RouteQueryStats:
+    """Running totals of QueryStats per (method, route), for this worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def add(self, method: str, route: str, stats: QueryStats):
+        with self._lock:
+            totals = self._routes.setdefault((method, route), {
+                "requests": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_time": 0.0,
+                "max_db_time": 0.0,
+                "rows_affected": 0,
+                "slowest_time": 0.0,
+                "slowest_statement": None,
+            })
+            totals["requests"] += 1
+            totals["queries"] += stats.count
+            totals["max_queries"] = max(totals["max_queries"], stats.count)
+            totals["db_time"] += stats.total_time
+            totals["max_db_time"] = max(totals["max_db_time"], stats.total_time)
+            totals["rows_affected"] += stats.rows_affected
+            if stats.slowest_time > totals["slowest_time"]:
+                totals["slowest_time"] = stats.slowest_time
+                totals["slowest_statement"] = stats.slowest_statement
+
+    def table(self) -> List[Dict[str, Any]]:
+        """One row per route, by total database time (highest first)."""
+        with self._lock:
+            rows = [
+                {
+                    "method": method,
+                    "route": route,
+                    "requests": totals["requests"],
+                    "avg_queries": round(totals["queries"] / totals["requests"], 2),
+                    "max_queries": totals["max_queries"],
+                    "avg_db_ms": round(totals["db_time"] / totals["requests"] * 1000, 2),
+                    "max_db_ms": round(totals["max_db_time"] * 1000, 2),
+                    "total_db_ms": round(totals["db_time"] * 1000, 2),
+                    "avg_rows_affected": round(totals["rows_affected"] / totals["requests"], 2),
+                    "slowest_ms": round(totals["slowest_time"] * 1000, 2),
+                    "slowest_statement": totals["slowest_statement"],
+                }
+                for (method, route), totals in self._routes.items()
+            ]
+        return sorted(rows, key=lambda row: -row["total_db_ms"])
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+route_query_stats = RouteQueryStats()
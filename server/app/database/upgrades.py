@@ -0,0 +1,69 @@
+"""In-place upgrades for databases created before a schema change
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones, so columns and unique indexes added to a model later are missing on
+older databases. Each step here checks for its change and applies it only
+when it is absent, so running them again is harmless. `init-db` runs them
+after creating tables.
+"""
+
+from typing import Callable, List, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+def _has_unique(connection: Connection, table: str, columns: Sequence[str]) -> bool:
+    inspector = inspect(connection)
+    wanted = list(columns)
+    constraints = inspector.get_unique_constraints(table)
+    indexes = [index for index in inspector.get_indexes(table) if index.get("unique")]
+    return any(item["column_names"] == wanted for item in constraints + indexes)
+
+def unique_post_likes(connection: Connection) -> bool:
+    """One like per user and post (liking is INSERT ... ON CONFLICT DO NOTHING).
+    Duplicate likes are removed first, keeping the earliest."""
+    if not inspect(connection).has_table("post_likes"):
+        return False
+    if _has_unique(connection, "post_likes", ["post_id", "user_id"]):
+        return False
+    connection.execute(text(
+        "DELETE FROM post_likes WHERE id NOT IN "
+        "(SELECT MIN(id) FROM post_likes GROUP BY post_id, user_id)"
+    ))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX uq_post_likes_post_user ON post_likes (post_id, user_id)"
+    ))
+    return True
+
+def challenge_activity_idempotency_keys(connection: Connection) -> bool:
+    """The batch activity endpoint's idempotency_key column and its
+    (user_id, idempotency_key) unique index."""
+    if not inspect(connection).has_table("challenge_activities"):
+        return False
+    applied = False
+    if "idempotency_key" not in {column["name"] for column in inspect(connection).get_columns("challenge_activities")}:
+        connection.execute(text("ALTER TABLE challenge_activities ADD COLUMN idempotency_key VARCHAR(64)"))
+        applied = True
+    if not _has_unique(connection, "challenge_activities", ["user_id", "idempotency_key"]):
+        # Existing rows have no key, and NULLs never conflict
+        connection.execute(text(
+            "CREATE UNIQUE INDEX uq_challenge_activities_user_key "
+            "ON challenge_activities (user_id, idempotency_key)"
+        ))
+        applied = True
+    return applied
+
+UPGRADES: List[Callable[[Connection], bool]] = [
+    unique_post_likes,
+    challenge_activity_idempotency_keys,
+]
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    """Apply the upgrades an existing database is missing, each in its own
+    transaction. Returns the names of those applied."""
+    applied = []
+    for upgrade in UPGRADES:
+        with engine.begin() as connection:
+            if upgrade(connection):
+                applied.append(upgrade.__name__)
+    return applied
@@ -1,15 +1,72 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import engine, Base
+from starlette.concurrency import run_in_threadpool
+from app.database.database import engine, async_engine, Base
 from app.models import models
 from app.models.user import User
-from app.routes import auth, workouts, exercise_library, workout_planning, gamification, progress_tracking, social
+from app.routes import auth, workouts, exercise_library, workout_planning, gamification, progress_tracking, social, live, internal
 from app.api.endpoints import smart_features, health_recovery
+from app.utils.auth import hashing_pool, require_internal_token
+from app.core.config import settings
+from app.crud.base import NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.core.ai_model import preload_models
+from app.core.model_registry import model_registry
+from app.services.counters import post_counters
+from app.services.realtime import realtime_hub
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Fitness Tracker API")
+async def unload_idle_models(ttl_seconds: int):
+    """Periodically drop ML models that nobody has used for `ttl_seconds`."""
+    while True:
+        await asyncio.sleep(min(ttl_seconds, 60))
+        unloaded = await run_in_threadpool(model_registry.unload_idle, ttl_seconds)
+        if unloaded:
+            logger.info("Unloaded idle models: %s", ", ".join(unloaded))
+
+async def flush_post_counters(interval: float):
+    """Write buffered like/comment counts every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await post_counters.flush()
+        except Exception:
+            logger.exception("Flushing post counters failed; retrying next interval")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing blocking runs at import; "full" mode does its setup here instead
+    if settings.startup_mode == "full":
+        started = time.perf_counter()
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        logger.info("Schema check took %.3fs", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        # A no-op when the gunicorn master already preloaded them
+        await run_in_threadpool(preload_models, pin=False)
+        logger.info("AI model load took %.3fs", time.perf_counter() - started)
+
+    tasks = []
+    if settings.ml_model_idle_ttl_seconds > 0:
+        tasks.append(asyncio.create_task(unload_idle_models(settings.ml_model_idle_ttl_seconds)))
+    if settings.post_counter_flush_seconds > 0:
+        tasks.append(asyncio.create_task(flush_post_counters(settings.post_counter_flush_seconds)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await post_counters.flush()
+    await realtime_hub.close()
+    await async_engine.dispose()
+    engine.dispose()
+    hashing_pool.shutdown()
+
+app = FastAPI(title="Fitness Tracker API", lifespan=lifespan)
 
 # Include routers
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
@@ -19,8 +76,22 @@ app.include_router(workout_planning.router, prefix="/api/workouts", tags=["Worko
 app.include_router(gamification.router, prefix="/api", tags=["Gamification"])
 app.include_router(progress_tracking.router, prefix="/api", tags=["Progress Tracking"])
 app.include_router(social.router, prefix="/api", tags=["Social"])
+app.include_router(live.router, prefix="/api", tags=["Live Updates"])
 app.include_router(smart_features.router, prefix="/api/smart", tags=["Smart Features"])
 app.include_router(health_recovery.router, prefix="/api/health", tags=["Health and Recovery"])
+app.include_router(
+    internal.router,
+    prefix="/api/internal",
+    tags=["Internal"],
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False
+)
+
+# Keep clients on the primary right after they write when a replica is in use
+if settings.database_replica_url:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+app.add_middleware(QueryStatsMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -29,6 +100,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER],
 )
 
 @app.get("/")
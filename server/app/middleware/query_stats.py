@@ -0,0 +1,60 @@
+import logging
+
+from app.core.config import settings
+from app.database.query_stats import capture_queries, route_query_stats
+
+logger = logging.getLogger("app.db.queries")
+
+class QueryStatsMiddleware:
+    """Count the SQL each request runs.
+
+    Totals go to the per-route table, to an `app.db.queries` log line when
+    `db_query_log` is set, and to X-DB-* response headers when
+    `db_query_debug_headers` is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        with capture_queries() as stats:
+
+            async def send_wrapper(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if settings.db_query_debug_headers:
+                        headers = list(message.get("headers", []))
+                        headers.extend([
+                            (b"x-db-query-count", str(stats.count).encode()),
+                            (b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()),
+                            (b"x-db-rows-affected", str(stats.rows_affected).encode()),
+                            (b"x-db-slowest-ms", f"{stats.slowest_time * 1000:.2f}".encode()),
+                        ])
+                        message["headers"] = headers
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                # Unmatched paths are grouped together to keep the table bounded
+                path = getattr(route, "path", None) or "<unmatched>"
+                route_query_stats.add(scope["method"], path, stats)
+                if settings.db_query_log:
+                    logger.info(
+                        "method=%s route=%s status=%s queries=%d db_ms=%.2f rows_affected=%d slowest_ms=%.2f slowest=%r",
+                        scope["method"],
+                        path,
+                        status_code,
+                        stats.count,
+                        stats.total_time * 1000,
+                        stats.rows_affected,
+                        stats.slowest_time * 1000,
+                        stats.slowest_statement
+                    )
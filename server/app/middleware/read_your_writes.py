@@ -0,0 +1,42 @@
+import time
+from http.cookies import SimpleCookie
+
+from app.core.config import settings
+from app.database.database import READ_PRIMARY_COOKIE
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWritesMiddleware:
+    """Pin a client's reads to the primary for a short window after it writes.
+
+    Successful non-GET requests get a `read_primary_until` cookie (and the
+    matching `X-Read-Primary-Until` header for clients that don't keep
+    cookies); `get_read_db` honours it so replica lag never hides the
+    caller's own changes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.replica_read_after_write_seconds
+                until = f"{time.time() + window:.3f}"
+                cookie = SimpleCookie()
+                cookie[READ_PRIMARY_COOKIE] = until
+                cookie[READ_PRIMARY_COOKIE]["max-age"] = window
+                cookie[READ_PRIMARY_COOKIE]["path"] = "/"
+                cookie[READ_PRIMARY_COOKIE]["httponly"] = True
+                cookie[READ_PRIMARY_COOKIE]["samesite"] = "lax"
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.output(header="").strip().encode("latin-1")))
+                headers.append((b"x-read-primary-until", until.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
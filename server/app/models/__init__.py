@@ -1,10 +1,10 @@
 # Import all models to ensure SQLAlchemy can resolve relationships
 from .user import User
 from .models import Workout, WorkoutExercise, WorkoutLog
-from .exercise_library import Exercise, Muscle, Equipment, ExerciseProgress
+from .exercise_library import Exercise, Muscle, Equipment, ExerciseProgress, ExerciseSubstitute, PersonalRecord
 from .achievements import Achievement, UserAchievement
 from .gamification import UserStreak, UserPoints
-from .social import Challenge, ChallengeActivity, Post, PostComment as Comment, PostLike as Like
+from .social import Challenge, ChallengeActivity, ChallengeScore, Post, PostComment as Comment, PostLike as Like, TimelineEntry, FeedPullAuthor
 from .progress import BodyMeasurement
 from .progress_photos import ProgressPhoto
 from .workout_planning import WorkoutTemplate, ScheduledWorkout, WorkoutReminder as Reminder
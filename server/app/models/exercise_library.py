@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, Float, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, Float, Boolean, DateTime, DDL, Index, event, func, text
+from sqlalchemy.dialects import postgresql  # noqa: F401  registers to_tsvector() and friends
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database.database import Base
@@ -51,6 +52,37 @@ class Exercise(Base):
     workout_exercises = relationship("WorkoutExercise", back_populates="exercise")
     form_checks = relationship("FormCheck", back_populates="exercise")
 
+# English text search config. Constants are spelled as SQL literals rather
+# than bound parameters so queries repeat the indexed expression exactly,
+# which is what lets Postgres use the expression index
+SEARCH_CONFIG = text("'english'::regconfig")
+
+def exercise_search_document():
+    """Weighted tsvector of an exercise's searchable text (Postgres only)."""
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(column, text("''"))), text(f"'{weight}'"))
+    return (
+        weighted(Exercise.name, 'A')
+        .op('||')(weighted(Exercise.form_tips, 'B'))
+        .op('||')(weighted(Exercise.description, 'C'))
+        .op('||')(weighted(Exercise.instructions, 'D'))
+    )
+
+# Full-text and trigram (fuzzy / prefix name) search; SQLite uses the
+# in-process index in app/services/exercise_search.py instead
+Index('ix_exercises_search', exercise_search_document(), postgresql_using='gin').ddl_if(dialect='postgresql')
+Index(
+    'ix_exercises_name_trgm',
+    Exercise.name,
+    postgresql_using='gin',
+    postgresql_ops={'name': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+event.listen(
+    Exercise.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
 class Equipment(Base):
     __tablename__ = 'equipment'
 
@@ -99,6 +131,43 @@ class ExerciseProgress(Base):
     is_personal_record = Column(Boolean, default=False)
     pr_type = Column(String(20))  # weight, reps, duration, etc.
 
+    __table_args__ = (
+        # A user's history on one exercise, by date (progress lists and charts)
+        Index('ix_exercise_progress_user_exercise_date', 'user_id', 'exercise_id', 'date'),
+    )
+
     # Relationships
     user = relationship("User", back_populates="exercise_progress")
-    exercise = relationship("Exercise")
\ No newline at end of file
+    exercise = relationship("Exercise")
+
+class PersonalRecord(Base):
+    """A user's best mark of one kind on one exercise, updated as progress is logged."""
+    __tablename__ = 'personal_records'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey('exercises.id'), primary_key=True)
+    record_type = Column(String(20), primary_key=True)  # weight, estimated_1rm, volume, reps, distance, duration
+    weight = Column(Float, primary_key=True, default=0)  # Load of a reps record (0 for the other types)
+    value = Column(Float, nullable=False)
+    progress_id = Column(Integer, ForeignKey('exercise_progress.id'))
+    achieved_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # PR boards: best marks of one kind on one exercise across all users
+        Index('ix_personal_records_board', 'exercise_id', 'record_type', 'weight', value.desc()),
+    )
+
+    user = relationship("User")
+
+class ExerciseSubstitute(Base):
+    """A precomputed alternative to an exercise; see app/services/substitutes.py."""
+    __tablename__ = 'exercise_substitutes'
+
+    exercise_id = Column(Integer, ForeignKey('exercises.id'), primary_key=True)
+    substitute_id = Column(Integer, ForeignKey('exercises.id'), primary_key=True)
+    score = Column(Float, nullable=False)  # Cosine similarity, 0-1
+
+    __table_args__ = (
+        # An exercise's alternatives, best first
+        Index('ix_exercise_substitutes_ranked', 'exercise_id', score.desc()),
+    )
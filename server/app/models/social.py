@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.database import Base
@@ -8,7 +8,9 @@ friendship = Table(
     'friendship',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('friend_id', Integer, ForeignKey('users.id'), primary_key=True)
+    Column('friend_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # Followers of an author, for timeline fan-out
+    Index('ix_friendship_friend_id', 'friend_id')
 )
 
 # Association table for challenge participants
@@ -47,11 +49,31 @@ class ChallengeActivity(Base):
     activity_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     value = Column(Integer, nullable=False)  # e.g., number of steps, workout duration, etc.
     notes = Column(String(200))
+    # Client-chosen key that makes re-sent batches no-ops
+    idempotency_key = Column(String(64))
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'idempotency_key', name='uq_challenge_activities_user_key'),
+    )
 
     # Relationships
     challenge = relationship("Challenge", back_populates="activities")
     user = relationship("User", back_populates="challenge_activities")
 
+class ChallengeScore(Base):
+    """Running total per challenge participant, updated as activity is logged."""
+    __tablename__ = 'challenge_scores'
+
+    challenge_id = Column(Integer, ForeignKey('challenges.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Standings of a challenge, highest total first
+        Index('ix_challenge_scores_standings', 'challenge_id', total.desc(), 'user_id'),
+    )
+
 class Post(Base):
     __tablename__ = 'posts'
 
@@ -64,6 +86,11 @@ class Post(Base):
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
 
+    __table_args__ = (
+        # An author's posts newest first, for feed pulls and backfills
+        Index('ix_posts_user_created_id', user_id, created_at.desc(), id),
+    )
+
     # Relationships
     user = relationship("User", back_populates="posts")
     workout = relationship("Workout", back_populates="posts")
@@ -79,6 +106,11 @@ class PostLike(Base):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    __table_args__ = (
+        # One like per user; liking is an INSERT ... ON CONFLICT DO NOTHING
+        UniqueConstraint('post_id', 'user_id', name='uq_post_likes_post_user'),
+    )
+
     # Relationships
     post = relationship("Post", back_populates="likes")
     user = relationship("User", back_populates="post_likes")
@@ -94,4 +126,28 @@ class PostComment(Base):
 
     # Relationships
     post = relationship("Post", back_populates="comments")
-    user = relationship("User", back_populates="post_comments")
\ No newline at end of file
+    user = relationship("User", back_populates="post_comments")
+
+class TimelineEntry(Base):
+    """A post in a user's precomputed feed, written when the post is created."""
+    __tablename__ = 'timeline_entries'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)  # whose feed
+    post_id = Column(Integer, ForeignKey('posts.id'), primary_key=True)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # copied from the post
+
+    __table_args__ = (
+        # Feed reads are one range scan on this index
+        Index('ix_timeline_entries_feed', 'user_id', 'created_at', 'post_id'),
+    )
+
+    post = relationship("Post")
+
+class FeedPullAuthor(Base):
+    """Authors with too many followers to fan out to; their posts are merged
+    into followers' feeds at read time instead."""
+    __tablename__ = 'feed_pull_authors'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    since = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ..database.database import get_db
+from ..database.database import get_async_db
 from ..models import models
 from ..schemas import schemas
-from ..utils.auth import verify_password, get_password_hash, create_access_token
+from ..utils.auth import hash_password_async, verify_and_update_password, create_access_token
 from datetime import timedelta
 
 router = APIRouter()
@@ -13,12 +14,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # User registration
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    db_user = db.query(models.User).filter(
-        (models.User.email == user.email) | 
-        (models.User.username == user.username)
-    ).first()
+    db_user = await db.scalar(
+        select(models.User).where(
+            (models.User.email == user.email) |
+            (models.User.username == user.username)
+        )
+    )
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -26,33 +29,42 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 # User login
 @router.post("/token")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Find user
-    user = db.query(models.User).filter(
-        models.User.email == form_data.username
-    ).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(
+        select(models.User).where(models.User.email == form_data.username)
+    )
+    verified, new_hash = (
+        await verify_and_update_password(form_data.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Upgrade hashes made with an older cost setting
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=30)
@@ -1,189 +1,336 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, File, Request, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
-from ..database.database import get_db
+from datetime import datetime
+from ..database.database import get_async_db, get_async_read_db
 from ..utils.auth import get_current_user
-from ..models.user import User
-from ..models.exercise_library import Exercise, Equipment, Muscle, ExerciseProgress
+from ..utils.user_cache import UserSnapshot
+from ..models.exercise_library import Exercise, ExerciseProgress
 from ..schemas.exercise_library import (
     Exercise as ExerciseSchema,
     ExerciseCreate,
+    ExerciseFacets,
+    ExerciseImportResult,
+    ExerciseSubstitute,
+    ExerciseSuggestion,
     Equipment as EquipmentSchema,
     EquipmentCreate,
     Muscle as MuscleSchema,
     MuscleCreate,
     ExerciseProgress as ExerciseProgressSchema,
-    ExerciseProgressCreate
+    ExerciseProgressCreate,
+    PersonalRecord as PersonalRecordSchema,
+    PersonalRecordBoardEntry,
+    ProgressPoint
 )
+from ..core.config import settings
 from ..core.storage import upload_file
-from sqlalchemy import and_, or_
+from ..crud.base import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..services.catalog import catalog_cache, exercise_load_options
+from ..services.exercise_facets import FacetIndex
+from ..services.exercise_import import ExerciseImporter, decode_lines, parse_csv, parse_ndjson
+from ..services.exercise_search import ExerciseSearchService
+from ..services.personal_records import RECORD_TYPES, PersonalRecordService
+from ..services.progress_series import BUCKETS, METRICS, ProgressSeriesService
+from ..services.substitutes import SubstituteService, refresh_substitutes
+from ..utils.http_cache import conditional_json
 
 router = APIRouter()
 
+def _progress_exercise_option():
+    return selectinload(ExerciseProgress.exercise).options(*exercise_load_options())
+
 # Exercise endpoints
 @router.post("/exercises/", response_model=ExerciseSchema)
 async def create_exercise(
     exercise: ExerciseCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_exercise = Exercise(
-        **exercise.dict(exclude={'equipment_ids', 'muscle_ids'}),
-        created_by=current_user.id,
-        is_custom=True
+    importer = ExerciseImporter(db, current_user.id)
+    problem = (await importer.unknown_references([exercise]))[0]
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
+    exercise_id = (await importer.insert([exercise]))[0]
+    await db.commit()
+    catalog_cache.invalidate()
+    background_tasks.add_task(refresh_substitutes, [exercise_id])
+    return await db.scalar(
+        select(Exercise)
+        .options(*exercise_load_options())
+        .where(Exercise.id == exercise_id)
     )
-    
-    # Add equipment
-    for eq_id in exercise.equipment_ids:
-        equipment = db.query(Equipment).filter(Equipment.id == eq_id).first()
-        if equipment:
-            db_exercise.equipment.append(equipment)
-    
-    # Add muscles
-    for muscle_data in exercise.muscle_ids:
-        muscle = db.query(Muscle).filter(Muscle.id == muscle_data['muscle_id']).first()
-        if muscle:
-            db_exercise.muscles.append(muscle)
-    
-    db.add(db_exercise)
-    db.commit()
-    db.refresh(db_exercise)
-    return db_exercise
+
+@router.post("/exercises/import", response_model=ExerciseImportResult)
+async def import_exercises(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create custom exercises from a CSV or NDJSON file (format taken from
+    `format`, else the file name). Valid rows are created even when others
+    fail; each failure is reported with its line number."""
+    name = (file.filename or "").lower()
+    if format is None:
+        if name.endswith(".csv"):
+            format = "csv"
+        elif name.endswith((".ndjson", ".jsonl")):
+            format = "ndjson"
+        else:
+            raise HTTPException(status_code=400, detail="Pass format=csv or format=ndjson")
+
+    lines = decode_lines(file.file)
+    rows = parse_csv(lines) if format == "csv" else parse_ndjson(lines)
+    importer = ExerciseImporter(db, current_user.id)
+    result = await importer.import_rows(rows, settings.exercise_import_chunk_size)
+    if importer.created_ids:
+        catalog_cache.invalidate()
+        background_tasks.add_task(refresh_substitutes, importer.created_ids)
+    return result
 
 @router.get("/exercises/", response_model=List[ExerciseSchema])
 async def list_exercises(
+    request: Request,
     category: Optional[str] = None,
     difficulty: Optional[str] = None,
     equipment_id: Optional[int] = None,
     muscle_id: Optional[int] = None,
     custom_only: bool = False,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    current_user: Optional[UserSnapshot] = Depends(get_current_user)
 ):
-    query = db.query(Exercise)
-    
-    if category:
-        query = query.filter(Exercise.category == category)
-    if difficulty:
-        query = query.filter(Exercise.difficulty_level == difficulty)
-    if equipment_id:
-        query = query.filter(Exercise.equipment.any(Equipment.id == equipment_id))
-    if muscle_id:
-        query = query.filter(Exercise.muscles.any(Muscle.id == muscle_id))
-    if custom_only and current_user:
-        query = query.filter(Exercise.created_by == current_user.id)
-    
-    return query.all()
+    """Exercises by id, served from the catalog snapshot with an ETag.
+
+    Without `limit` every match is returned; with it, pass X-Next-Cursor
+    back as `cursor` for the next page.
+    """
+    snapshot = await catalog_cache.get()
+    after_id = decode_cursor(cursor, (Exercise.id,))[0] if cursor else None
+    created_by = current_user.id if custom_only and current_user else None
+    filters = (category, difficulty, equipment_id, muscle_id, created_by, after_id, limit)
+
+    def build():
+        page, next_id = snapshot.exercises_page(*filters)
+        return page, {NEXT_CURSOR_HEADER: encode_cursor([next_id])} if next_id is not None else {}
+
+    body, etag, headers = await snapshot.render(("exercises",) + filters, build)
+    return conditional_json(request, body, etag, headers)
+
+@router.get("/exercises/facets", response_model=ExerciseFacets)
+async def exercise_facets(
+    request: Request,
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    equipment_id: Optional[int] = None,
+    muscle_id: Optional[int] = None,
+    custom_only: bool = False,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user)
+):
+    """How many exercises each filter value would match, given the filters
+    already applied (the same ones `list_exercises` takes)."""
+    snapshot = await catalog_cache.get()
+    facets = await FacetIndex.current()
+    created_by = current_user.id if custom_only and current_user else None
+    filters = (category, difficulty, equipment_id, muscle_id, created_by)
+    if facets.snapshot is not snapshot:
+        # The new snapshot's bitmaps are still building; answer from the
+        # previous ones, without caching that under the new snapshot
+        return facets.counts(*filters)
+    body, etag, _ = await snapshot.render(("facets",) + filters, lambda: facets.counts(*filters))
+    return conditional_json(request, body, etag)
+
+@router.get("/exercises/search", response_model=List[ExerciseSchema])
+async def search_exercises(
+    q: str = Query(..., min_length=1, max_length=100),
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    equipment_id: Optional[int] = None,
+    muscle_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Exercises matching every word of `q` in their name, form tips,
+    description or instructions, best first. Tolerates typos; the last word
+    may be partial."""
+    return await ExerciseSearchService(db).search(q, category, difficulty, equipment_id, muscle_id, limit)
+
+@router.get("/exercises/autocomplete", response_model=List[ExerciseSuggestion])
+async def autocomplete_exercises(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await ExerciseSearchService(db).autocomplete(q, limit)
+
+@router.get("/exercises/{exercise_id}/substitutes", response_model=List[ExerciseSubstitute])
+async def get_exercise_substitutes(
+    exercise_id: int,
+    equipment: Optional[str] = Query(
+        None,
+        description="Comma-separated ids of the equipment at hand; empty for none. Omit to allow any."
+    ),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Most similar exercises (muscles, category, difficulty, equipment),
+    read from the precomputed substitutes index (or, when the equipment at
+    hand rules most of those out, scored against usable exercises)."""
+    try:
+        equipment_ids = {int(part) for part in equipment.split(",") if part.strip()} if equipment is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="equipment must be comma-separated ids")
+
+    snapshot = await catalog_cache.get()
+    if snapshot.exercise(exercise_id) is None and await db.get(Exercise, exercise_id) is None:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    substitutes = await SubstituteService(db).substitutes(exercise_id, equipment_ids, limit)
+    # Exercises newer than this worker's snapshot appear once it refreshes
+    return [
+        {"score": score, "exercise": snapshot.exercise(substitute_id)}
+        for substitute_id, score in substitutes
+        if snapshot.exercise(substitute_id) is not None
+    ]
 
 @router.post("/exercises/{exercise_id}/progress", response_model=ExerciseProgressSchema)
 async def log_exercise_progress(
     exercise_id: int,
     progress: ExerciseProgressCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
+    exercise = await db.get(Exercise, exercise_id)
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
-    
-    # Check for personal records
-    is_pr = False
-    pr_type = None
-    
-    if progress.weight:
-        max_weight = db.query(ExerciseProgress)\
-            .filter(
-                ExerciseProgress.exercise_id == exercise_id,
-                ExerciseProgress.user_id == current_user.id,
-                ExerciseProgress.weight.isnot(None)
-            )\
-            .order_by(ExerciseProgress.weight.desc())\
-            .first()
-        
-        if not max_weight or progress.weight > max_weight.weight:
-            is_pr = True
-            pr_type = 'weight'
-    
+
     db_progress = ExerciseProgress(
         user_id=current_user.id,
         exercise_id=exercise_id,
-        is_personal_record=is_pr,
-        pr_type=pr_type,
-        **progress.dict()
+        date=datetime.utcnow(),
+        **progress.dict(exclude={'exercise_id'})
     )
-    
     db.add(db_progress)
-    db.commit()
-    db.refresh(db_progress)
-    return db_progress
+    await db.flush()
+
+    # Checked against the user's records ledger, not their history
+    broken = await PersonalRecordService(db).record(db_progress)
+    db_progress.is_personal_record = bool(broken)
+    db_progress.pr_type = broken[0] if broken else None
+    await db.commit()
+    return await db.scalar(
+        select(ExerciseProgress)
+        .options(_progress_exercise_option())
+        .where(ExerciseProgress.id == db_progress.id)
+    )
 
 @router.post("/exercises/{exercise_id}/video")
 async def upload_exercise_video(
     exercise_id: int,
     video: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    exercise = db.query(Exercise).filter(
-        Exercise.id == exercise_id,
-        Exercise.created_by == current_user.id
-    ).first()
+    exercise = await db.scalar(
+        select(Exercise).where(
+            Exercise.id == exercise_id,
+            Exercise.created_by == current_user.id
+        )
+    )
     
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found or unauthorized")
     
     video_url = await upload_file(video, f"exercise_videos/{exercise_id}")
     exercise.video_url = video_url
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
     
     return {"video_url": video_url}
 
 # Equipment endpoints
 @router.get("/equipment/", response_model=List[EquipmentSchema])
 async def list_equipment(
-    category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    request: Request,
+    category: Optional[str] = None
 ):
-    query = db.query(Equipment)
-    if category:
-        query = query.filter(Equipment.category == category)
-    return query.all()
+    snapshot = await catalog_cache.get()
+    body, etag, _ = await snapshot.render(
+        ("equipment", category),
+        lambda: [item for item in snapshot.equipment if not category or item["category"] == category]
+    )
+    return conditional_json(request, body, etag)
 
 # Muscle endpoints
 @router.get("/muscles/", response_model=List[MuscleSchema])
 async def list_muscles(
-    body_part: Optional[str] = None,
-    db: Session = Depends(get_db)
+    request: Request,
+    body_part: Optional[str] = None
 ):
-    query = db.query(Muscle)
-    if body_part:
-        query = query.filter(Muscle.body_part == body_part)
-    return query.all()
+    snapshot = await catalog_cache.get()
+    body, etag, _ = await snapshot.render(
+        ("muscles", body_part),
+        lambda: [item for item in snapshot.muscles if not body_part or item["body_part"] == body_part]
+    )
+    return conditional_json(request, body, etag)
 
 # Progress tracking endpoints
+@router.get("/progress/personal-records", response_model=List[PersonalRecordSchema])
+async def get_personal_records(
+    exercise_id: Optional[int] = None,
+    record_type: Optional[str] = Query(None, pattern=f"^({'|'.join(RECORD_TYPES)})$"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """The user's current best marks, per exercise and record type."""
+    return await PersonalRecordService(db).for_user(current_user.id, exercise_id, record_type)
+
+@router.get("/progress/personal-records/board", response_model=List[PersonalRecordBoardEntry])
+async def get_personal_record_board(
+    exercise_id: int,
+    record_type: str = Query("weight", pattern=f"^({'|'.join(RECORD_TYPES)})$"),
+    weight: float = Query(0, ge=0, description="Load, for the reps board"),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await PersonalRecordService(db).board(exercise_id, record_type, weight, limit)
+
+@router.get("/progress/{exercise_id}/series", response_model=List[ProgressPoint])
+async def get_exercise_progress_series(
+    exercise_id: int,
+    bucket: Optional[str] = Query(None, pattern=f"^({'|'.join(BUCKETS)})$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample to at most this many points"),
+    metric: str = Query("best_e1rm", pattern=f"^({'|'.join(METRICS)})$"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Progress on one exercise for charting, oldest first: one point per
+    log, or per day/week/month with `bucket`. `points` thins the series
+    (LTTB on `metric`) for long histories."""
+    return await ProgressSeriesService(db).series(
+        current_user.id, exercise_id, bucket, start, end, points, metric
+    )
+
 @router.get("/progress/{exercise_id}", response_model=List[ExerciseProgressSchema])
 async def get_exercise_progress(
     exercise_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return db.query(ExerciseProgress)\
-        .filter(
+    result = await db.scalars(
+        select(ExerciseProgress)
+        .options(_progress_exercise_option())
+        .where(
             ExerciseProgress.exercise_id == exercise_id,
             ExerciseProgress.user_id == current_user.id
-        )\
-        .order_by(ExerciseProgress.date.desc())\
-        .all()
-
-@router.get("/progress/personal-records", response_model=List[ExerciseProgressSchema])
-async def get_personal_records(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    return db.query(ExerciseProgress)\
-        .filter(
-            ExerciseProgress.user_id == current_user.id,
-            ExerciseProgress.is_personal_record == True
-        )\
-        .order_by(ExerciseProgress.date.desc())\
-        .all()
\ No newline at end of file
+        )
+        .order_by(ExerciseProgress.date.desc())
+    )
+    return result.all()
@@ -5,7 +5,7 @@ from ..database.database import get_db
 from ..models.achievements import Achievement
 from ..models.gamification import UserStreak, UserPoints
 from ..models.user import User
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_db_user
 from datetime import datetime, timedelta
 import json
 
@@ -55,7 +55,7 @@ def check_streak_achievement(user: User, db: Session):
 
 @router.get("/achievements/", response_model=List[dict])
 async def get_user_achievements(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
     return [
@@ -75,7 +75,7 @@ async def get_user_achievements(
 
 @router.get("/streak/")
 async def get_user_streak(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.streak:
@@ -92,7 +92,7 @@ async def get_user_streak(
 
 @router.post("/check-achievements/")
 async def check_achievements(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
     # Check for new achievements
@@ -130,7 +130,7 @@ async def check_achievements(
 
 @router.post("/update-streak/")
 async def update_streak(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.streak:
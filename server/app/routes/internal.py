@@ -0,0 +1,71 @@
+from fastapi import APIRouter
+
+from ..database.database import engine, async_engine
+from ..database.pool import get_pool_stats
+from ..database.query_stats import route_query_stats
+from ..core.model_registry import model_registry
+from ..utils.user_cache import user_cache
+from ..utils.auth import hashing_pool
+from ..services.catalog import catalog_cache
+from ..services.counters import post_counters
+from ..services.friend_graph import friend_graph_cache
+from ..services.realtime import realtime_hub
+
+router = APIRouter()
+
+@router.get("/db/pool")
+async def get_db_pool_stats():
+    """Live connection pool usage and checkout wait times for this worker."""
+    return {
+        "sync": get_pool_stats(engine),
+        "async": get_pool_stats(async_engine.sync_engine)
+    }
+
+@router.get("/db/queries")
+async def get_query_stats():
+    """SQL issued per route in this worker, by total database time."""
+    return route_query_stats.table()
+
+@router.delete("/db/queries")
+async def reset_query_stats():
+    route_query_stats.reset()
+    return {"message": "Query statistics reset"}
+
+@router.get("/models")
+async def get_model_stats():
+    """ML models registered in this worker and whether they are loaded."""
+    return model_registry.status()
+
+@router.get("/cache/users")
+async def get_user_cache_stats():
+    """Hit/miss counters for the authenticated user cache in this worker."""
+    return user_cache.stats()
+
+@router.get("/cache/friends")
+async def get_friend_graph_cache_stats():
+    """Cached friend-id sets and suggestion lists in this worker."""
+    return friend_graph_cache.stats()
+
+@router.get("/cache/catalog")
+async def get_catalog_cache_stats():
+    """Exercise catalog snapshot version, size and rendered-response reuse in this worker."""
+    return catalog_cache.stats()
+
+@router.get("/auth/hashing")
+async def get_hashing_pool_stats():
+    """Password hashing pool usage and queue depth for this worker."""
+    return hashing_pool.stats()
+
+@router.get("/counters")
+async def get_counter_stats():
+    """Buffered post counter increments waiting to be flushed in this worker."""
+    return {
+        "buffering": post_counters.buffering,
+        "pending": post_counters.pending(),
+        "flushed_updates": post_counters.flushed_updates
+    }
+
+@router.get("/realtime")
+async def get_realtime_stats():
+    """Open live-update connections and event delivery for this worker."""
+    return realtime_hub.stats()
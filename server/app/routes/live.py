@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+
+from ..database.database import AsyncSessionLocal
+from ..models.social import challenge_participants
+from ..services.friend_graph import FriendGraphService
+from ..services.realtime import (
+    TooManyConnections,
+    author_channel,
+    challenge_channel,
+    realtime_hub
+)
+from ..utils.auth import get_user_for_token
+
+router = APIRouter()
+
+# Close codes: policy violation (bad token) and try again later (worker full)
+CLOSE_UNAUTHORIZED = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+async def _send_events(websocket: WebSocket, queue: asyncio.Queue):
+    while True:
+        await websocket.send_json(await queue.get())
+
+async def _wait_for_close(websocket: WebSocket):
+    # Clients don't send anything; reading is how a disconnect is noticed
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+@router.websocket("/live")
+async def live_updates(websocket: WebSocket, token: str = Query(...)):
+    """Push new posts and like/comment deltas from the user and the people
+    they follow, and leaderboard changes in their challenges.
+
+    Subscriptions are fixed when the socket opens; reconnect after following
+    someone or joining a challenge. A `resync` event means updates were
+    dropped because the client fell behind, so refetch over HTTP.
+    """
+    # A short-lived session: a socket can stay open for hours
+    async with AsyncSessionLocal() as db:
+        user = await get_user_for_token(token, db)
+        if user is None:
+            await websocket.close(code=CLOSE_UNAUTHORIZED)
+            return
+        followed = await FriendGraphService(db).friend_ids(user.id)
+        challenges = (await db.scalars(
+            select(challenge_participants.c.challenge_id).where(challenge_participants.c.user_id == user.id)
+        )).all()
+
+    channels = [author_channel(user.id)]
+    channels += [author_channel(friend_id) for friend_id in followed]
+    channels += [challenge_channel(challenge_id) for challenge_id in challenges]
+    try:
+        connection = await realtime_hub.connect(user.id, channels)
+    except TooManyConnections:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+
+    try:
+        await websocket.accept()
+        await websocket.send_json({"type": "ready", "channels": len(connection.channels)})
+        tasks = [
+            asyncio.create_task(_send_events(websocket, connection.queue)),
+            asyncio.create_task(_wait_for_close(websocket))
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            # A send to a closed socket is just the client going away
+            if not task.cancelled() and isinstance(task.exception(), (WebSocketDisconnect, RuntimeError)):
+                continue
+            task.result()
+    finally:
+        await realtime_hub.disconnect(connection)
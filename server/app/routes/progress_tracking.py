@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime, timedelta
-from ..database.database import get_db
+from ..database.database import get_async_db, get_async_read_db
 from ..utils.auth import get_current_user
-from ..models.user import User
+from ..utils.user_cache import UserSnapshot
 from ..models.progress_tracking import (
     Measurement,
     PerformanceMetric
 )
 from ..models.achievements import Achievement, UserAchievement
+from ..models.progress_photos import ProgressPhoto
 from ..schemas.progress_tracking import (
     MeasurementCreate,
-    Measurement,
+    Measurement as MeasurementSchema,
     ProgressPhotoCreate,
     ProgressPhoto as ProgressPhotoSchema,
     Achievement as AchievementSchema,
@@ -22,52 +25,51 @@ from ..schemas.progress_tracking import (
     ProgressSummary
 )
 from ..core.storage import upload_file
-from sqlalchemy import func
 
 router = APIRouter()
 
 # Measurements endpoints
-@router.post("/measurements/", response_model=Measurement)
+@router.post("/measurements/", response_model=MeasurementSchema)
 async def create_measurement(
     measurement: MeasurementCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_measurement = Measurement(
         user_id=current_user.id,
         **measurement.dict()
     )
     db.add(db_measurement)
-    db.commit()
-    db.refresh(db_measurement)
+    await db.commit()
     return db_measurement
 
-@router.get("/measurements/", response_model=List[Measurement])
+@router.get("/measurements/", response_model=List[MeasurementSchema])
 async def list_measurements(
     measurement_type: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Measurement).filter(Measurement.user_id == current_user.id)
+    query = select(Measurement).where(Measurement.user_id == current_user.id)
     
     if measurement_type:
-        query = query.filter(Measurement.measurement_type == measurement_type)
+        query = query.where(Measurement.measurement_type == measurement_type)
     if start_date:
-        query = query.filter(Measurement.date >= start_date)
+        query = query.where(Measurement.date >= start_date)
     if end_date:
-        query = query.filter(Measurement.date <= end_date)
+        query = query.where(Measurement.date <= end_date)
     
-    return query.order_by(Measurement.date.desc()).all()
+    result = await db.scalars(query.order_by(Measurement.date.desc()))
+    return result.all()
 
 # Progress photos endpoints
 @router.post("/photos/", response_model=ProgressPhotoSchema)
 async def upload_progress_photo(
     photo_data: ProgressPhotoCreate,
     photo: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     photo_url = await upload_file(
         photo,
@@ -80,8 +82,7 @@ async def upload_progress_photo(
         **photo_data.dict()
     )
     db.add(db_photo)
-    db.commit()
-    db.refresh(db_photo)
+    await db.commit()
     return db_photo
 
 @router.get("/photos/", response_model=List[ProgressPhotoSchema])
@@ -89,55 +90,59 @@ async def list_progress_photos(
     photo_type: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(ProgressPhoto).filter(ProgressPhoto.user_id == current_user.id)
+    query = select(ProgressPhoto).where(ProgressPhoto.user_id == current_user.id)
     
     if photo_type:
-        query = query.filter(ProgressPhoto.photo_type == photo_type)
+        query = query.where(ProgressPhoto.photo_type == photo_type)
     if start_date:
-        query = query.filter(ProgressPhoto.date >= start_date)
+        query = query.where(ProgressPhoto.date >= start_date)
     if end_date:
-        query = query.filter(ProgressPhoto.date <= end_date)
+        query = query.where(ProgressPhoto.date <= end_date)
     
-    return query.order_by(ProgressPhoto.date.desc()).all()
+    result = await db.scalars(query.order_by(ProgressPhoto.date.desc()))
+    return result.all()
 
 # Achievements endpoints
 @router.get("/achievements/", response_model=List[UserAchievementSchema])
 async def list_user_achievements(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return db.query(UserAchievement)\
-        .filter(UserAchievement.user_id == current_user.id)\
-        .order_by(UserAchievement.earned_date.desc())\
-        .all()
+    result = await db.scalars(
+        select(UserAchievement)
+        .options(selectinload(UserAchievement.achievement))
+        .where(UserAchievement.user_id == current_user.id)
+        .order_by(UserAchievement.earned_date.desc())
+    )
+    return result.all()
 
 @router.get("/achievements/available", response_model=List[AchievementSchema])
 async def list_available_achievements(
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Achievement)
+    query = select(Achievement)
     if category:
-        query = query.filter(Achievement.category == category)
-    return query.all()
+        query = query.where(Achievement.category == category)
+    result = await db.scalars(query)
+    return result.all()
 
 # Performance metrics endpoints
 @router.post("/metrics/", response_model=PerformanceMetricSchema)
 async def log_performance_metric(
     metric: PerformanceMetricCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_metric = PerformanceMetric(
         user_id=current_user.id,
         **metric.dict()
     )
     db.add(db_metric)
-    db.commit()
-    db.refresh(db_metric)
+    await db.commit()
     return db_metric
 
 @router.get("/metrics/", response_model=List[PerformanceMetricSchema])
@@ -146,74 +151,82 @@ async def list_performance_metrics(
     exercise_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(PerformanceMetric).filter(PerformanceMetric.user_id == current_user.id)
+    query = select(PerformanceMetric).where(PerformanceMetric.user_id == current_user.id)
     
     if metric_type:
-        query = query.filter(PerformanceMetric.metric_type == metric_type)
+        query = query.where(PerformanceMetric.metric_type == metric_type)
     if exercise_id:
-        query = query.filter(PerformanceMetric.exercise_id == exercise_id)
+        query = query.where(PerformanceMetric.exercise_id == exercise_id)
     if start_date:
-        query = query.filter(PerformanceMetric.date >= start_date)
+        query = query.where(PerformanceMetric.date >= start_date)
     if end_date:
-        query = query.filter(PerformanceMetric.date <= end_date)
+        query = query.where(PerformanceMetric.date <= end_date)
     
-    return query.order_by(PerformanceMetric.date.desc()).all()
+    result = await db.scalars(query.order_by(PerformanceMetric.date.desc()))
+    return result.all()
 
 # Progress summary endpoint
 @router.get("/summary", response_model=ProgressSummary)
 async def get_progress_summary(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     start_date = datetime.now() - timedelta(days=days)
     
     # Get recent measurements grouped by type
     measurements = {}
-    measurement_types = db.query(Measurement.measurement_type)\
-        .filter(Measurement.user_id == current_user.id)\
-        .distinct()\
-        .all()
+    measurement_types = await db.scalars(
+        select(Measurement.measurement_type)
+        .where(Measurement.user_id == current_user.id)
+        .distinct()
+    )
     
-    for (m_type,) in measurement_types:
-        measurements[m_type] = db.query(Measurement)\
-            .filter(
+    for m_type in measurement_types.all():
+        result = await db.scalars(
+            select(Measurement)
+            .where(
                 Measurement.user_id == current_user.id,
                 Measurement.measurement_type == m_type,
                 Measurement.date >= start_date
-            )\
-            .order_by(Measurement.date.desc())\
-            .all()
+            )
+            .order_by(Measurement.date.desc())
+        )
+        measurements[m_type] = result.all()
     
     # Get recent photos
-    recent_photos = db.query(ProgressPhoto)\
-        .filter(
+    recent_photos = (await db.scalars(
+        select(ProgressPhoto)
+        .where(
             ProgressPhoto.user_id == current_user.id,
             ProgressPhoto.date >= start_date
-        )\
-        .order_by(ProgressPhoto.date.desc())\
-        .all()
+        )
+        .order_by(ProgressPhoto.date.desc())
+    )).all()
     
     # Get achievements
-    achievements = db.query(UserAchievement)\
-        .filter(
+    achievements = (await db.scalars(
+        select(UserAchievement)
+        .options(selectinload(UserAchievement.achievement))
+        .where(
             UserAchievement.user_id == current_user.id,
             UserAchievement.earned_date >= start_date
-        )\
-        .order_by(UserAchievement.earned_date.desc())\
-        .all()
+        )
+        .order_by(UserAchievement.earned_date.desc())
+    )).all()
     
     # Get performance metrics
-    metrics = db.query(PerformanceMetric)\
-        .filter(
+    metrics = (await db.scalars(
+        select(PerformanceMetric)
+        .where(
             PerformanceMetric.user_id == current_user.id,
             PerformanceMetric.date >= start_date
-        )\
-        .order_by(PerformanceMetric.date.desc())\
-        .all()
+        )
+        .order_by(PerformanceMetric.date.desc())
+    )).all()
     
     # Calculate summary statistics
     stats = {
@@ -1,59 +1,169 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import select, insert, exists
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
 
-from ..database.database import get_db
-from ..models.social import Challenge, ChallengeActivity, Post, PostLike, PostComment
+from ..crud.base import NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..database.database import get_async_db, get_async_read_db
+from ..models.social import (
+    Challenge,
+    ChallengeActivity,
+    Post,
+    PostLike,
+    PostComment,
+    friendship,
+    challenge_participants
+)
 from ..models.user import User
 from ..schemas.social import (
     ChallengeCreate,
     ChallengeResponse,
     ChallengeActivityCreate,
+    ChallengeActivityBatch,
+    ChallengeActivityBatchResponse,
     PostCreate,
     PostResponse,
     CommentCreate,
     CommentResponse,
+    FriendSuggestion,
+    LeaderboardEntry,
     UserResponse
 )
+from ..services.challenge_activity import ChallengeActivityService
+from ..services.counters import post_counters
+from ..services.friend_graph import FriendGraphService
+from ..services.hydration import SocialHydrator
+from ..services.leaderboard import LeaderboardService, Standing
+from ..services.realtime import author_channel, challenge_channel, realtime_hub
+from ..services.timeline import TimelineService, backfill_friendship
 from ..utils.auth import get_current_user
+from ..utils.user_cache import UserSnapshot
 
 router = APIRouter()
 
+async def _is_participant(db: AsyncSession, challenge_id: int, user_id: int) -> bool:
+    return await db.scalar(
+        select(exists().where(
+            challenge_participants.c.challenge_id == challenge_id,
+            challenge_participants.c.user_id == user_id
+        ))
+    )
+
+async def _load_challenge(db: AsyncSession, challenge_id: int) -> Optional[Challenge]:
+    return await db.scalar(
+        select(Challenge)
+        .options(selectinload(Challenge.participants))
+        .where(Challenge.id == challenge_id)
+    )
+
+async def _leaderboard_entries(db: AsyncSession, standings: List[Standing]) -> List[LeaderboardEntry]:
+    usernames = dict((await db.execute(
+        select(User.id, User.username).where(User.id.in_([user_id for _, user_id, _ in standings]))
+    )).all()) if standings else {}
+    return [
+        LeaderboardEntry(rank=rank, user_id=user_id, username=usernames.get(user_id, ""), total=total)
+        for rank, user_id, total in standings
+    ]
+
+async def _publish_total(db: AsyncSession, challenge_id: int, user_id: int, total: int):
+    """Push a committed leaderboard total to the challenge's participants."""
+    await realtime_hub.publish(challenge_channel(challenge_id), {
+        "type": "leaderboard.updated",
+        "challenge_id": challenge_id,
+        "user_id": user_id,
+        "total": total,
+        "rank": await LeaderboardService(db).rank(challenge_id, user_id)
+    })
+
+async def _post_author(db: AsyncSession, post_id: int) -> Optional[int]:
+    """The post's author id, or None if there is no such post."""
+    return await db.scalar(select(Post.user_id).where(Post.id == post_id))
+
+async def _insert_like(db: AsyncSession, post_id: int, user_id: int) -> bool:
+    """Insert the like unless it exists, in one statement; True if it was new."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        like_id = await db.scalar(
+            dialect_insert(PostLike)
+            .values(post_id=post_id, user_id=user_id)
+            .on_conflict_do_nothing(index_elements=["post_id", "user_id"])
+            .returning(PostLike.id)
+        )
+        return like_id is not None
+    try:
+        async with db.begin_nested():
+            await db.execute(insert(PostLike).values(post_id=post_id, user_id=user_id))
+        return True
+    except IntegrityError:
+        return False
+
 # Friend system endpoints
 @router.post("/friends/request/{user_id}", response_model=UserResponse)
 async def send_friend_request(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot send friend request to yourself")
-    
-    friend = db.query(User).filter(User.id == user_id).first()
+
+    friend = await db.get(User, user_id)
     if not friend:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    if friend in current_user.friends:
+
+    graph = FriendGraphService(db)
+    if await graph.is_friend(current_user.id, user_id):
         raise HTTPException(status_code=400, detail="Already friends with this user")
-    
-    current_user.friends.append(friend)
-    db.commit()
+
+    try:
+        await graph.add_friend(current_user.id, user_id)
+        await db.commit()
+    except IntegrityError:
+        # Made in another worker since this one cached the friend set
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Already friends with this user")
+    background_tasks.add_task(backfill_friendship, current_user.id, user_id)
     return friend
 
 @router.get("/friends", response_model=List[UserResponse])
 async def get_friends(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    result = await db.scalars(
+        select(User)
+        .join(friendship, friendship.c.friend_id == User.id)
+        .where(friendship.c.user_id == current_user.id)
+    )
+    return result.all()
+
+@router.get("/friends/suggestions", response_model=List[FriendSuggestion])
+async def get_friend_suggestions(
+    limit: int = Query(10, ge=1, le=50),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    return current_user.friends
+    """People followed by the people you follow, most mutual friends first."""
+    suggestions = await FriendGraphService(db).suggestions(current_user.id, limit=limit)
+    users = await SocialHydrator(db).users.load_many(user_id for user_id, _ in suggestions)
+    return [
+        FriendSuggestion(user=users[user_id], mutual_friends=mutual)
+        for user_id, mutual in suggestions
+        if users.get(user_id) is not None
+    ]
 
 # Challenge endpoints
 @router.post("/challenges", response_model=ChallengeResponse)
 async def create_challenge(
     challenge: ChallengeCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_challenge = Challenge(
         name=challenge.name,
@@ -65,43 +175,55 @@ async def create_challenge(
         target_value=challenge.target_value,
         is_public=challenge.is_public
     )
-    db_challenge.participants.append(current_user)
     db.add(db_challenge)
-    db.commit()
-    db.refresh(db_challenge)
-    return db_challenge
+    await db.flush()
+    await db.execute(
+        insert(challenge_participants).values(
+            challenge_id=db_challenge.id,
+            user_id=current_user.id
+        )
+    )
+    await LeaderboardService(db).add_participant(db_challenge.id, current_user.id)
+    await db.commit()
+    return await _load_challenge(db, db_challenge.id)
 
 @router.post("/challenges/{challenge_id}/join")
 async def join_challenge(
     challenge_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    challenge = db.query(Challenge).filter(Challenge.id == challenge_id).first()
+    challenge = await db.get(Challenge, challenge_id)
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    
-    if current_user in challenge.participants:
+
+    if await _is_participant(db, challenge_id, current_user.id):
         raise HTTPException(status_code=400, detail="Already participating in this challenge")
-    
-    challenge.participants.append(current_user)
-    db.commit()
+
+    await db.execute(
+        insert(challenge_participants).values(
+            challenge_id=challenge_id,
+            user_id=current_user.id
+        )
+    )
+    await LeaderboardService(db).add_participant(challenge_id, current_user.id)
+    await db.commit()
     return {"message": "Successfully joined the challenge"}
 
 @router.post("/challenges/{challenge_id}/activity")
 async def log_challenge_activity(
     challenge_id: int,
     activity: ChallengeActivityCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    challenge = db.query(Challenge).filter(Challenge.id == challenge_id).first()
+    challenge = await db.get(Challenge, challenge_id)
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    
-    if current_user not in challenge.participants:
+
+    if not await _is_participant(db, challenge_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not participating in this challenge")
-    
+
     db_activity = ChallengeActivity(
         challenge_id=challenge_id,
         user_id=current_user.id,
@@ -109,16 +231,71 @@ async def log_challenge_activity(
         notes=activity.notes
     )
     db.add(db_activity)
-    db.commit()
-    db.refresh(db_activity)
+    total = await LeaderboardService(db).add_to_score(challenge_id, current_user.id, activity.value)
+    await db.commit()
+    await _publish_total(db, challenge_id, current_user.id, total)
+    await db.refresh(db_activity)
     return db_activity
 
+@router.post("/challenges/activity/batch", response_model=ChallengeActivityBatchResponse)
+async def log_challenge_activity_batch(
+    batch: ChallengeActivityBatch,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Record many activities across the user's challenges at once.
+
+    Each activity carries an `idempotency_key`; keys already recorded for the
+    user (say, a sync that is retried) are skipped and listed in `duplicates`.
+    """
+    created, duplicates, totals = await ChallengeActivityService(db).ingest(current_user.id, batch.activities)
+    await db.commit()
+
+    for challenge_id, total in totals.items():
+        await _publish_total(db, challenge_id, current_user.id, total)
+    return {"created": created, "duplicates": duplicates}
+
+@router.get("/challenges/{challenge_id}/leaderboard", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    challenge_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if not await db.get(Challenge, challenge_id):
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    return await _leaderboard_entries(db, await LeaderboardService(db).top(challenge_id, limit))
+
+@router.get("/challenges/{challenge_id}/leaderboard/me", response_model=List[LeaderboardEntry])
+async def get_leaderboard_around_me(
+    challenge_id: int,
+    radius: int = Query(5, ge=0, le=50),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    standings = await LeaderboardService(db).around(challenge_id, current_user.id, radius)
+    if not standings:
+        raise HTTPException(status_code=404, detail="Not participating in this challenge")
+    return await _leaderboard_entries(db, standings)
+
+@router.get("/challenges/{challenge_id}/leaderboard/friends", response_model=List[LeaderboardEntry])
+async def get_friends_leaderboard(
+    challenge_id: int,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if not await db.get(Challenge, challenge_id):
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    friend_ids = await FriendGraphService(db).friend_ids(current_user.id)
+    service = LeaderboardService(db)
+    return await _leaderboard_entries(db, await service.for_users(challenge_id, [current_user.id, *friend_ids]))
+
 # Social feed endpoints
 @router.post("/posts", response_model=PostResponse)
 async def create_post(
     post: PostCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_post = Post(
         user_id=current_user.id,
@@ -127,70 +304,99 @@ async def create_post(
         achievement_id=post.achievement_id
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    await db.flush()
+    await TimelineService(db).fan_out(db_post)
+    await db.commit()
+    await realtime_hub.publish(author_channel(current_user.id), {
+        "type": "post.created",
+        "post_id": db_post.id,
+        "user_id": current_user.id
+    })
+    await SocialHydrator(db).posts([db_post])
     return db_post
 
 @router.get("/feed", response_model=List[PostResponse])
 async def get_feed(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    # Get posts from friends and self
-    friend_ids = [friend.id for friend in current_user.friends]
-    friend_ids.append(current_user.id)
-    
-    posts = db.query(Post)\
-        .filter(Post.user_id.in_(friend_ids))\
-        .order_by(Post.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return posts
+    """Friends' and own posts, newest first.
+
+    Pass X-Next-Cursor back as `before` for older posts and X-Prev-Cursor as
+    `after` for posts newer than the page; either costs the same at any depth.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    feed_key = (Post.created_at, Post.id)
+    posts, has_more = await TimelineService(db).get_feed(
+        current_user.id,
+        limit=limit,
+        before=tuple(decode_cursor(before, feed_key)) if before else None,
+        after=tuple(decode_cursor(after, feed_key)) if after else None
+    )
+
+    if posts:
+        response.headers[PREV_CURSOR_HEADER] = encode_cursor([posts[0].created_at, posts[0].id])
+        # Paging forward from `after` always leaves older posts behind
+        if has_more or after:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([posts[-1].created_at, posts[-1].id])
+    elif after:
+        # Nothing newer yet; poll again from the same place
+        response.headers[PREV_CURSOR_HEADER] = after
+    return await SocialHydrator(db).posts(posts)
 
 @router.post("/posts/{post_id}/like")
 async def like_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    author_id = await _post_author(db, post_id)
+    if author_id is None:
         raise HTTPException(status_code=404, detail="Post not found")
-    
-    existing_like = db.query(PostLike)\
-        .filter(PostLike.post_id == post_id, PostLike.user_id == current_user.id)\
-        .first()
-    
-    if existing_like:
+
+    if not await _insert_like(db, post_id, current_user.id):
         raise HTTPException(status_code=400, detail="Already liked this post")
-    
-    like = PostLike(post_id=post_id, user_id=current_user.id)
-    post.likes_count += 1
-    db.add(like)
-    db.commit()
+
+    await post_counters.increment(db, post_id, "likes_count")
+    await db.commit()
+    await realtime_hub.publish(author_channel(author_id), {
+        "type": "post.liked",
+        "post_id": post_id,
+        "user_id": current_user.id,
+        "delta": 1
+    })
     return {"message": "Post liked successfully"}
 
 @router.post("/posts/{post_id}/comment", response_model=CommentResponse)
 async def comment_on_post(
     post_id: int,
     comment: CommentCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    author_id = await _post_author(db, post_id)
+    if author_id is None:
         raise HTTPException(status_code=404, detail="Post not found")
-    
+
     db_comment = PostComment(
         post_id=post_id,
         user_id=current_user.id,
         content=comment.content
     )
-    post.comments_count += 1
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    return db_comment
\ No newline at end of file
+    await post_counters.increment(db, post_id, "comments_count")
+    await db.commit()
+    await realtime_hub.publish(author_channel(author_id), {
+        "type": "post.commented",
+        "post_id": post_id,
+        "comment_id": db_comment.id,
+        "user_id": current_user.id,
+        "delta": 1
+    })
+    await SocialHydrator(db).comments([db_comment])
+    return db_comment
@@ -5,7 +5,6 @@ from datetime import datetime, timedelta
 
 from ..database.database import get_db
 from ..models.workout_planning import WorkoutTemplate, ScheduledWorkout, WorkoutReminder
-from ..models.user import User
 from ..schemas.workout_planning import (
     WorkoutTemplateCreate,
     WorkoutTemplateResponse,
@@ -15,6 +14,7 @@ from ..schemas.workout_planning import (
     ReminderResponse
 )
 from ..utils.auth import get_current_user
+from ..utils.user_cache import UserSnapshot
 # from ..services.reminder_service import schedule_reminder  # TODO: Implement reminder service
 
 router = APIRouter()
@@ -23,7 +23,7 @@ router = APIRouter()
 @router.post("/templates", response_model=WorkoutTemplateResponse)
 async def create_workout_template(
     template: WorkoutTemplateCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     db_template = WorkoutTemplate(
@@ -50,7 +50,7 @@ async def get_workout_templates(
     category: Optional[str] = None,
     difficulty: Optional[str] = None,
     include_public: bool = True,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     query = db.query(WorkoutTemplate)
@@ -74,7 +74,7 @@ async def get_workout_templates(
 @router.post("/schedule", response_model=ScheduledWorkoutResponse)
 async def schedule_workout(
     workout: ScheduledWorkoutCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Create the scheduled workout
@@ -107,7 +107,7 @@ async def get_scheduled_workouts(
     start_date: datetime = Query(None),
     end_date: datetime = Query(None),
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     query = db.query(ScheduledWorkout).filter(ScheduledWorkout.user_id == current_user.id)
@@ -124,7 +124,7 @@ async def get_scheduled_workouts(
 @router.put("/schedule/{workout_id}/complete")
 async def complete_workout(
     workout_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     workout = db.query(ScheduledWorkout).filter(
@@ -145,7 +145,7 @@ async def complete_workout(
 async def reschedule_workout(
     workout_id: int,
     new_date: datetime,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     workout = db.query(ScheduledWorkout).filter(
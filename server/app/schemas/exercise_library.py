@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 
 class MuscleBase(BaseModel):
@@ -60,6 +60,31 @@ class Exercise(ExerciseBase):
     class Config:
         orm_mode = True
 
+class ExerciseImportError(BaseModel):
+    line: int
+    error: str
+
+class ExerciseImportResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[ExerciseImportError]
+
+class ExerciseSuggestion(BaseModel):
+    id: int
+    name: str
+
+class FacetValue(BaseModel):
+    value: Union[int, str]
+    name: str
+    count: int
+
+class ExerciseFacets(BaseModel):
+    total: int
+    category: List[FacetValue]
+    difficulty: List[FacetValue]
+    equipment: List[FacetValue]
+    muscle: List[FacetValue]
+
 class ExerciseProgressBase(BaseModel):
     exercise_id: int
     weight: Optional[float] = None
@@ -85,5 +110,34 @@ class ExerciseProgress(ExerciseProgressBase):
     class Config:
         orm_mode = True
 
+class PersonalRecord(BaseModel):
+    exercise_id: int
+    record_type: str
+    weight: float  # Load of a reps record, 0 otherwise
+    value: float
+    progress_id: Optional[int] = None
+    achieved_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class PersonalRecordBoardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    value: float
+    achieved_at: datetime
+
+class ExerciseSubstitute(BaseModel):
+    score: float  # Similarity to the original, 0-1
+    exercise: Exercise
+
+class ProgressPoint(BaseModel):
+    date: datetime  # The log's time, or the start of its day/week/month
+    max_weight: Optional[float] = None
+    volume: float
+    best_e1rm: Optional[float] = None
+    logs: int
+
 # Update forward references
 Exercise.update_forward_refs()
\ No newline at end of file
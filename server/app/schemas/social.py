@@ -2,15 +2,21 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
+from app.core.config import settings
+
 class UserResponse(BaseModel):
     id: int
     username: str
-    profile_picture: Optional[str]
-    bio: Optional[str]
+    profile_picture: Optional[str] = None
+    bio: Optional[str] = None
 
     class Config:
         orm_mode = True
 
+class FriendSuggestion(BaseModel):
+    user: UserResponse
+    mutual_friends: int
+
 class ChallengeCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
@@ -39,15 +45,52 @@ class ChallengeActivityResponse(ChallengeActivityCreate):
     challenge_id: int
     user_id: int
     activity_date: datetime
+    idempotency_key: Optional[str] = None
 
     class Config:
         orm_mode = True
 
+class ChallengeActivityBatchItem(ChallengeActivityCreate):
+    challenge_id: int
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+    activity_date: Optional[datetime] = None
+
+class ChallengeActivityBatch(BaseModel):
+    # Checked before any item is validated, so oversized batches fail fast
+    activities: List[ChallengeActivityBatchItem] = Field(
+        ..., min_length=1, max_length=settings.challenge_activity_batch_max
+    )
+
+class ChallengeActivityBatchResponse(BaseModel):
+    created: List[ChallengeActivityResponse]
+    duplicates: List[str]
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    total: int
+
 class PostCreate(BaseModel):
     content: str = Field(..., min_length=1, max_length=500)
     workout_id: Optional[int]
     achievement_id: Optional[int]
 
+class PostWorkout(BaseModel):
+    id: int
+    name: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class PostAchievement(BaseModel):
+    id: int
+    title: Optional[str] = None
+    icon: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
 class PostResponse(PostCreate):
     id: int
     user_id: int
@@ -55,6 +98,8 @@ class PostResponse(PostCreate):
     likes_count: int
     comments_count: int
     user: UserResponse
+    workout: Optional[PostWorkout] = None
+    achievement: Optional[PostAchievement] = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,294 @@
+"""Exercise catalog snapshot
+
+The exercise library (exercises with their equipment, muscles and
+variations, plus the equipment and muscle lists) changes only when someone
+adds an exercise or uploads a video, yet it backs some of the most loaded
+screens. Each worker therefore keeps one serialised snapshot of it and
+answers list requests from memory: filters and pages are cut from the
+snapshot, and each distinct response body is rendered to JSON once and
+reused together with its ETag.
+
+Writes in this worker bump the catalog version, which makes the next
+request rebuild the snapshot; other workers rebuild after
+`catalog_cache_seconds`. Rebuilds always read the primary, since a replica
+may not have the write that caused them yet, and only one runs at a time:
+concurrent requests wait for it rather than each building their own.
+Serialising the rows and rendering bodies run in the threadpool so they
+don't hold up the event loop, and so do the indexes derived from a snapshot
+(see `CatalogCache.derived`).
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.exercise_library import Equipment, Exercise, Muscle
+from app.schemas.exercise_library import (
+    Equipment as EquipmentSchema,
+    Exercise as ExerciseSchema,
+    Muscle as MuscleSchema
+)
+from app.utils.http_cache import etag_for
+
+logger = logging.getLogger(__name__)
+
+# Rendered bodies kept per snapshot (one per filter/page combination)
+MAX_RENDERED_RESPONSES = 512
+
+def _dump(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+def _serialise(schema, rows) -> List[dict]:
+    return [schema.model_validate(row, from_attributes=True).model_dump(mode="json") for row in rows]
+
+def exercise_load_options():
+    """Eager-load everything the Exercise schema serialises, including nested variations."""
+    return (
+        selectinload(Exercise.equipment),
+        selectinload(Exercise.muscles),
+        selectinload(Exercise.variations, recursion_depth=-1).options(
+            selectinload(Exercise.equipment),
+            selectinload(Exercise.muscles)
+        )
+    )
+
+class CatalogSnapshot:
+    def __init__(self, version: int, exercises: List[dict], equipment: List[dict], muscles: List[dict]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.exercises = sorted(exercises, key=lambda exercise: exercise["id"])
+        self.equipment = equipment
+        self.muscles = muscles
+        self._exercise_ids = [exercise["id"] for exercise in self.exercises]
+        self._equipment_ids = [{item["id"] for item in exercise["equipment"]} for exercise in self.exercises]
+        self._muscle_ids = [{item["id"] for item in exercise["muscles"]} for exercise in self.exercises]
+        self._lock = threading.Lock()
+        self._derive_lock = threading.Lock()
+        self._derived: Dict[str, Any] = {}
+        self._rendered: "OrderedDict[Hashable, Tuple[bytes, str, Dict[str, str]]]" = OrderedDict()
+        self.render_hits = 0
+        self.render_misses = 0
+
+    def matches(
+        self,
+        index: int,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        muscle_id: Optional[int] = None,
+        created_by: Optional[int] = None
+    ) -> bool:
+        """Whether the exercise at `index` passes the list filters."""
+        exercise = self.exercises[index]
+        if category and exercise["category"] != category:
+            return False
+        if difficulty and exercise["difficulty_level"] != difficulty:
+            return False
+        if equipment_id and equipment_id not in self._equipment_ids[index]:
+            return False
+        if muscle_id and muscle_id not in self._muscle_ids[index]:
+            return False
+        if created_by is not None and exercise["created_by"] != created_by:
+            return False
+        return True
+
+    def exercise(self, exercise_id: int) -> Optional[dict]:
+        index = bisect_left(self._exercise_ids, exercise_id)
+        if index < len(self._exercise_ids) and self._exercise_ids[index] == exercise_id:
+            return self.exercises[index]
+        return None
+
+    def derived(self, name: str, factory: Callable[["CatalogSnapshot"], Any]) -> Any:
+        """A structure computed from this snapshot (e.g. a search index),
+        built on first use and dropped together with the snapshot."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._derive_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = factory(self)
+        return value
+
+    def exercises_page(
+        self,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        muscle_id: Optional[int] = None,
+        created_by: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[dict], Optional[int]]:
+        """Matching exercises by id, after `after_id`, and the id to continue
+        from when `limit` cut the page short."""
+        start = bisect_right(self._exercise_ids, after_id) if after_id is not None else 0
+        page: List[dict] = []
+        for index in range(start, len(self.exercises)):
+            if not self.matches(index, category, difficulty, equipment_id, muscle_id, created_by):
+                continue
+            exercise = self.exercises[index]
+            if limit is not None and len(page) == limit:
+                return page, page[-1]["id"]
+            page.append(exercise)
+        return page, None
+
+    async def render(self, key: Hashable, build: Callable[[], Any]) -> Tuple[bytes, str, Dict[str, str]]:
+        """JSON body, ETag and extra headers for `key`, built and serialised
+        only once (in the threadpool). `build` returns the data, or
+        (data, headers)."""
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                self.render_hits += 1
+                return rendered
+
+        def build_body():
+            built = build()
+            data, headers = built if isinstance(built, tuple) else (built, {})
+            body = _dump(data)
+            return body, etag_for(body), headers
+
+        rendered = await run_in_threadpool(build_body)
+        with self._lock:
+            self.render_misses += 1
+            self._rendered[key] = rendered
+            while len(self._rendered) > MAX_RENDERED_RESPONSES:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1),
+            "exercises": len(self.exercises),
+            "equipment": len(self.equipment),
+            "muscles": len(self.muscles),
+            "rendered_responses": len(self._rendered),
+            "render_hits": self.render_hits,
+            "render_misses": self.render_misses,
+        }
+
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._build_lock: Optional[asyncio.Lock] = None
+        self._build_loop = None
+        self.builds = 0
+        # name -> the most recently built structure, whatever its snapshot
+        self._latest: Dict[str, Any] = {}
+        # name -> (event loop, snapshot, task) of the build in progress
+        self._deriving: Dict[str, Tuple[Any, CatalogSnapshot, "asyncio.Task"]] = {}
+
+    def invalidate(self):
+        """Call after committing a catalog change."""
+        with self._lock:
+            self._version += 1
+
+    def _current(self) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            return None
+        if time.monotonic() - snapshot.loaded_at > settings.catalog_cache_seconds:
+            return None
+        return snapshot
+
+    def _lock_for_loop(self) -> asyncio.Lock:
+        # asyncio locks belong to one event loop (tests run several)
+        loop = asyncio.get_running_loop()
+        if self._build_lock is None or self._build_loop is not loop:
+            self._build_lock, self._build_loop = asyncio.Lock(), loop
+        return self._build_lock
+
+    async def get(self) -> CatalogSnapshot:
+        snapshot = self._current()
+        if snapshot is not None:
+            return snapshot
+        async with self._lock_for_loop():
+            # Someone else may have built it while we waited
+            snapshot = self._current()
+            if snapshot is not None:
+                return snapshot
+            return await self._build()
+
+    async def _build(self) -> CatalogSnapshot:
+        # Tag with the version seen before reading, so a change committed
+        # mid-build still invalidates what this build produces
+        version = self._version
+        async with AsyncSessionLocal() as db:
+            exercises = (await db.scalars(select(Exercise).options(*exercise_load_options()))).all()
+            equipment = (await db.scalars(select(Equipment).order_by(Equipment.id))).all()
+            muscles = (await db.scalars(select(Muscle).order_by(Muscle.id))).all()
+        # Everything is loaded eagerly, so serialising touches no lazy loads
+        snapshot = await run_in_threadpool(
+            lambda: CatalogSnapshot(
+                version,
+                _serialise(ExerciseSchema, exercises),
+                _serialise(EquipmentSchema, equipment),
+                _serialise(MuscleSchema, muscles)
+            )
+        )
+        with self._lock:
+            self.builds += 1
+            if self._version == version:
+                self._snapshot = snapshot
+        return snapshot
+
+    async def derived(self, name: str, factory: Callable[[CatalogSnapshot], Any]) -> Any:
+        """`factory(snapshot)` for the current snapshot, built in the
+        threadpool and only once however many requests ask for it.
+
+        While a newer snapshot's build is running, the structure built from
+        the previous snapshot keeps being served; only the very first build
+        is waited for.
+        """
+        snapshot = await self.get()
+        value = snapshot._derived.get(name)
+        if value is not None:
+            return value
+        loop = asyncio.get_running_loop()
+        building = self._deriving.get(name)
+        if building is None or building[0] is not loop or building[1] is not snapshot:
+            task = loop.create_task(self._derive(snapshot, name, factory))
+            self._deriving[name] = (loop, snapshot, task)
+        else:
+            task = building[2]
+        previous = self._latest.get(name)
+        if previous is not None:
+            return previous
+        return await asyncio.shield(task)
+
+    async def _derive(self, snapshot: CatalogSnapshot, name: str, factory: Callable[[CatalogSnapshot], Any]) -> Any:
+        try:
+            value = await run_in_threadpool(snapshot.derived, name, factory)
+        except Exception:
+            logger.exception("Building %s for catalog version %d failed", name, snapshot.version)
+            raise
+        finally:
+            if self._deriving.get(name, (None, None))[1] is snapshot:
+                del self._deriving[name]
+        self._latest[name] = value
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._current()
+        return {
+            "version": self._version,
+            "builds": self.builds,
+            "snapshot": snapshot.stats() if snapshot else None,
+        }
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.social import Challenge, ChallengeActivity, challenge_participants
+from app.schemas.social import ChallengeActivityBatchItem
+from app.services.leaderboard import LeaderboardService
+
+class ChallengeActivityService:
+    """Batch ingestion of challenge activity, e.g. a wearable's nightly sync."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def check_participation(self, user_id: int, challenge_ids: Sequence[int]):
+        """404 for unknown challenges, 403 for ones the user hasn't joined; one query."""
+        rows = await self.db.execute(
+            select(Challenge.id, challenge_participants.c.user_id)
+            .outerjoin(
+                challenge_participants,
+                and_(
+                    challenge_participants.c.challenge_id == Challenge.id,
+                    challenge_participants.c.user_id == user_id
+                )
+            )
+            .where(Challenge.id.in_(set(challenge_ids)))
+        )
+        joined = {challenge_id: participant is not None for challenge_id, participant in rows}
+        missing = sorted(set(challenge_ids) - joined.keys())
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Challenges not found: {missing}")
+        not_joined = sorted(challenge_id for challenge_id, member in joined.items() if not member)
+        if not_joined:
+            raise HTTPException(status_code=403, detail=f"Not participating in challenges: {not_joined}")
+
+    async def _insert_new(self, rows: List[dict]) -> List[ChallengeActivity]:
+        """Insert rows whose (user_id, idempotency_key) is new, in one statement."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            result = await self.db.scalars(
+                dialect_insert(ChallengeActivity)
+                .on_conflict_do_nothing(index_elements=["user_id", "idempotency_key"])
+                .returning(ChallengeActivity),
+                rows
+            )
+            return result.all()
+        existing = set((await self.db.scalars(
+            select(ChallengeActivity.idempotency_key).where(
+                ChallengeActivity.user_id == rows[0]["user_id"],
+                ChallengeActivity.idempotency_key.in_([row["idempotency_key"] for row in rows])
+            )
+        )).all())
+        rows = [row for row in rows if row["idempotency_key"] not in existing]
+        if not rows:
+            return []
+        result = await self.db.scalars(insert(ChallengeActivity).returning(ChallengeActivity), rows)
+        return result.all()
+
+    async def ingest(
+        self,
+        user_id: int,
+        items: Sequence[ChallengeActivityBatchItem]
+    ) -> Tuple[List[ChallengeActivity], List[str], Dict[int, int]]:
+        """Record a batch of the user's activities in the caller's transaction.
+
+        Returns the rows created, the idempotency keys skipped as already
+        recorded (in this batch or an earlier one), and the user's new
+        leaderboard total for each challenge that changed.
+        """
+        await self.check_participation(user_id, [item.challenge_id for item in items])
+
+        now = datetime.utcnow()
+        rows: Dict[str, dict] = {}
+        for item in items:
+            if item.idempotency_key in rows:
+                continue
+            rows[item.idempotency_key] = {
+                "challenge_id": item.challenge_id,
+                "user_id": user_id,
+                "value": item.value,
+                "notes": item.notes,
+                "activity_date": item.activity_date or now,
+                "idempotency_key": item.idempotency_key,
+            }
+        created = await self._insert_new(list(rows.values()))
+
+        created_keys = {activity.idempotency_key for activity in created}
+        duplicates, seen = [], set()
+        for item in items:
+            if item.idempotency_key in seen or item.idempotency_key not in created_keys:
+                duplicates.append(item.idempotency_key)
+            seen.add(item.idempotency_key)
+
+        added: Dict[int, int] = defaultdict(int)
+        for activity in created:
+            added[activity.challenge_id] += activity.value
+        leaderboard = LeaderboardService(self.db)
+        totals = {
+            challenge_id: await leaderboard.add_to_score(challenge_id, user_id, value)
+            for challenge_id, value in added.items()
+        }
+        return created, duplicates, totals
@@ -0,0 +1,105 @@
+"""Facet counts for the exercise library filters
+
+Each facet value (a category, a difficulty, an equipment or muscle id) gets
+a bitmap, stored as a Python int, with bit i set when the snapshot's i-th
+exercise has that value. Counting a facet under the applied filters is then
+an AND of a few bitmaps and a popcount per value, with no exercises
+materialised. The bitmaps are built once per catalog snapshot, in the
+threadpool, with the previous snapshot's bitmaps answering meanwhile.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.services.catalog import CatalogSnapshot, catalog_cache
+
+FACETS = ("category", "difficulty", "equipment", "muscle")
+
+# int.bit_count is Python 3.10+
+_popcount = getattr(int, "bit_count", None) or (lambda bits: bin(bits).count("1"))
+
+def _bitmap(indexes: List[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for index in indexes:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, "little")
+
+class FacetIndex:
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        size = len(snapshot.exercises)
+        self.all = (1 << size) - 1
+        # Collect indexes first: OR-ing bits into a large int one at a
+        # time would copy it for every exercise
+        members: Dict[str, Dict[Any, List[int]]] = {
+            facet: defaultdict(list) for facet in FACETS + ("created_by",)
+        }
+        for index, exercise in enumerate(snapshot.exercises):
+            members["category"][exercise["category"]].append(index)
+            members["difficulty"][exercise["difficulty_level"]].append(index)
+            members["created_by"][exercise["created_by"]].append(index)
+            for item in exercise["equipment"]:
+                members["equipment"][item["id"]].append(index)
+            for item in exercise["muscles"]:
+                members["muscle"][item["id"]].append(index)
+        self.bitmaps = {
+            facet: {value: _bitmap(indexes, size) for value, indexes in values.items()}
+            for facet, values in members.items()
+        }
+
+    @classmethod
+    def for_snapshot(cls, snapshot: CatalogSnapshot) -> "FacetIndex":
+        return snapshot.derived("facets", cls)
+
+    @classmethod
+    async def current(cls) -> "FacetIndex":
+        """The index for the current catalog, without blocking the loop."""
+        return await catalog_cache.derived("facets", cls)
+
+    def _values(self, facet: str) -> List[Dict[str, Any]]:
+        """Every value of a facet, in the order the filters list them."""
+        if facet == "equipment":
+            return [{"value": item["id"], "name": item["name"]} for item in self.snapshot.equipment]
+        if facet == "muscle":
+            return [{"value": item["id"], "name": item["name"]} for item in self.snapshot.muscles]
+        return [{"value": value, "name": value} for value in sorted(self.bitmaps[facet], key=str) if value is not None]
+
+    def counts(
+        self,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        muscle_id: Optional[int] = None,
+        created_by: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Matching exercises per facet value under the applied filters.
+
+        A facet's counts ignore that facet's own filter, so picking "cardio"
+        still shows how many exercises the other categories would give.
+        """
+        applied = {"category": category, "difficulty": difficulty, "equipment": equipment_id, "muscle": muscle_id}
+        masks = {
+            facet: self.bitmaps[facet].get(value, 0)
+            for facet, value in applied.items()
+            if value
+        }
+        base = self.all
+        if created_by is not None:
+            base &= self.bitmaps["created_by"].get(created_by, 0)
+
+        result: Dict[str, Any] = {}
+        for facet in FACETS:
+            others = base
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            bitmaps = self.bitmaps[facet]
+            result[facet] = [
+                {**value, "count": _popcount(others & bitmaps.get(value["value"], 0))}
+                for value in self._values(facet)
+            ]
+        total = base
+        for mask in masks.values():
+            total &= mask
+        result["total"] = _popcount(total)
+        return result
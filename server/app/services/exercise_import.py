@@ -0,0 +1,207 @@
+"""Creating custom exercises, one at a time or imported in bulk
+
+Equipment, muscle and parent-exercise ids are checked with one IN query per
+kind, and exercises are written with their exercise_equipment and
+exercise_muscles rows as three multi-row inserts, whatever the count.
+
+Imports (CSV or NDJSON) are read a line at a time and handled in chunks of
+`exercise_import_chunk_size` rows, each committed on its own: a bad row is
+reported with its line number and skipped, and never holds up the rest.
+Reading and parsing each chunk runs in the threadpool, off the event loop.
+
+CSV columns are the ExerciseCreate fields; `equipment_ids` and `muscle_ids`
+are semicolon-separated ids, and a muscle id may be marked primary with
+":primary" (e.g. "4:primary;7"). NDJSON lines are ExerciseCreate objects.
+"""
+
+import codecs
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.models.exercise_library import Equipment, Exercise, Muscle, exercise_equipment, exercise_muscles
+from app.schemas.exercise_library import ExerciseCreate
+
+# (line number, parsed row or the reason it couldn't be parsed)
+ParsedRow = Tuple[int, Any]
+
+def _muscle_links(exercise: ExerciseCreate) -> Dict[int, bool]:
+    """muscle id -> is_primary; malformed entries raise ValueError."""
+    links = {}
+    for entry in exercise.muscle_ids:
+        try:
+            links[int(entry["muscle_id"])] = bool(entry.get("is_primary", False))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"muscle_ids entries need a muscle_id: {entry!r}")
+    return links
+
+def decode_lines(binary_lines: Iterable[bytes]) -> Iterator[str]:
+    """Text lines, line endings kept, from an uploaded file's byte lines.
+
+    Iterates the file rather than wrapping it in io.TextIOWrapper: before
+    Python 3.11 the SpooledTemporaryFile behind an UploadFile lacks the
+    readable()/readinto() a wrapper needs.
+    """
+    return codecs.iterdecode(binary_lines, "utf-8-sig", errors="replace")
+
+def _split_ids(value: str) -> List[str]:
+    return [part.strip() for part in value.split(";") if part.strip()]
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        line = reader.line_num
+        try:
+            data: Dict[str, Any] = {key: value for key, value in row.items() if key and value not in (None, "")}
+            data["equipment_ids"] = [int(part) for part in _split_ids(data.get("equipment_ids", ""))]
+            muscles = []
+            for part in _split_ids(data.get("muscle_ids", "")):
+                muscle_id, _, flag = part.partition(":")
+                muscles.append({"muscle_id": int(muscle_id), "is_primary": flag.strip().lower() == "primary"})
+            data["muscle_ids"] = muscles
+        except ValueError as error:
+            yield line, f"Bad id list: {error}"
+            continue
+        yield line, data
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError as error:
+            yield line, f"Invalid JSON: {error}"
+            continue
+        yield line, data if isinstance(data, dict) else "Expected a JSON object"
+
+def _validation_messages(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
+
+class ExerciseImporter:
+    def __init__(self, db: AsyncSession, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        # Ids already confirmed to exist, so later chunks don't ask again
+        self._known: Dict[Any, Set[int]] = {Equipment: set(), Muscle: set(), Exercise: set()}
+        self.created_ids: List[int] = []
+
+    async def _existing(self, model, ids: Set[int]) -> Set[int]:
+        known = self._known[model]
+        wanted = ids - known
+        if wanted:
+            known.update((await self.db.scalars(select(model.id).where(model.id.in_(wanted)))).all())
+        return ids & known
+
+    async def unknown_references(self, exercises: Sequence[ExerciseCreate]) -> List[Optional[str]]:
+        """Per exercise, a message naming the equipment, muscle or parent
+        ids that don't exist, or None when they all do."""
+        links = []
+        for exercise in exercises:
+            try:
+                links.append(_muscle_links(exercise))
+            except ValueError as error:
+                links.append(str(error))
+        equipment = await self._existing(Equipment, {i for exercise in exercises for i in exercise.equipment_ids})
+        muscles = await self._existing(Muscle, {i for link in links if isinstance(link, dict) for i in link})
+        parents = await self._existing(
+            Exercise, {exercise.parent_exercise_id for exercise in exercises if exercise.parent_exercise_id}
+        )
+
+        problems: List[Optional[str]] = []
+        for exercise, link in zip(exercises, links):
+            if isinstance(link, str):
+                problems.append(link)
+                continue
+            messages = []
+            missing = sorted(set(exercise.equipment_ids) - equipment)
+            if missing:
+                messages.append(f"Unknown equipment ids: {missing}")
+            missing = sorted(set(link) - muscles)
+            if missing:
+                messages.append(f"Unknown muscle ids: {missing}")
+            if exercise.parent_exercise_id and exercise.parent_exercise_id not in parents:
+                messages.append(f"Unknown parent exercise id: {exercise.parent_exercise_id}")
+            problems.append("; ".join(messages) or None)
+        return problems
+
+    async def insert(self, exercises: Sequence[ExerciseCreate]) -> List[int]:
+        """Insert exercises whose references were checked, with their links,
+        in the caller's transaction. Returns their ids in order."""
+        if not exercises:
+            return []
+        rows = [
+            {
+                **exercise.dict(exclude={"equipment_ids", "muscle_ids"}),
+                "video_url": str(exercise.video_url) if exercise.video_url else None,
+                "thumbnail_url": str(exercise.thumbnail_url) if exercise.thumbnail_url else None,
+                "created_by": self.user_id,
+                "is_custom": True,
+            }
+            for exercise in exercises
+        ]
+        ids = (await self.db.scalars(
+            insert(Exercise).returning(Exercise.id, sort_by_parameter_order=True), rows
+        )).all()
+        self._known[Exercise].update(ids)
+        self.created_ids.extend(ids)
+
+        equipment_rows = [
+            {"exercise_id": exercise_id, "equipment_id": equipment_id}
+            for exercise_id, exercise in zip(ids, exercises)
+            for equipment_id in dict.fromkeys(exercise.equipment_ids)
+        ]
+        muscle_rows = [
+            {"exercise_id": exercise_id, "muscle_id": muscle_id, "is_primary": is_primary}
+            for exercise_id, exercise in zip(ids, exercises)
+            for muscle_id, is_primary in _muscle_links(exercise).items()
+        ]
+        if equipment_rows:
+            await self.db.execute(insert(exercise_equipment), equipment_rows)
+        if muscle_rows:
+            await self.db.execute(insert(exercise_muscles), muscle_rows)
+        return list(ids)
+
+    async def _import_chunk(self, chunk: List[ParsedRow], errors: List[dict]) -> int:
+        valid: List[Tuple[int, ExerciseCreate]] = []
+        for line, data in chunk:
+            if isinstance(data, str):
+                errors.append({"line": line, "error": data})
+                continue
+            try:
+                valid.append((line, ExerciseCreate(**data)))
+            except ValidationError as error:
+                errors.append({"line": line, "error": _validation_messages(error)})
+
+        problems = await self.unknown_references([exercise for _, exercise in valid])
+        accepted = []
+        for (line, exercise), problem in zip(valid, problems):
+            if problem:
+                errors.append({"line": line, "error": problem})
+            else:
+                accepted.append(exercise)
+        await self.insert(accepted)
+        await self.db.commit()
+        return len(accepted)
+
+    async def import_rows(self, rows: Iterable[ParsedRow], chunk_size: int) -> Dict[str, Any]:
+        """Create every valid row, a chunk per transaction; returns how many
+        were created and an error per rejected line."""
+        created, errors = 0, []
+        rows = iter(rows)
+        while True:
+            # Parsing (and reading the upload) happens as the chunk is taken
+            chunk = await run_in_threadpool(lambda: list(islice(rows, chunk_size)))
+            if not chunk:
+                break
+            created += await self._import_chunk(chunk, errors)
+        return {"created": created, "failed": len(errors), "errors": errors}
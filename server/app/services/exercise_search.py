@@ -0,0 +1,290 @@
+"""Exercise search and autocomplete
+
+On Postgres, search runs against the weighted tsvector expression index and
+the trigram index on the name (see app/models/exercise_library.py). Other
+databases use `ExerciseSearchIndex`, an inverted index built in process from
+the catalog snapshot on first use of each snapshot version (a couple of
+seconds for 50k exercises, spent in the threadpool while the previous
+version's index keeps answering); after that it costs no queries and
+answers autocomplete within a few milliseconds per keystroke.
+
+Both support prefix matching for the last word typed, typo tolerance and
+the list filters (category, difficulty, equipment, muscle).
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, exists, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.exercise_library import (
+    SEARCH_CONFIG,
+    Exercise,
+    exercise_equipment,
+    exercise_muscles,
+    exercise_search_document
+)
+from app.services.catalog import CatalogSnapshot, catalog_cache
+
+# Field weights, matching the A-D weights of the Postgres document
+FIELD_WEIGHTS = {"name": 3.0, "form_tips": 2.0, "description": 1.0, "instructions": 0.5}
+
+# How a term matched a query token
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.5
+
+# Prefix expansion keeps the most common completions only, so "s" doesn't
+# turn into thousands of terms
+MAX_PREFIX_TERMS = 64
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase ASCII words, with accents folded ("Développé" -> "developpe")."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _TOKEN.findall(folded.lower())
+
+def max_edits(term: str) -> int:
+    """Typos tolerated in a word: none for very short ones, where any edit
+    is a different word."""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    variants = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a transposition is one edit),
+    or limit + 1 once it is certain to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class _Terms:
+    """Postings for one set of fields: term -> {exercise index: weight}."""
+
+    def __init__(self, postings: Dict[str, Dict[int, float]], documents: int):
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.idf = {term: math.log(1 + documents / len(hits)) for term, hits in postings.items()}
+        # Symmetric-delete candidates: a query word and a term within k edits
+        # share a variant with at most k characters deleted
+        self.variants: Dict[str, List[str]] = defaultdict(list)
+        for term in self.vocabulary:
+            for variant in _deletes(term, max_edits(term)):
+                self.variants[variant].append(term)
+
+    def expand(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Terms matching `token`, with how well they match."""
+        matches: Dict[str, float] = {}
+        if prefix:
+            start = bisect_left(self.vocabulary, token)
+            end = bisect_left(self.vocabulary, token + "\x7f", start)
+            if end - start > MAX_PREFIX_TERMS:
+                completions = heapq.nlargest(
+                    MAX_PREFIX_TERMS,
+                    self.vocabulary[start:end],
+                    key=lambda term: len(self.postings[term])
+                )
+            else:
+                completions = self.vocabulary[start:end]
+            matches.update((term, PREFIX) for term in completions)
+        distance = max_edits(token)
+        if distance:
+            for variant in _deletes(token, distance):
+                for term in self.variants.get(variant, ()):
+                    if term not in matches and edit_distance(token, term, distance) <= distance:
+                        matches[term] = FUZZY
+        if token in self.postings:
+            matches[token] = EXACT
+        return matches
+
+    def score(self, token: str, prefix: bool) -> Dict[int, float]:
+        """Exercise index -> best score for one query word."""
+        scores: Dict[int, float] = {}
+        for term, quality in self.expand(token, prefix).items():
+            boost = self.idf[term] * quality
+            for index, weight in self.postings[term].items():
+                value = boost * weight
+                if value > scores.get(index, 0.0):
+                    scores[index] = value
+        return scores
+
+class ExerciseSearchIndex:
+    """In-process full-text index over a catalog snapshot."""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        everything: Dict[str, Dict[int, float]] = defaultdict(dict)
+        names: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._names: List[str] = []
+        for index, exercise in enumerate(snapshot.exercises):
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in set(tokenize(exercise[field])):
+                    everything[term][index] = everything[term].get(index, 0.0) + weight
+            for term in set(tokenize(exercise["name"])):
+                names[term][index] = 1.0
+            self._names.append(" ".join(tokenize(exercise["name"])))
+        documents = len(snapshot.exercises)
+        self.everything = _Terms(everything, documents)
+        self.names = _Terms(names, documents)
+
+    @classmethod
+    def for_snapshot(cls, snapshot: CatalogSnapshot) -> "ExerciseSearchIndex":
+        return snapshot.derived("search_index", cls)
+
+    @classmethod
+    async def current(cls) -> "ExerciseSearchIndex":
+        """The index for the current catalog, without blocking the loop."""
+        return await catalog_cache.derived("search_index", cls)
+
+    def _rank(self, terms: _Terms, tokens: List[str]) -> Dict[int, float]:
+        """Exercises matching every word (the last one as a prefix), scored."""
+        per_token = [terms.score(token, prefix=i == len(tokens) - 1) for i, token in enumerate(tokens)]
+        # Intersect starting from the rarest word
+        per_token.sort(key=len)
+        scores = per_token[0]
+        for token_scores in per_token[1:]:
+            scores = {index: score + token_scores[index] for index, score in scores.items() if index in token_scores}
+            if not scores:
+                break
+        return scores
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        muscle_id: Optional[int] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = self._rank(self.everything, tokens)
+        filters = (category, difficulty, equipment_id, muscle_id)
+        if any(filters):
+            scores = {index: score for index, score in scores.items() if self.snapshot.matches(index, *filters)}
+        best = heapq.nlargest(limit, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+        return [self.snapshot.exercises[index] for index, _ in best]
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[dict]:
+        """Exercise names completing `query`; names that start with it come first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = self._rank(self.names, tokens)
+        typed = " ".join(tokens)
+
+        def key(hit):
+            index, score = hit
+            name = self._names[index]
+            return (name.startswith(typed), score, -len(name), -index)
+
+        best = heapq.nlargest(limit, scores.items(), key=key)
+        exercises = self.snapshot.exercises
+        return [{"id": exercises[index]["id"], "name": exercises[index]["name"]} for index, _ in best]
+
+class ExerciseSearchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _uses_postgres(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    async def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        muscle_id: Optional[int] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        """Best matching exercises, as served by the exercise list."""
+        if not self._uses_postgres():
+            return (await ExerciseSearchIndex.current()).search(
+                query, category, difficulty, equipment_id, muscle_id, limit
+            )
+        snapshot = await catalog_cache.get()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        document = exercise_search_document()
+        # Every word must match, the last one as a prefix of a word
+        tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(tokens[:-1] + [tokens[-1] + ":*"]))
+        text = " ".join(tokens)
+        statement = (
+            select(Exercise.id)
+            .where(or_(document.op("@@")(tsquery), Exercise.name.op("%")(text)))
+            .order_by(
+                (func.ts_rank(document, tsquery) + func.similarity(Exercise.name, text)).desc(),
+                Exercise.id
+            )
+            .limit(limit)
+        )
+        if category:
+            statement = statement.where(Exercise.category == category)
+        if difficulty:
+            statement = statement.where(Exercise.difficulty_level == difficulty)
+        if equipment_id:
+            statement = statement.where(exists().where(and_(
+                exercise_equipment.c.exercise_id == Exercise.id,
+                exercise_equipment.c.equipment_id == equipment_id
+            )))
+        if muscle_id:
+            statement = statement.where(exists().where(and_(
+                exercise_muscles.c.exercise_id == Exercise.id,
+                exercise_muscles.c.muscle_id == muscle_id
+            )))
+        ids = (await self.db.scalars(statement)).all()
+        # Exercises added after this worker's snapshot show up once it refreshes
+        return [exercise for exercise in map(snapshot.exercise, ids) if exercise is not None]
+
+    async def autocomplete(self, query: str, limit: int = 10) -> List[dict]:
+        """{id, name} of exercises whose name completes `query`."""
+        if not self._uses_postgres():
+            return (await ExerciseSearchIndex.current()).autocomplete(query, limit)
+        text = " ".join(tokenize(query))
+        if not text:
+            return []
+        # Tokens are plain letters and digits, so there is nothing to escape
+        starts = Exercise.name.ilike(text + "%")
+        rows = await self.db.execute(
+            select(Exercise.id, Exercise.name)
+            .where(or_(starts, Exercise.name.ilike("%" + text + "%"), Exercise.name.op("%")(text)))
+            .order_by(
+                case((starts, literal(0)), else_=literal(1)),
+                func.similarity(Exercise.name, text).desc(),
+                func.length(Exercise.name),
+                Exercise.id
+            )
+            .limit(limit)
+        )
+        return [{"id": exercise_id, "name": name} for exercise_id, name in rows]
@@ -0,0 +1,145 @@
+"""Friend graph lookups
+
+A user's friends are the users they follow (friendship.user_id ->
+friend_id). Adjacency comes off the friendship primary key, an index on
+(user_id, friend_id), and each worker caches friend-id sets so membership
+checks are set lookups. "People you may know" ranks the friends of a
+user's friends by how many of the user's friends follow them; that ranking
+is one grouped query over the same index, cached per user.
+
+Following someone invalidates the follower's entries in the worker that
+made the change; elsewhere they expire after `friend_graph_cache_seconds`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.social import friendship
+
+# Candidates kept per user; pages of suggestions are cut from these
+MAX_SUGGESTIONS = 100
+
+ValueType = TypeVar("ValueType")
+
+class _ExpiringLRU(Generic[ValueType]):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, ValueType]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: int) -> Optional[ValueType]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: int, value: ValueType, ttl_seconds: float):
+        if self.maxsize <= 0 or ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: int):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class FriendGraphCache:
+    def __init__(self, maxsize: int):
+        self.friends: _ExpiringLRU[FrozenSet[int]] = _ExpiringLRU(maxsize)
+        self.suggestions: _ExpiringLRU[List[Tuple[int, int]]] = _ExpiringLRU(maxsize)
+
+    def invalidate(self, user_id: int):
+        self.friends.invalidate(user_id)
+        self.suggestions.invalidate(user_id)
+
+    def clear(self):
+        self.friends.clear()
+        self.suggestions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "friend_sets": len(self.friends),
+            "friend_set_hits": self.friends.hits,
+            "friend_set_misses": self.friends.misses,
+            "suggestion_lists": len(self.suggestions),
+            "suggestion_hits": self.suggestions.hits,
+            "suggestion_misses": self.suggestions.misses,
+        }
+
+friend_graph_cache = FriendGraphCache(settings.friend_graph_cache_size)
+
+class FriendGraphService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def friend_ids(self, user_id: int) -> FrozenSet[int]:
+        cached = friend_graph_cache.friends.get(user_id)
+        if cached is not None:
+            return cached
+        friend_ids = frozenset((await self.db.scalars(
+            select(friendship.c.friend_id).where(friendship.c.user_id == user_id)
+        )).all())
+        friend_graph_cache.friends.set(user_id, friend_ids, settings.friend_graph_cache_seconds)
+        return friend_ids
+
+    async def is_friend(self, user_id: int, friend_id: int) -> bool:
+        return friend_id in await self.friend_ids(user_id)
+
+    async def add_friend(self, user_id: int, friend_id: int):
+        """Record the friendship in the caller's transaction."""
+        await self.db.execute(insert(friendship).values(user_id=user_id, friend_id=friend_id))
+        friend_graph_cache.invalidate(user_id)
+
+    async def _rank_candidates(self, user_id: int) -> List[Tuple[int, int]]:
+        mine = friendship.alias("mine")
+        theirs = friendship.alias("theirs")
+        followed = select(friendship.c.friend_id).where(friendship.c.user_id == user_id)
+        mutual = func.count().label("mutual")
+        rows = await self.db.execute(
+            select(theirs.c.friend_id, mutual)
+            .select_from(mine.join(theirs, theirs.c.user_id == mine.c.friend_id))
+            .where(
+                mine.c.user_id == user_id,
+                theirs.c.friend_id != user_id,
+                theirs.c.friend_id.not_in(followed)
+            )
+            .group_by(theirs.c.friend_id)
+            .order_by(mutual.desc(), theirs.c.friend_id)
+            .limit(MAX_SUGGESTIONS)
+        )
+        return [(candidate_id, count) for candidate_id, count in rows]
+
+    async def suggestions(self, user_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """(user_id, mutual friends) of friends-of-friends the user doesn't
+        follow yet, most mutual friends first."""
+        ranked = friend_graph_cache.suggestions.get(user_id)
+        if ranked is None:
+            ranked = await self._rank_candidates(user_id)
+            friend_graph_cache.suggestions.set(user_id, ranked, settings.friend_suggestions_cache_seconds)
+        friend_ids = await self.friend_ids(user_id)
+        return [
+            (candidate_id, mutual) for candidate_id, mutual in ranked if candidate_id not in friend_ids
+        ][:limit]
@@ -0,0 +1,30 @@
+from typing import Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievements import Achievement
+from app.models.models import Workout
+from app.models.social import Post, PostComment
+from app.models.user import User
+from app.utils.loaders import BatchLoader
+
+class SocialHydrator:
+    """Fills in the relations social responses render, a page at a time:
+    one query per relation however many posts or comments there are.
+    Keep one per request so authors seen in posts aren't refetched for
+    their comments."""
+
+    def __init__(self, db: AsyncSession):
+        self.users = BatchLoader(db, User)
+        self.workouts = BatchLoader(db, Workout)
+        self.achievements = BatchLoader(db, Achievement)
+
+    async def posts(self, posts: Sequence[Post]) -> Sequence[Post]:
+        await self.users.attach(posts, "user", "user_id")
+        await self.workouts.attach(posts, "workout", "workout_id")
+        await self.achievements.attach(posts, "achievement", "achievement_id")
+        return posts
+
+    async def comments(self, comments: Sequence[PostComment]) -> Sequence[PostComment]:
+        await self.users.attach(comments, "user", "user_id")
+        return comments
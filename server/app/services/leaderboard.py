@@ -0,0 +1,175 @@
+"""Challenge leaderboards
+
+Each participant's running total lives in challenge_scores and is bumped by
+an atomic upsert in the same transaction as the activity it counts, so no
+view ever re-aggregates challenge_activities. Views are answered from the
+standings index (challenge_id, total DESC, user_id) without loading the
+challenge: a rank is `COUNT(*) WHERE total > :t`, a range scan over the
+entries ranked above that total, and top-N / around-me views read at most
+N rows off the index in order. `rebuild_leaderboards` recomputes the table
+from the activity log.
+"""
+
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.social import ChallengeActivity, ChallengeScore, challenge_participants
+
+# (rank, user_id, total)
+Standing = Tuple[int, int, int]
+
+scores_table = ChallengeScore.__table__
+
+def _standings_query(challenge_id: int):
+    """(rank, user_id, total) rows of a challenge. Tied participants share a
+    rank, and the next rank skips past them (1, 2, 2, 4)."""
+    higher = scores_table.alias("higher")
+    rank = select(func.count()).select_from(higher).where(
+        higher.c.challenge_id == challenge_id,
+        higher.c.total > scores_table.c.total
+    ).scalar_subquery() + 1
+    return select(rank, scores_table.c.user_id, scores_table.c.total).where(
+        scores_table.c.challenge_id == challenge_id
+    )
+
+class LeaderboardService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add_participant(self, challenge_id: int, user_id: int):
+        """Give a new participant a zero total so they are ranked straight away."""
+        values = {"challenge_id": challenge_id, "user_id": user_id, "total": 0, "updated_at": datetime.utcnow()}
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            await self.db.execute(
+                dialect_insert(scores_table).values(values).on_conflict_do_nothing(
+                    index_elements=["challenge_id", "user_id"]
+                )
+            )
+        elif not await self.db.get(ChallengeScore, (challenge_id, user_id)):
+            await self.db.execute(insert(scores_table).values(values))
+
+    async def add_to_score(self, challenge_id: int, user_id: int, delta: int) -> int:
+        """Atomically add `delta` to the participant's total, in the caller's
+        transaction. Returns the new total."""
+        now = datetime.utcnow()
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(scores_table).values(
+                challenge_id=challenge_id, user_id=user_id, total=delta, updated_at=now
+            )
+            return await self.db.scalar(
+                stmt.on_conflict_do_update(
+                    index_elements=["challenge_id", "user_id"],
+                    set_={"total": scores_table.c.total + stmt.excluded.total, "updated_at": now}
+                ).returning(scores_table.c.total)
+            )
+        total = await self.db.scalar(
+            update(scores_table)
+            .where(scores_table.c.challenge_id == challenge_id, scores_table.c.user_id == user_id)
+            .values(total=scores_table.c.total + delta, updated_at=now)
+            .returning(scores_table.c.total)
+        )
+        if total is None:
+            await self.db.execute(
+                insert(scores_table).values(
+                    challenge_id=challenge_id, user_id=user_id, total=delta, updated_at=now
+                )
+            )
+            total = delta
+        return total
+
+    async def _total(self, challenge_id: int, user_id: int) -> Optional[int]:
+        return await self.db.scalar(
+            select(scores_table.c.total).where(
+                scores_table.c.challenge_id == challenge_id, scores_table.c.user_id == user_id
+            )
+        )
+
+    async def rank(self, challenge_id: int, user_id: int) -> Optional[int]:
+        """The participant's rank, or None if they are not participating."""
+        total = await self._total(challenge_id, user_id)
+        if total is None:
+            return None
+        higher = await self.db.scalar(
+            select(func.count()).select_from(scores_table).where(
+                scores_table.c.challenge_id == challenge_id, scores_table.c.total > total
+            )
+        )
+        return higher + 1
+
+    async def _standings(self, query) -> List[Standing]:
+        return [tuple(row) for row in (await self.db.execute(query)).all()]
+
+    async def top(self, challenge_id: int, limit: int) -> List[Standing]:
+        return await self._standings(
+            _standings_query(challenge_id)
+            .order_by(scores_table.c.total.desc(), scores_table.c.user_id)
+            .limit(limit)
+        )
+
+    async def around(self, challenge_id: int, user_id: int, radius: int) -> List[Standing]:
+        """The user's standing with up to `radius` participants either side."""
+        total = await self._total(challenge_id, user_id)
+        if total is None:
+            return []
+        total_column, user_column = scores_table.c.total, scores_table.c.user_id
+        above = await self._standings(
+            _standings_query(challenge_id)
+            .where(or_(total_column > total, and_(total_column == total, user_column < user_id)))
+            .order_by(total_column, user_column.desc())
+            .limit(radius)
+        )
+        rest = await self._standings(
+            _standings_query(challenge_id)
+            .where(or_(total_column < total, and_(total_column == total, user_column >= user_id)))
+            .order_by(total_column.desc(), user_column)
+            .limit(radius + 1)
+        )
+        return above[::-1] + rest
+
+    async def for_users(self, challenge_id: int, user_ids: Iterable[int]) -> List[Standing]:
+        """Standings of the given users (overall ranks), best first."""
+        return await self._standings(
+            _standings_query(challenge_id)
+            .where(scores_table.c.user_id.in_(set(user_ids)))
+            .order_by(scores_table.c.total.desc(), scores_table.c.user_id)
+        )
+
+def rebuild_leaderboards(db: Session) -> int:
+    """Recompute every challenge_scores row from participants and activities.
+    Returns the number of rows written."""
+    db.execute(delete(ChallengeScore))
+    totals = (
+        select(
+            ChallengeActivity.challenge_id,
+            ChallengeActivity.user_id,
+            func.sum(ChallengeActivity.value).label("total")
+        )
+        .group_by(ChallengeActivity.challenge_id, ChallengeActivity.user_id)
+        .subquery()
+    )
+    result = db.execute(
+        insert(ChallengeScore).from_select(
+            ["challenge_id", "user_id", "total", "updated_at"],
+            select(
+                challenge_participants.c.challenge_id,
+                challenge_participants.c.user_id,
+                func.coalesce(totals.c.total, 0),
+                func.now()
+            ).outerjoin(
+                totals,
+                (totals.c.challenge_id == challenge_participants.c.challenge_id)
+                & (totals.c.user_id == challenge_participants.c.user_id)
+            )
+        )
+    )
+    db.commit()
+    return result.rowcount
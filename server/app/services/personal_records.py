@@ -0,0 +1,220 @@
+"""Personal records
+
+personal_records keeps each user's best mark per exercise and record type.
+Logging progress folds the new marks in with one conditional upsert in the
+same transaction, so PR detection never scans the user's history, and PR
+lists and boards read that table through its indexes.
+`rebuild_personal_records` replays existing history into it.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.exercise_library import ExerciseProgress, PersonalRecord
+from app.models.user import User
+
+# In the order a log's pr_type is picked when it breaks several records
+RECORD_TYPES = ("weight", "estimated_1rm", "volume", "reps", "distance", "duration")
+
+# (record_type, weight the reps were done at or 0, value)
+Mark = Tuple[str, float, float]
+
+records_table = PersonalRecord.__table__
+
+def estimated_one_rep_max(weight: float, reps: int) -> float:
+    """Epley formula; a single is its own 1RM."""
+    return weight if reps == 1 else round(weight * (1 + reps / 30), 2)
+
+def marks(
+    weight: Optional[float],
+    reps: Optional[int],
+    sets: Optional[int],
+    duration: Optional[int],
+    distance: Optional[float]
+) -> List[Mark]:
+    """The record-eligible marks of one progress log. Reps are compared
+    only against other sets at the same weight."""
+    result: List[Mark] = []
+    if weight:
+        result.append(("weight", 0.0, weight))
+        if reps:
+            result.append(("estimated_1rm", 0.0, estimated_one_rep_max(weight, reps)))
+            result.append(("volume", 0.0, weight * reps * (sets or 1)))
+    if reps:
+        result.append(("reps", float(weight or 0), float(reps)))
+    if distance:
+        result.append(("distance", 0.0, distance))
+    if duration:
+        result.append(("duration", 0.0, float(duration)))
+    return result
+
+def _ordered(record_types) -> List[str]:
+    return [record_type for record_type in RECORD_TYPES if record_type in record_types]
+
+class PersonalRecordService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(self, progress: ExerciseProgress) -> List[str]:
+        """Fold a flushed progress log into the user's records, in the
+        caller's transaction. Returns the record types it set, most notable
+        first; a first log of an exercise sets every record it has a mark for.
+        """
+        achieved_at = progress.date or datetime.utcnow()
+        rows = [
+            {
+                "user_id": progress.user_id,
+                "exercise_id": progress.exercise_id,
+                "record_type": record_type,
+                "weight": weight,
+                "value": value,
+                "progress_id": progress.id,
+                "achieved_at": achieved_at,
+            }
+            for record_type, weight, value in marks(
+                progress.weight, progress.reps, progress.sets, progress.duration, progress.distance
+            )
+        ]
+        if not rows:
+            return []
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(records_table).values(rows)
+            # Only rows inserted or actually beaten come back
+            broken = await self.db.scalars(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "exercise_id", "record_type", "weight"],
+                    set_={
+                        "value": stmt.excluded.value,
+                        "progress_id": stmt.excluded.progress_id,
+                        "achieved_at": stmt.excluded.achieved_at,
+                    },
+                    where=records_table.c.value < stmt.excluded.value
+                ).returning(records_table.c.record_type)
+            )
+            return _ordered(set(broken.all()))
+
+        current = {
+            (record.record_type, record.weight): record
+            for record in (await self.db.scalars(
+                select(PersonalRecord).where(
+                    PersonalRecord.user_id == progress.user_id,
+                    PersonalRecord.exercise_id == progress.exercise_id
+                ).with_for_update()
+            )).all()
+        }
+        broken = set()
+        for row in rows:
+            record = current.get((row["record_type"], row["weight"]))
+            if record is None:
+                self.db.add(PersonalRecord(**row))
+            elif row["value"] > record.value:
+                record.value = row["value"]
+                record.progress_id = row["progress_id"]
+                record.achieved_at = row["achieved_at"]
+            else:
+                continue
+            broken.add(row["record_type"])
+        return _ordered(broken)
+
+    async def for_user(
+        self,
+        user_id: int,
+        exercise_id: Optional[int] = None,
+        record_type: Optional[str] = None
+    ) -> List[PersonalRecord]:
+        query = select(PersonalRecord).where(PersonalRecord.user_id == user_id)
+        if exercise_id is not None:
+            query = query.where(PersonalRecord.exercise_id == exercise_id)
+        if record_type is not None:
+            query = query.where(PersonalRecord.record_type == record_type)
+        result = await self.db.scalars(
+            query.order_by(PersonalRecord.exercise_id, PersonalRecord.record_type, PersonalRecord.weight)
+        )
+        return result.all()
+
+    async def board(self, exercise_id: int, record_type: str, weight: float = 0, limit: int = 10) -> List[dict]:
+        """Best marks of one kind on an exercise across all users, ranked.
+        Equal marks share a rank; the earlier one is listed first."""
+        rows = await self.db.execute(
+            select(PersonalRecord, User.username)
+            .join(User, User.id == PersonalRecord.user_id)
+            .where(
+                PersonalRecord.exercise_id == exercise_id,
+                PersonalRecord.record_type == record_type,
+                PersonalRecord.weight == (weight if record_type == "reps" else 0)
+            )
+            .order_by(PersonalRecord.value.desc(), PersonalRecord.achieved_at, PersonalRecord.user_id)
+            .limit(limit)
+        )
+        board: List[dict] = []
+        for position, (record, username) in enumerate(rows, start=1):
+            tied = board and board[-1]["value"] == record.value
+            board.append({
+                "rank": board[-1]["rank"] if tied else position,
+                "user_id": record.user_id,
+                "username": username,
+                "value": record.value,
+                "achieved_at": record.achieved_at,
+            })
+        return board
+
+def rebuild_personal_records(db: Session) -> int:
+    """Recompute personal_records by replaying all progress logs in order,
+    correcting each log's is_personal_record / pr_type on the way.
+    Returns the number of records written."""
+    best: Dict[Tuple[int, int, str, float], dict] = {}
+    flags: List[dict] = []
+    logs = db.execute(
+        select(
+            ExerciseProgress.id,
+            ExerciseProgress.user_id,
+            ExerciseProgress.exercise_id,
+            ExerciseProgress.date,
+            ExerciseProgress.weight,
+            ExerciseProgress.reps,
+            ExerciseProgress.sets,
+            ExerciseProgress.duration,
+            ExerciseProgress.distance,
+            ExerciseProgress.is_personal_record,
+            ExerciseProgress.pr_type
+        )
+        .order_by(ExerciseProgress.date, ExerciseProgress.id)
+        .execution_options(yield_per=5000)
+    )
+    for log in logs:
+        broken = set()
+        for record_type, weight, value in marks(log.weight, log.reps, log.sets, log.duration, log.distance):
+            key = (log.user_id, log.exercise_id, record_type, weight)
+            current = best.get(key)
+            if current is None or value > current["value"]:
+                best[key] = {
+                    "user_id": log.user_id,
+                    "exercise_id": log.exercise_id,
+                    "record_type": record_type,
+                    "weight": weight,
+                    "value": value,
+                    "progress_id": log.id,
+                    "achieved_at": log.date or datetime.utcnow(),
+                }
+                broken.add(record_type)
+        ordered = _ordered(broken)
+        pr_type = ordered[0] if ordered else None
+        if bool(log.is_personal_record) != bool(ordered) or log.pr_type != pr_type:
+            flags.append({"id": log.id, "is_personal_record": bool(ordered), "pr_type": pr_type})
+
+    db.execute(delete(PersonalRecord))
+    records = list(best.values())
+    for start in range(0, len(records), 5000):
+        db.execute(insert(PersonalRecord), records[start:start + 5000])
+    if flags:
+        db.execute(update(ExerciseProgress), flags)
+    db.commit()
+    return len(records)
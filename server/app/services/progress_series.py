@@ -0,0 +1,155 @@
+"""Exercise progress as a chart-ready time series
+
+Logs are aggregated in the database, either per log or per day, week or
+month bucket: max weight, total volume (weight x reps x sets), best
+estimated 1RM (Epley, as in personal_records) and the number of logs.
+A point budget then thins the series with Largest-Triangle-Three-Buckets,
+which keeps the peaks and dips a chart needs while dropping the rest.
+LTTB runs on NumPy when it is installed (the `ml` dependency group) and
+in plain Python otherwise.
+"""
+
+import importlib.util
+import math
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.exercise_library import ExerciseProgress
+
+BUCKETS = ("day", "week", "month")
+METRICS = ("max_weight", "volume", "best_e1rm")
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+def _lttb_numpy(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    # Middle bucket i covers [edges[i], edges[i + 1]); the first and last points stand alone
+    edges = (np.floor(np.arange(threshold - 1) * ((size - 2) / (threshold - 2))) + 1).astype(int)
+    edges[-1] = size - 1
+    counts = np.diff(np.append(edges, size))
+    x_means = np.add.reduceat(x, edges) / counts
+    y_means = np.add.reduceat(y, edges) / counts
+
+    selected = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        a = selected[-1]
+        # The third corner is the average of the next bucket (the last point for the final one)
+        areas = np.abs(
+            (x[a] - x_means[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (y_means[i + 1] - y[a])
+        )
+        selected.append(start + int(np.argmax(areas)))
+    selected.append(size - 1)
+    return selected
+
+def _lttb_python(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    size = len(x)
+    every = (size - 2) / (threshold - 2)
+    edges = [int(math.floor(i * every)) + 1 for i in range(threshold - 1)]
+    edges[-1] = size - 1
+    selected = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else size
+        next_x = sum(x[edges[i + 1]:next_end]) / (next_end - edges[i + 1])
+        next_y = sum(y[edges[i + 1]:next_end]) / (next_end - edges[i + 1])
+        a = selected[-1]
+        best = max(
+            range(start, end),
+            key=lambda j: abs((x[a] - next_x) * (y[j] - y[a]) - (x[a] - x[j]) * (next_y - y[a]))
+        )
+        selected.append(best)
+    selected.append(size - 1)
+    return selected
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    """Indexes of at most `threshold` points that best keep the shape of
+    the series (x ascending); the first and last are always kept."""
+    if threshold < 3:
+        raise ValueError("LTTB needs a budget of at least 3 points")
+    if threshold >= len(x):
+        return list(range(len(x)))
+    return (_lttb_numpy if NUMPY_AVAILABLE else _lttb_python)(x, y, threshold)
+
+def _bucket_start(dialect: str, bucket: str, column):
+    if dialect == "sqlite":
+        if bucket == "day":
+            return func.date(column)
+        if bucket == "week":
+            # Back to Monday
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", column)
+    return func.date_trunc(bucket, column)
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime(value.year, value.month, value.day)
+
+class ProgressSeriesService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def series(
+        self,
+        user_id: int,
+        exercise_id: int,
+        bucket: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        points: Optional[int] = None,
+        metric: str = "best_e1rm"
+    ) -> List[dict]:
+        """Oldest first. With `points`, at most that many points chosen by
+        LTTB on `metric`; points without a value for it are left out."""
+        weight, reps = ExerciseProgress.weight, ExerciseProgress.reps
+        volume = func.coalesce(weight * reps * func.coalesce(ExerciseProgress.sets, 1), 0)
+        e1rm = case(
+            (reps == 1, weight),
+            (reps > 1, weight * (1 + reps / 30.0)),
+            else_=None
+        )
+        if bucket:
+            period = _bucket_start(self.db.get_bind().dialect.name, bucket, ExerciseProgress.date).label("period")
+            query = select(
+                period,
+                func.max(weight),
+                func.sum(volume),
+                func.max(e1rm),
+                func.count()
+            ).group_by(period).order_by(period)
+        else:
+            query = select(
+                ExerciseProgress.date, weight, volume, e1rm, literal(1)
+            ).order_by(ExerciseProgress.date, ExerciseProgress.id)
+        query = query.where(ExerciseProgress.user_id == user_id, ExerciseProgress.exercise_id == exercise_id)
+        if start:
+            query = query.where(ExerciseProgress.date >= start)
+        if end:
+            query = query.where(ExerciseProgress.date < end)
+
+        series = [
+            {
+                "date": _as_datetime(date),
+                "max_weight": max_weight,
+                "volume": float(total_volume or 0),
+                "best_e1rm": round(best, 2) if best is not None else None,
+                "logs": logs,
+            }
+            for date, max_weight, total_volume, best, logs in await self.db.execute(query)
+        ]
+        if points is None:
+            return series
+        series = [point for point in series if point[metric] is not None]
+        keep = lttb([point["date"].timestamp() for point in series], [point[metric] for point in series], points)
+        return [series[index] for index in keep]
@@ -0,0 +1,226 @@
+"""Live updates pushed to connected clients
+
+Routes publish small events (a new post, a like, a leaderboard move) to
+named channels on a broker; each worker's RealtimeHub subscribes to the
+channels its open connections care about and copies every event into
+those connections' queues. Channels:
+
+    author:{user_id}      posts by the user and like/comment deltas on them,
+                          for the user and everyone following them
+    challenge:{id}        leaderboard deltas, for participants
+
+The broker is pluggable (`realtime_broker`): the in-memory one delivers
+within a single process, which is what tests and single-worker deploys
+use; multi-worker deploys point it at a class that relays through a shared
+pub/sub (e.g. Redis) with the same interface.
+
+Each connection has a bounded queue. A client that stops reading doesn't
+hold up publishers or other clients: when its queue fills, its pending
+events are dropped and replaced by one `resync` event telling it to
+refetch over HTTP.
+"""
+
+import asyncio
+import importlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+Handler = Callable[[str, Event], None]
+
+def author_channel(user_id: int) -> str:
+    return f"author:{user_id}"
+
+def challenge_channel(challenge_id: int) -> str:
+    return f"challenge:{challenge_id}"
+
+class Broker(ABC):
+    """Delivers published events to the handlers subscribed to a channel.
+    Handlers must not block; they run on the event loop."""
+
+    @abstractmethod
+    async def publish(self, channel: str, event: Event):
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: Handler):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str, handler: Handler):
+        ...
+
+    async def close(self):
+        pass
+
+class InMemoryBroker(Broker):
+    def __init__(self):
+        self._handlers: Dict[str, Set[Handler]] = defaultdict(set)
+
+    async def publish(self, channel: str, event: Event):
+        for handler in list(self._handlers.get(channel, ())):
+            handler(channel, event)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].add(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        handlers = self._handlers.get(channel)
+        if handlers is not None:
+            handlers.discard(handler)
+            if not handlers:
+                del self._handlers[channel]
+
+def create_broker(name: str) -> Broker:
+    """"memory", or the dotted path of a Broker subclass ("package.module:Class")."""
+    if name == "memory":
+        return InMemoryBroker()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+class Connection:
+    """One client's subscription: a bounded queue of events to send."""
+
+    def __init__(
+        self,
+        user_id: int,
+        channels: Iterable[str],
+        queue_size: int,
+        on_overflow: Optional[Callable[[], None]] = None
+    ):
+        self.user_id = user_id
+        self.channels = set(channels)
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=queue_size)
+        self.overflows = 0
+        self._on_overflow = on_overflow
+        self._loop = asyncio.get_running_loop()
+
+    def deliver(self, event: Event):
+        """Queue an event without waiting. Safe to call from any thread or
+        loop (sync handlers, broker reader threads)."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(event)
+        else:
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event):
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        # Pending deltas are useless once some are lost; ask for a refetch
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait({"type": "resync"})
+        self.overflows += 1
+        if self._on_overflow is not None:
+            self._on_overflow()
+
+class TooManyConnections(Exception):
+    """Raised when this worker already holds `realtime_max_connections`."""
+
+class RealtimeHub:
+    def __init__(self, broker: Optional[Broker] = None):
+        self._broker = broker
+        self._lock = threading.Lock()
+        self._connections: Dict[str, Set[Connection]] = defaultdict(set)
+        self.connection_count = 0
+        self.peak_connections = 0
+        self.total_connections = 0
+        self.rejected = 0
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    @property
+    def broker(self) -> Broker:
+        if self._broker is None:
+            self._broker = create_broker(settings.realtime_broker)
+        return self._broker
+
+    def set_broker(self, broker: Broker):
+        self._broker = broker
+
+    def _dispatch(self, channel: str, event: Event):
+        with self._lock:
+            connections = list(self._connections.get(channel, ()))
+        for connection in connections:
+            connection.deliver(event)
+            self.delivered += 1
+
+    def _count_overflow(self):
+        with self._lock:
+            self.overflows += 1
+
+    async def connect(self, user_id: int, channels: Iterable[str]) -> Connection:
+        with self._lock:
+            if self.connection_count >= settings.realtime_max_connections:
+                self.rejected += 1
+                raise TooManyConnections()
+            self.connection_count += 1
+            self.total_connections += 1
+            self.peak_connections = max(self.peak_connections, self.connection_count)
+        connection = Connection(user_id, channels, settings.realtime_queue_size, self._count_overflow)
+        for channel in connection.channels:
+            with self._lock:
+                # The broker only needs one subscription per channel per worker
+                first = not self._connections[channel]
+                self._connections[channel].add(connection)
+            if first:
+                await self.broker.subscribe(channel, self._dispatch)
+        return connection
+
+    async def disconnect(self, connection: Connection):
+        for channel in connection.channels:
+            with self._lock:
+                subscribers = self._connections.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(connection)
+                last = not subscribers
+                if last:
+                    del self._connections[channel]
+            if last:
+                await self.broker.unsubscribe(channel, self._dispatch)
+        with self._lock:
+            self.connection_count -= 1
+
+    async def publish(self, channel: str, event: Event):
+        """Send an event to a channel. Never raises: live updates are best
+        effort and must not fail the request that caused them."""
+        self.published += 1
+        try:
+            await self.broker.publish(channel, event)
+        except Exception:
+            logger.exception("Publishing to %s failed", channel)
+
+    async def close(self):
+        if self._broker is not None:
+            await self._broker.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "broker": type(self.broker).__name__,
+            "connections": self.connection_count,
+            "peak_connections": self.peak_connections,
+            "total_connections": self.total_connections,
+            "rejected": self.rejected,
+            "channels": len(self._connections),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+realtime_hub = RealtimeHub()
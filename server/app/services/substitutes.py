@@ -0,0 +1,360 @@
+"""Exercise substitutes
+
+Each exercise is described by a sparse vector of what it trains and needs:
+its muscles (primary ones weighted above secondary), category, difficulty
+and equipment. Two exercises are alike to the degree their vectors point
+the same way (cosine similarity), and exercise_substitutes stores the
+`exercise_substitutes_per_exercise` most similar exercises for each one, so
+an alternatives request is a single indexed read. When an equipment filter
+leaves fewer than asked for, the related exercises usable with that
+equipment are scored on the spot instead.
+
+`rebuild_substitutes` (the `rebuild-substitutes` command) computes the
+whole table offline. With NumPy it multiplies the normalised vectors in
+row blocks, and with SciPy it keeps them as a sparse matrix; both are
+optional (the `ml` dependency group), and without them an inverted index
+in plain Python does the same job more slowly. New exercises are fitted in
+incrementally by `refresh_substitutes`, which only looks at (at most
+`exercise_substitutes_related_max`) exercises sharing a muscle, piece of
+equipment or category with them, does the arithmetic in the threadpool,
+and batches exercises created within a short delay of each other.
+"""
+
+import asyncio
+import heapq
+import importlib.util
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal, SessionLocal
+from app.models.exercise_library import Exercise, ExerciseSubstitute, exercise_equipment, exercise_muscles
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+SCIPY_AVAILABLE = NUMPY_AVAILABLE and importlib.util.find_spec("scipy") is not None
+
+# Feature weights: what an exercise trains matters more than what it needs
+PRIMARY_MUSCLE = 1.0
+SECONDARY_MUSCLE = 0.5
+CATEGORY = 0.75
+DIFFICULTY = 0.5
+EQUIPMENT = 0.25
+
+# Rows of the similarity matrix computed at once by the NumPy path
+BLOCK_ROWS = 256
+
+# Above this many new exercises (a big import), refresh_substitutes
+# rebuilds everything rather than fitting them in one by one
+INCREMENTAL_MAX = 200
+
+Vector = Dict[Tuple[str, Any], float]
+Neighbours = List[Tuple[int, float]]
+
+def _feature_statements(exercise_ids=None):
+    """Statements for the rows `_vectors` needs; `exercise_ids` is a list
+    or a subquery of ids, or None for every exercise."""
+    exercises = select(Exercise.id, Exercise.category, Exercise.difficulty_level)
+    muscles = select(exercise_muscles.c.exercise_id, exercise_muscles.c.muscle_id, exercise_muscles.c.is_primary)
+    equipment = select(exercise_equipment.c.exercise_id, exercise_equipment.c.equipment_id)
+    if exercise_ids is not None:
+        exercises = exercises.where(Exercise.id.in_(exercise_ids))
+        muscles = muscles.where(exercise_muscles.c.exercise_id.in_(exercise_ids))
+        equipment = equipment.where(exercise_equipment.c.exercise_id.in_(exercise_ids))
+    return exercises, muscles, equipment
+
+def _vectors(exercise_rows: Iterable, muscle_rows: Iterable, equipment_rows: Iterable) -> Dict[int, Vector]:
+    """Unit-length feature vectors by exercise id."""
+    vectors: Dict[int, Vector] = {}
+    for exercise_id, category, difficulty in exercise_rows:
+        vector: Vector = {}
+        if category:
+            vector[("category", category)] = CATEGORY
+            # Difficulty only counts within a category: a beginner stretch
+            # is no substitute for a beginner squat
+            if difficulty:
+                vector[("difficulty", (category, difficulty))] = DIFFICULTY
+        vectors[exercise_id] = vector
+    for exercise_id, muscle_id, is_primary in muscle_rows:
+        if exercise_id in vectors:
+            vectors[exercise_id][("muscle", muscle_id)] = PRIMARY_MUSCLE if is_primary else SECONDARY_MUSCLE
+    for exercise_id, equipment_id in equipment_rows:
+        if exercise_id in vectors:
+            vectors[exercise_id][("equipment", equipment_id)] = EQUIPMENT
+    for vector in vectors.values():
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        for feature in vector:
+            vector[feature] /= norm
+    return vectors
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+def _best(scores: Dict[int, float], k: int) -> Neighbours:
+    # Highest score first, ties by id, nothing that shares no feature
+    return heapq.nlargest(
+        k, ((other, score) for other, score in scores.items() if score > 0), key=lambda item: (item[1], -item[0])
+    )
+
+def _nearest_python(queries: Dict[int, Vector], corpus: Dict[int, Vector], k: int) -> Dict[int, Neighbours]:
+    postings: Dict[Tuple[str, Any], List[Tuple[int, float]]] = defaultdict(list)
+    for exercise_id, vector in corpus.items():
+        for feature, weight in vector.items():
+            postings[feature].append((exercise_id, weight))
+    result = {}
+    for exercise_id, vector in queries.items():
+        scores: Dict[int, float] = defaultdict(float)
+        for feature, weight in vector.items():
+            for other, other_weight in postings[feature]:
+                scores[other] += weight * other_weight
+        scores.pop(exercise_id, None)
+        result[exercise_id] = _best(scores, k)
+    return result
+
+def _nearest_numpy(vectors: Dict[int, Vector], k: int) -> Dict[int, Neighbours]:
+    import numpy as np
+
+    ids = list(vectors)
+    columns: Dict[Tuple[str, Any], int] = {}
+    rows, cols, values = [], [], []
+    for row, vector in enumerate(vectors.values()):
+        for feature, weight in vector.items():
+            rows.append(row)
+            cols.append(columns.setdefault(feature, len(columns)))
+            values.append(weight)
+    shape = (len(ids), max(len(columns), 1))
+    if SCIPY_AVAILABLE:
+        from scipy.sparse import csr_matrix
+        matrix = csr_matrix((values, (rows, cols)), shape=shape)
+        transposed = matrix.T.tocsr()
+    else:
+        matrix = np.zeros(shape)
+        matrix[rows, cols] = values
+        transposed = matrix.T
+
+    top = min(k, len(ids) - 1)
+    result: Dict[int, Neighbours] = {}
+    for start in range(0, len(ids), BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, len(ids))
+        scores = matrix[start:end] @ transposed
+        scores = scores.toarray() if SCIPY_AVAILABLE else np.asarray(scores)
+        scores[np.arange(end - start), np.arange(start, end)] = 0.0
+        if top <= 0:
+            result.update((exercise_id, []) for exercise_id in ids[start:end])
+            continue
+        # Everything level with the k-th best, so ties go by id as in _best
+        cutoffs = np.maximum(-np.partition(-scores, top - 1, axis=1)[:, top - 1], np.finfo(float).tiny)
+        for offset, cutoff in enumerate(cutoffs):
+            columns_kept = np.flatnonzero(scores[offset] >= cutoff)
+            result[ids[start + offset]] = _best({ids[column]: float(scores[offset, column]) for column in columns_kept}, k)
+    return result
+
+def nearest(vectors: Dict[int, Vector], k: int) -> Dict[int, Neighbours]:
+    """The k most similar other exercises for every exercise."""
+    if NUMPY_AVAILABLE:
+        return _nearest_numpy(vectors, k)
+    return _nearest_python(vectors, vectors, k)
+
+def _rows(neighbours: Dict[int, Neighbours]) -> List[dict]:
+    return [
+        {"exercise_id": exercise_id, "substitute_id": substitute_id, "score": round(score, 6)}
+        for exercise_id, top in neighbours.items()
+        for substitute_id, score in top
+    ]
+
+def rebuild_substitutes(db: Session) -> int:
+    """Recompute exercise_substitutes for the whole catalog. Returns the
+    number of rows written."""
+    vectors = _vectors(*(db.execute(statement) for statement in _feature_statements()))
+    rows = _rows(nearest(vectors, settings.exercise_substitutes_per_exercise))
+    db.execute(delete(ExerciseSubstitute))
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(ExerciseSubstitute), rows[start:start + 5000])
+    db.commit()
+    return len(rows)
+
+def _needs_only(exercise_id_column, equipment_ids: Set[int]):
+    """Exercises that need no equipment outside `equipment_ids`."""
+    needs_other = select(exercise_equipment.c.exercise_id).where(
+        exercise_equipment.c.exercise_id == exercise_id_column
+    )
+    if equipment_ids:
+        needs_other = needs_other.where(exercise_equipment.c.equipment_id.not_in(equipment_ids))
+    return ~needs_other.exists()
+
+def _related(exercise_ids: List[int], limit: int, equipment_ids: Optional[Set[int]] = None):
+    """Ids of up to `limit` exercises that can score above zero against
+    any of `exercise_ids`: they share a muscle, equipment or the category
+    (difficulty is scored within a category). Those sharing a muscle come
+    first, then the category, then equipment only."""
+    muscles = exercise_muscles.alias()
+    equipment = exercise_equipment.alias()
+    candidates = union_all(
+        select(exercise_muscles.c.exercise_id.label("exercise_id"), literal(0).label("priority"))
+        .join(muscles, muscles.c.muscle_id == exercise_muscles.c.muscle_id)
+        .where(muscles.c.exercise_id.in_(exercise_ids)),
+        select(Exercise.id, literal(1)).where(
+            Exercise.category.in_(select(Exercise.category).where(Exercise.id.in_(exercise_ids)))
+        ),
+        select(exercise_equipment.c.exercise_id, literal(2))
+        .join(equipment, equipment.c.equipment_id == exercise_equipment.c.equipment_id)
+        .where(equipment.c.exercise_id.in_(exercise_ids))
+    ).subquery()
+    query = select(candidates.c.exercise_id)
+    if equipment_ids is not None:
+        query = query.where(_needs_only(candidates.c.exercise_id, equipment_ids))
+    return (
+        query.group_by(candidates.c.exercise_id)
+        .order_by(func.min(candidates.c.priority), candidates.c.exercise_id)
+        .limit(limit)
+    )
+
+def _fit(
+    new: Dict[int, Vector],
+    corpus: Dict[int, Vector],
+    current: Dict[int, Neighbours],
+    k: int
+) -> Tuple[List[dict], Set[Tuple[int, int]]]:
+    """Rows for the new exercises' alternatives and for the places they
+    take among existing exercises' (`current`) ones, and the (exercise,
+    substitute) pairs those push out."""
+    rows = _rows(_nearest_python(new, corpus, k))
+    dropped: Set[Tuple[int, int]] = set()
+    existing = {exercise_id: vector for exercise_id, vector in corpus.items() if exercise_id not in new}
+    for exercise_id, candidates in _nearest_python(existing, new, k).items():
+        if not candidates:
+            continue
+        merged = _best(dict(current.get(exercise_id, []) + candidates), k)
+        kept = {substitute_id for substitute_id, _ in merged}
+        rows.extend(_rows({exercise_id: [item for item in candidates if item[0] in kept]}))
+        dropped.update(
+            (exercise_id, substitute_id)
+            for substitute_id, _ in current.get(exercise_id, [])
+            if substitute_id not in kept
+        )
+    return rows, dropped
+
+class SubstituteService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _vectors(self, exercise_ids) -> Dict[int, Vector]:
+        results = [await self.db.execute(statement) for statement in _feature_statements(exercise_ids)]
+        return _vectors(*results)
+
+    async def add_exercises(self, exercise_ids: Sequence[int]):
+        """Fit new exercises into the index in the caller's transaction:
+        their own alternatives, plus a place among the alternatives of
+        existing exercises they are now closer to than the current ones."""
+        k = settings.exercise_substitutes_per_exercise
+        new = await self._vectors(list(exercise_ids))
+        if not new:
+            return
+        ids = list(new)
+        related = list(await self.db.scalars(_related(ids, settings.exercise_substitutes_related_max)))
+        corpus = await self._vectors(related)
+        corpus.update(new)
+
+        # Adding an exercise again replaces whatever it had
+        await self.db.execute(delete(ExerciseSubstitute).where(
+            ExerciseSubstitute.exercise_id.in_(ids) | ExerciseSubstitute.substitute_id.in_(ids)
+        ))
+        existing_ids = [exercise_id for exercise_id in corpus if exercise_id not in new]
+        current: Dict[int, Neighbours] = defaultdict(list)
+        if existing_ids:
+            for exercise_id, substitute_id, score in await self.db.execute(
+                select(ExerciseSubstitute.exercise_id, ExerciseSubstitute.substitute_id, ExerciseSubstitute.score)
+                .where(ExerciseSubstitute.exercise_id.in_(existing_ids))
+            ):
+                current[exercise_id].append((substitute_id, score))
+
+        rows, dropped = await run_in_threadpool(_fit, new, corpus, current, k)
+        if dropped:
+            await self.db.execute(
+                delete(ExerciseSubstitute).where(
+                    tuple_(ExerciseSubstitute.exercise_id, ExerciseSubstitute.substitute_id).in_(dropped)
+                )
+            )
+        if rows:
+            await self.db.execute(insert(ExerciseSubstitute), rows)
+
+    async def substitutes(
+        self,
+        exercise_id: int,
+        equipment_ids: Optional[Set[int]] = None,
+        limit: int = 10
+    ) -> Neighbours:
+        """(substitute id, score), best first. With `equipment_ids`, only
+        exercises that need nothing outside it."""
+        query = (
+            select(ExerciseSubstitute.substitute_id, ExerciseSubstitute.score)
+            .where(ExerciseSubstitute.exercise_id == exercise_id)
+            .order_by(ExerciseSubstitute.score.desc(), ExerciseSubstitute.substitute_id)
+            .limit(limit)
+        )
+        if equipment_ids is not None:
+            query = query.where(_needs_only(ExerciseSubstitute.substitute_id, equipment_ids))
+        found = [(substitute_id, score) for substitute_id, score in await self.db.execute(query)]
+        if equipment_ids is None or len(found) == limit:
+            return found
+        # The stored lists are cut off before filtering, so the equipment at
+        # hand can rule out all of them while suitable exercises rank lower
+        return await self._nearest_usable(exercise_id, equipment_ids, limit)
+
+    async def _nearest_usable(self, exercise_id: int, equipment_ids: Set[int], limit: int) -> Neighbours:
+        """Score the exercise against the related ones usable with
+        `equipment_ids`, rather than against its stored alternatives."""
+        query = await self._vectors([exercise_id])
+        if not query:
+            return []
+        related = list(await self.db.scalars(
+            _related([exercise_id], settings.exercise_substitutes_related_max, equipment_ids)
+        ))
+        corpus = await self._vectors(related)
+        neighbours = (await run_in_threadpool(_nearest_python, query, corpus, limit))[exercise_id]
+        return [(substitute_id, round(score, 6)) for substitute_id, score in neighbours]
+
+_pending_lock = threading.Lock()
+_pending: Set[int] = set()
+_flush_scheduled = False
+
+async def _add_exercises(exercise_ids: Sequence[int]):
+    if len(exercise_ids) > INCREMENTAL_MAX:
+        def rebuild():
+            with SessionLocal() as db:
+                rebuild_substitutes(db)
+
+        await run_in_threadpool(rebuild)
+        return
+    async with AsyncSessionLocal() as db:
+        await SubstituteService(db).add_exercises(exercise_ids)
+        await db.commit()
+
+async def refresh_substitutes(exercise_ids: Sequence[int]):
+    """Background task run after exercises are created. Exercises created
+    within `exercise_substitutes_refresh_delay_seconds` of each other are
+    fitted in together, by whichever task queued the first of them."""
+    global _flush_scheduled
+    delay = settings.exercise_substitutes_refresh_delay_seconds
+    if delay <= 0 or len(exercise_ids) > INCREMENTAL_MAX:
+        await _add_exercises(exercise_ids)
+        return
+    with _pending_lock:
+        _pending.update(exercise_ids)
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+    await asyncio.sleep(delay)
+    with _pending_lock:
+        batch = sorted(_pending)
+        _pending.clear()
+        _flush_scheduled = False
+    await _add_exercises(batch)
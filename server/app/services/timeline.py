@@ -0,0 +1,197 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, delete, exists, func, insert, literal, select, tuple_, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.social import FeedPullAuthor, Post, TimelineEntry, friendship
+
+TIMELINE_COLUMNS = ["user_id", "post_id", "author_id", "created_at"]
+
+class TimelineService:
+    """Per-user feeds, precomputed on write (fan-out) with a read-time pull
+    for authors that have too many followers to fan out to."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def fan_out(self, post: Post):
+        """Add a new post to its author's and followers' timelines.
+
+        Runs in the caller's transaction, so the post and its timeline
+        entries are committed together.
+        """
+        await self.db.execute(
+            insert(TimelineEntry).values(
+                user_id=post.user_id,
+                post_id=post.id,
+                author_id=post.user_id,
+                created_at=post.created_at
+            )
+        )
+        if await self.db.get(FeedPullAuthor, post.user_id):
+            return
+
+        followers = await self.db.scalar(
+            select(func.count()).select_from(friendship).where(friendship.c.friend_id == post.user_id)
+        )
+        if followers > settings.feed_fanout_max_followers:
+            await self._add_pull_author(post.user_id)
+            return
+        if followers:
+            await self.db.execute(
+                insert(TimelineEntry).from_select(
+                    TIMELINE_COLUMNS,
+                    select(
+                        friendship.c.user_id,
+                        literal(post.id, Integer),
+                        literal(post.user_id, Integer),
+                        literal(post.created_at, DateTime)
+                    ).where(friendship.c.friend_id == post.user_id)
+                )
+            )
+
+    async def _add_pull_author(self, user_id: int):
+        """Register the author for read-time pulls; another request may be
+        doing the same for one of their concurrent posts, so it's a no-op
+        if they are already in."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            await self.db.execute(
+                dialect_insert(FeedPullAuthor)
+                .values(user_id=user_id)
+                .on_conflict_do_nothing(index_elements=["user_id"])
+            )
+            return
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(insert(FeedPullAuthor).values(user_id=user_id))
+        except IntegrityError:
+            pass
+
+    async def backfill(self, user_id: int, friend_id: int):
+        """Copy a new friend's recent posts into the user's timeline."""
+        if await self.db.get(FeedPullAuthor, friend_id):
+            return
+        recent = (
+            select(Post.id, Post.created_at)
+            .where(Post.user_id == friend_id)
+            .order_by(Post.created_at.desc())
+            .limit(settings.feed_backfill_posts)
+            .subquery()
+        )
+        await self.db.execute(
+            insert(TimelineEntry).from_select(
+                TIMELINE_COLUMNS,
+                select(
+                    literal(user_id, Integer),
+                    recent.c.id,
+                    literal(friend_id, Integer),
+                    recent.c.created_at
+                ).where(~exists().where(
+                    TimelineEntry.user_id == user_id,
+                    TimelineEntry.post_id == recent.c.id
+                ))
+            )
+        )
+        await self.db.commit()
+
+    def feed_entries(
+        self,
+        user_id: int,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ):
+        """(post_id, created_at) of the user's feed: their timeline plus the
+        posts of followed pull-authors, optionally older than `before` or
+        newer than `after` a (created_at, post_id) key."""
+        pulled_authors = (
+            select(friendship.c.friend_id)
+            .join(FeedPullAuthor, FeedPullAuthor.user_id == friendship.c.friend_id)
+            .where(friendship.c.user_id == user_id)
+        )
+        timeline = select(TimelineEntry.post_id, TimelineEntry.created_at).where(
+            TimelineEntry.user_id == user_id
+        )
+        pulled = select(Post.id.label("post_id"), Post.created_at).where(
+            Post.user_id.in_(pulled_authors)
+        )
+        # Filter each branch so both stay range scans on their indexes
+        if before:
+            timeline = timeline.where(tuple_(TimelineEntry.created_at, TimelineEntry.post_id) < before)
+            pulled = pulled.where(tuple_(Post.created_at, Post.id) < before)
+        if after:
+            timeline = timeline.where(tuple_(TimelineEntry.created_at, TimelineEntry.post_id) > after)
+            pulled = pulled.where(tuple_(Post.created_at, Post.id) > after)
+        return union(timeline, pulled).subquery()
+
+    async def get_feed(
+        self,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> Tuple[List[Post], bool]:
+        """A page of the feed, newest first, and whether there is more in
+        the paging direction (older, or newer with `after`). Relations are
+        not loaded; see SocialHydrator."""
+        entries = self.feed_entries(user_id, before=before, after=after)
+        # Pages after a cursor are the oldest posts newer than it
+        if after:
+            entry_order = (entries.c.created_at.asc(), entries.c.post_id.asc())
+            post_order = (Post.created_at.asc(), Post.id.asc())
+        else:
+            entry_order = (entries.c.created_at.desc(), entries.c.post_id.desc())
+            post_order = (Post.created_at.desc(), Post.id.desc())
+        page = select(entries.c.post_id).order_by(*entry_order).limit(limit + 1).subquery()
+        posts = (await self.db.scalars(
+            select(Post)
+            .join(page, Post.id == page.c.post_id)
+            .order_by(*post_order)
+        )).all()
+        has_more = len(posts) > limit
+        posts = posts[:limit]
+        if after:
+            posts.reverse()
+        return posts, has_more
+
+async def backfill_friendship(user_id: int, friend_id: int):
+    """Background task run after a friendship is created."""
+    async with AsyncSessionLocal() as db:
+        await TimelineService(db).backfill(user_id, friend_id)
+
+def rebuild_timelines(db: Session) -> int:
+    """Recompute every timeline and the pull-author list from posts and
+    friendships. Returns the number of timeline entries written."""
+    db.execute(delete(TimelineEntry))
+    db.execute(delete(FeedPullAuthor))
+
+    popular_authors = (
+        select(friendship.c.friend_id, func.now())
+        .group_by(friendship.c.friend_id)
+        .having(func.count() > settings.feed_fanout_max_followers)
+    )
+    db.execute(insert(FeedPullAuthor).from_select(["user_id", "since"], popular_authors))
+
+    own_posts = db.execute(
+        insert(TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(Post.user_id, Post.id, Post.user_id, Post.created_at)
+        )
+    )
+    followed_posts = db.execute(
+        insert(TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(friendship.c.user_id, Post.id, Post.user_id, Post.created_at)
+            .join(friendship, friendship.c.friend_id == Post.user_id)
+            .where(Post.user_id.not_in(select(FeedPullAuthor.user_id)))
+        )
+    )
+    db.commit()
+    return own_posts.rowcount + followed_posts.rowcount
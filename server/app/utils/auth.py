@@ -1,26 +1,49 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import Depends, HTTPException, status
+from typing import Optional, Tuple
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import os
+import secrets
+from ..core.config import settings
 from ..database.database import get_db
 from ..models import models
+from .user_cache import UserSnapshot, user_cache
+from .hashing_pool import HashingPool, HashingPoolSaturated
 
 load_dotenv()
 
-# Password hashing - try to initialize bcrypt safely
-try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=12)
-    # Test the context to ensure it works
-    test_hash = pwd_context.hash("test")
-except Exception as e:
-    # Fallback to a simpler context if bcrypt fails
-    print(f"Bcrypt initialization failed: {e}, using fallback")
-    pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Password hashing - bcrypt is probed on first use rather than at import,
+# since a test hash costs a full bcrypt round on every worker start
+_pwd_context: Optional[CryptContext] = None
+
+def get_pwd_context() -> CryptContext:
+    global _pwd_context
+    if _pwd_context is None:
+        try:
+            # Hashes outside [min_rounds, max_rounds] report needs_update, which
+            # is what drives rehash-on-login when password_hash_rounds changes
+            rounds = settings.password_hash_rounds
+            context = CryptContext(
+                schemes=["bcrypt"],
+                deprecated="auto",
+                bcrypt__default_rounds=rounds,
+                bcrypt__min_rounds=rounds,
+                bcrypt__max_rounds=rounds
+            )
+            # Test the context to ensure it works
+            context.hash("test")
+        except Exception as e:
+            # Fallback to a simpler context if bcrypt fails
+            print(f"Bcrypt initialization failed: {e}, using fallback")
+            context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+        _pwd_context = context
+    return _pwd_context
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -30,12 +53,36 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     # Truncate password to 72 bytes to comply with bcrypt limit
     password = password[:72] if len(password.encode('utf-8')) > 72 else password
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+hashing_pool = HashingPool(settings.password_hash_workers, settings.password_hash_max_pending)
+
+def _verify_and_update(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+async def _run_hashing(func, *args):
+    try:
+        return await hashing_pool.run(func, *args)
+    except HashingPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+async def hash_password_async(password) -> str:
+    """get_password_hash on the hashing pool, for async handlers."""
+    return await _run_hashing(get_password_hash, password)
+
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Verify on the hashing pool; also returns a new hash when the stored one
+    uses outdated settings (else None)."""
+    return await _run_hashing(_verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -47,20 +94,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _token_subject(token: str) -> Optional[str]:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserSnapshot:
+    """Resolve the bearer token to a UserSnapshot, from the user cache when possible."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    username = _token_subject(token)
+    if username is None:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == username).first()
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        user = db.query(models.User).filter(models.User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(username, snapshot)
+    return snapshot
+
+async def get_user_for_token(token: str, db: AsyncSession) -> Optional[UserSnapshot]:
+    """get_current_user for connections that can't send an Authorization
+    header (WebSockets); None when the token is invalid."""
+    username = _token_subject(token)
+    if username is None:
+        return None
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        user = await db.scalar(select(models.User).where(models.User.username == username))
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(username, snapshot)
+    return snapshot
+
+def get_current_db_user(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The current user as an ORM object in the request's session, for handlers
+    that walk relationships or modify the user."""
+    user = db.get(models.User, current_user.id)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """Guard for /api/internal endpoints; they look absent without the configured token."""
+    expected = settings.internal_api_token
+    if not expected or not x_internal_token or not secrets.compare_digest(x_internal_token, expected):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
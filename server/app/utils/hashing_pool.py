@@ -0,0 +1,80 @@
+"""Bounded thread pool for password hashing
+
+bcrypt is deliberately slow (~250 ms at 12 rounds) and releases the GIL while
+it works, so hashes run on a small dedicated pool: the event loop stays free,
+several hashes proceed in parallel, and a login burst queues here instead of
+starving the threads that serve every other request.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many hashes are already waiting."""
+
+class HashingPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0  # queued + running
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    def _timed(self, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            self.running += 1
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_seconds += time.perf_counter() - started
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingPoolSaturated()
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._timed, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            }
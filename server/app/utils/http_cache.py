@@ -0,0 +1,34 @@
+"""Conditional GET helpers for responses built from cached bytes"""
+
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+def etag_for(body: bytes) -> str:
+    # Content-derived, so every worker gives the same tag for the same body
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    # Weak comparison: a W/ prefix added by a proxy still matches
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def conditional_json(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """`body` as a JSON response with an ETag, or an empty 304 when the
+    client's If-None-Match already has it. Clients revalidate every time
+    (no-cache), so a changed catalog is seen on the next request."""
+    etag = etag or etag_for(body)
+    response_headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,61 @@
+"""Batched relation loading for response listings
+
+Serialising a page of ORM rows touches each row's relationships, which on
+an async session is either a lazy-load error or, with eager options, one
+query per relationship that still can't be shared between listings.
+A BatchLoader instead gathers the keys a whole page needs, fetches them in
+one `IN` query and caches the result for the rest of the request:
+
+    authors = BatchLoader(db, User)
+    await authors.attach(posts, "user", "user_id")
+
+Keys already loaded are never fetched twice, so loaders can be shared by
+everything that renders the same request.
+"""
+
+from typing import Any, Dict, Generic, Iterable, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+ModelType = TypeVar("ModelType")
+
+class BatchLoader(Generic[ModelType]):
+    def __init__(self, db: AsyncSession, model: Type[ModelType], key: str = "id"):
+        self.db = db
+        self.model = model
+        self.key = key
+        self._loaded: Dict[Any, Optional[ModelType]] = {}
+        self.queries = 0
+
+    async def load_many(self, keys: Iterable[Any]) -> Dict[Any, Optional[ModelType]]:
+        """Objects for `keys` (None where no row matches), fetching the
+        ones not seen yet in a single query."""
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        missing = [key for key in keys if key not in self._loaded]
+        if missing:
+            column = getattr(self.model, self.key)
+            rows = await self.db.scalars(select(self.model).where(column.in_(missing)))
+            self.queries += 1
+            for row in rows:
+                self._loaded[getattr(row, self.key)] = row
+            for key in missing:
+                self._loaded.setdefault(key, None)
+        return {key: self._loaded[key] for key in keys}
+
+    async def load(self, key: Any) -> Optional[ModelType]:
+        if key is None:
+            return None
+        return (await self.load_many([key]))[key]
+
+    def prime(self, obj: ModelType):
+        """Seed the loader with an object the caller already has."""
+        self._loaded[getattr(obj, self.key)] = obj
+
+    async def attach(self, objects: Sequence[Any], relationship: str, foreign_key: str):
+        """Populate a many-to-one `relationship` on every object from its
+        `foreign_key`, without marking the objects dirty."""
+        related = await self.load_many(getattr(obj, foreign_key) for obj in objects)
+        for obj in objects:
+            set_committed_value(obj, relationship, related.get(getattr(obj, foreign_key)))
@@ -0,0 +1,118 @@
+"""Short-lived cache of authenticated users, keyed by token subject"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The user columns request handlers need, detached from any session."""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            is_active=user.is_active
+        )
+
+class UserCache:
+    """Bounded LRU of token subject -> UserSnapshot with a per-entry TTL.
+
+    Each worker has its own cache; changes made through the ORM invalidate it
+    in the worker that made them, and the TTL bounds staleness elsewhere.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._subjects_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(subject)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, snapshot: UserSnapshot):
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if subject in self._entries:
+                self._remove(subject)
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._subjects_by_user.setdefault(snapshot.id, set()).add(subject)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        """Forget every cached subject that resolves to `user_id`."""
+        with self._lock:
+            for subject in list(self._subjects_by_user.get(user_id, ())):
+                self._remove(subject)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._subjects_by_user.clear()
+
+    def _remove(self, subject: str):
+        _, snapshot = self._entries.pop(subject)
+        subjects = self._subjects_by_user.get(snapshot.id)
+        if subjects is not None:
+            subjects.discard(subject)
+            if not subjects:
+                del self._subjects_by_user[snapshot.id]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+def invalidate_user(user_id: int):
+    """Call after changing a user outside the ORM unit of work (bulk UPDATE, raw SQL)."""
+    user_cache.invalidate(user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
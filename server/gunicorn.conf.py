@@ -0,0 +1,21 @@
+"""Gunicorn settings for production
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app (and the form-check models) are loaded once in the master and then
+forked, so every worker shares the same copy of the weights copy-on-write
+instead of loading its own.
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+def on_starting(server):
+    # Runs in the master before any worker is forked
+    from app.core.ai_model import preload_models
+
+    preload_models(pin=True)
@@ -51,4 +51,28 @@ def test_login():
     assert response.status_code == 200
     data = response.json()
     assert "access_token" in data
-    assert data["token_type"] == "bearer"
\ No newline at end of file
+    assert data["token_type"] == "bearer"
+
+
+def test_login_rehashes_outdated_password_hash():
+    from passlib.hash import bcrypt
+    from app.core.config import settings
+
+    db = TestingSessionLocal()
+    db.add(models.User(
+        email="rehash@example.com",
+        username="rehashuser",
+        hashed_password=bcrypt.using(rounds=4).hash("rehashpass")
+    ))
+    db.commit()
+
+    response = client.post(
+        "/api/token",
+        data={"username": "rehash@example.com", "password": "rehashpass"}
+    )
+    assert response.status_code == 200
+
+    user = db.query(models.User).filter(models.User.email == "rehash@example.com").first()
+    db.refresh(user)
+    assert bcrypt.from_string(user.hashed_password).rounds == settings.password_hash_rounds
+    db.close()
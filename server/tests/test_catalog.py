@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.crud.base import NEXT_CURSOR_HEADER
+from app.database.database import Base, engine, get_db
+from app.main import app
+from app.models.exercise_library import Exercise
+from app.services import catalog
+from app.services.catalog import CatalogCache
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+def auth_headers():
+    email = "catalog@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "catalogpass"})
+    response = client.post("/api/token", data={"username": email, "password": "catalogpass"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_exercise(headers, name):
+    response = client.post("/api/exercises/", headers=headers, json={
+        "name": name, "difficulty_level": "beginner", "category": "catalog-test", "muscle_ids": []
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_exercise_catalog_etags_and_invalidation(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    monkeypatch.setattr(settings, "db_query_debug_headers", True)
+    headers = auth_headers()
+    first = create_exercise(headers, "Catalog Squat")
+    second = create_exercise(headers, "Catalog Lunge")
+
+    params = {"category": "catalog-test"}
+    response = client.get("/api/exercises/", params=params, headers=headers)
+    assert response.status_code == 200
+    assert [exercise["id"] for exercise in response.json()] == [first, second]
+    etag = response.headers["etag"]
+
+    # Unchanged catalog: served from the snapshot, and a matching ETag is a 304
+    cached = client.get("/api/exercises/", params=params, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["x-db-query-count"] == "0"
+
+    # Pages follow X-Next-Cursor
+    page = client.get("/api/exercises/", params={**params, "limit": 1}, headers=headers)
+    assert [exercise["id"] for exercise in page.json()] == [first]
+    page = client.get(
+        "/api/exercises/",
+        params={**params, "limit": 1, "cursor": page.headers[NEXT_CURSOR_HEADER]},
+        headers=headers
+    )
+    assert [exercise["id"] for exercise in page.json()] == [second]
+    assert NEXT_CURSOR_HEADER not in page.headers
+
+    # Adding an exercise invalidates the snapshot, so the old ETag no longer matches
+    third = create_exercise(headers, "Catalog Plank")
+    changed = client.get("/api/exercises/", params=params, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [exercise["id"] for exercise in changed.json()] == [first, second, third]
+
+    muscles = client.get("/api/muscles/")
+    assert muscles.status_code == 200
+    assert client.get("/api/muscles/", headers={"If-None-Match": muscles.headers["etag"]}).status_code == 304
+
+def test_concurrent_requests_share_one_rebuild(monkeypatch):
+    async def scenario():
+        async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+            monkeypatch.setattr(catalog, "AsyncSessionLocal", sessions)
+            cache = CatalogCache()
+            first = await asyncio.gather(*(cache.get() for _ in range(5)))
+            assert cache.builds == 1 and all(snapshot is first[0] for snapshot in first)
+
+            # The rebuild after an invalidate reads the committed write
+            async with sessions() as db:
+                db.add(Exercise(id=1, name="Fresh", difficulty_level="beginner", category="strength"))
+                await db.commit()
+            cache.invalidate()
+            snapshot = await cache.get()
+            assert cache.builds == 2 and snapshot.exercise(1)["name"] == "Fresh"
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+def test_derived_structures_are_built_off_the_loop(monkeypatch):
+    async def scenario():
+        async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            monkeypatch.setattr(catalog, "AsyncSessionLocal", async_sessionmaker(async_engine))
+            await check(CatalogCache())
+        finally:
+            await async_engine.dispose()
+
+    async def check(cache):
+        release = threading.Event()
+        builds = []
+
+        def build(snapshot):
+            builds.append(snapshot.version)
+            assert release.wait(5)
+            return {"version": snapshot.version}
+
+        release.set()
+        # The first build is waited for, and concurrent callers share it
+        first = await asyncio.gather(*(cache.derived("index", build) for _ in range(3)))
+        assert builds == [0] and all(value is first[0] for value in first)
+
+        # After a change, the old index answers until the new one is ready
+        release.clear()
+        cache.invalidate()
+        assert await cache.derived("index", build) is first[0]
+        assert await cache.derived("index", build) is first[0]
+        release.set()
+        _, _, task = cache._deriving["index"]
+        assert await task == {"version": 1}
+        assert await cache.derived("index", build) == {"version": 1}
+        assert builds == [0, 1]
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database.database import Base
+from app.database.query_stats import capture_queries, instrument_engine
+from app.models.social import Challenge, ChallengeActivity, ChallengeScore, challenge_participants
+from app.models.user import User
+from app.core.config import settings
+from app.schemas.social import ChallengeActivityBatch, ChallengeActivityBatchItem
+from app.services.challenge_activity import ChallengeActivityService
+
+def item(challenge_id, key, value=1000, days_ago=0):
+    return ChallengeActivityBatchItem(
+        challenge_id=challenge_id,
+        idempotency_key=key,
+        value=value,
+        activity_date=datetime(2024, 1, 8) - timedelta(days=days_ago)
+    )
+
+def test_batch_ingest_dedupes_and_checks_membership():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrument_engine(engine.sync_engine)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            db.add(User(id=1, email="a@example.com", username="a"))
+            db.add_all([
+                Challenge(
+                    id=challenge_id, name=f"Steps {challenge_id}", creator_id=1,
+                    start_date=datetime(2024, 1, 1), end_date=datetime(2024, 2, 1),
+                    challenge_type="steps", target_value=100000
+                )
+                for challenge_id in (1, 2, 3)
+            ])
+            await db.execute(insert(challenge_participants), [
+                {"challenge_id": 1, "user_id": 1}, {"challenge_id": 2, "user_id": 1}
+            ])
+            await db.commit()
+            service = ChallengeActivityService(db)
+
+            # A week of steps for two challenges: membership check, insert, two score upserts
+            week = [item(1, f"steps-{day}", days_ago=day) for day in range(7)] + [item(2, "run-0", value=5)]
+            with capture_queries() as stats:
+                created, duplicates, totals = await service.ingest(1, week + [item(1, "steps-0")])
+            assert stats.count == 4
+            await db.commit()
+            assert len(created) == 8 and duplicates == ["steps-0"]
+            assert totals == {1: 7000, 2: 5}
+
+            # Re-sending the sync only adds what is new
+            created, duplicates, totals = await service.ingest(1, week + [item(1, "steps-7", value=500)])
+            await db.commit()
+            assert [activity.idempotency_key for activity in created] == ["steps-7"]
+            assert len(duplicates) == 8 and totals == {1: 7500}
+            assert await db.scalar(select(func.count()).select_from(ChallengeActivity)) == 9
+            assert await db.scalar(select(ChallengeScore.total).where(ChallengeScore.challenge_id == 1)) == 7500
+
+            with pytest.raises(HTTPException) as error:
+                await service.ingest(1, [item(3, "other")])
+            assert error.value.status_code == 403
+            with pytest.raises(HTTPException) as error:
+                await service.ingest(1, [item(1, "x"), item(99, "y")])
+            assert error.value.status_code == 404
+
+    asyncio.run(scenario())
+
+def test_batch_size_is_capped_before_items_are_validated():
+    oversized = [{"not": "an activity"}] * (settings.challenge_activity_batch_max + 1)
+    with pytest.raises(ValidationError) as error:
+        ChallengeActivityBatch(activities=oversized)
+    assert [problem["type"] for problem in error.value.errors()] == ["too_long"]
@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base
+from app.models.social import Post
+from app.models.user import User
+from app.routes.social import _insert_like
+from app.services import counters
+from app.services.counters import PostCounters, reconcile_post_counters
+
+def test_counters_like_insert_and_reconcile(monkeypatch):
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            sessions = async_sessionmaker(engine, expire_on_commit=False)
+            monkeypatch.setattr(counters, "AsyncSessionLocal", sessions)
+            await check(sessions)
+        finally:
+            await engine.dispose()
+
+    async def likes_count(db, post_id):
+        db.expire_all()
+        return (await db.get(Post, post_id)).likes_count
+
+    async def check(sessions):
+        post_counters = PostCounters()
+        async with sessions() as db:
+            db.add_all([User(id=1, email="a@example.com", username="a"), Post(id=1, user_id=1, content="hi")])
+            await db.commit()
+
+            # One statement per like, and the unique key makes repeats no-ops
+            assert await _insert_like(db, 1, 1) is True
+            assert await _insert_like(db, 1, 1) is False
+
+            await post_counters.increment(db, 1, "likes_count")
+            await post_counters.increment(db, 1, "likes_count")
+            await db.commit()
+            assert await likes_count(db, 1) == 2
+
+            monkeypatch.setattr(settings, "post_counter_flush_seconds", 1)
+            for _ in range(3):
+                await post_counters.increment(db, 1, "likes_count")
+            assert post_counters.pending() == 1
+            assert await likes_count(db, 1) == 2
+            assert await post_counters.flush() == 1
+            assert await likes_count(db, 1) == 5
+
+            # The like is recent, so its increment might still be buffered somewhere
+            assert await db.run_sync(reconcile_post_counters) == 0
+            # Once settled: only one like row exists, so the count goes back to 1
+            assert await db.run_sync(reconcile_post_counters, settle_seconds=0) == 1
+            assert await likes_count(db, 1) == 1
+            assert await db.run_sync(reconcile_post_counters, settle_seconds=0) == 0
+
+            # A like committed with its increment still buffered isn't counted twice
+            db.add(User(id=2, email="b@example.com", username="b"))
+            assert await _insert_like(db, 1, 2) is True
+            await post_counters.increment(db, 1, "likes_count")
+            await db.commit()
+            assert await db.run_sync(reconcile_post_counters) == 0
+            await post_counters.flush()
+            assert await likes_count(db, 1) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.crud.base import CRUDBase
+from app.database.database import Base
+from app.models.social import Post
+from app.models.user import User
+
+engine = create_engine("sqlite://")
+Base.metadata.create_all(bind=engine)
+TestingSessionLocal = sessionmaker(bind=engine)
+
+posts = CRUDBase(Post)
+users = CRUDBase(User)
+
+@pytest.fixture
+def db():
+    session = TestingSessionLocal()
+    start = datetime(2024, 1, 1)
+    # Two posts share each timestamp so the id tiebreaker matters
+    session.add_all([
+        Post(user_id=1, content=f"post {i}", created_at=start + timedelta(minutes=i // 2))
+        for i in range(7)
+    ])
+    session.commit()
+    yield session
+    session.query(Post).delete()
+    session.commit()
+    session.close()
+
+def test_keyset_pages_cover_every_row_once(db):
+    seen, cursor = [], None
+    while True:
+        page, cursor = posts.get_multi_keyset(
+            db, cursor=cursor, limit=3, order_by=("created_at",), descending=True
+        )
+        seen.extend(post.id for post in page)
+        if cursor is None:
+            break
+    expected = [post.id for post in db.query(Post).order_by(Post.created_at.desc(), Post.id.desc())]
+    assert seen == expected
+
+def test_keyset_filters_and_invalid_cursor(db):
+    page, cursor = posts.get_by_filters_keyset(db, filters={"user_id": 2})
+    assert page == [] and cursor is None
+
+    with pytest.raises(HTTPException) as error:
+        posts.get_multi_keyset(db, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+def test_bulk_create_upsert_and_update():
+    db = TestingSessionLocal()
+    created = users.create_many(db, objs_in=[
+        {"email": f"bulk{i}@example.com", "username": f"bulk{i}", "full_name": "Old"}
+        for i in range(3)
+    ])
+    assert [row.username for row in created] == ["bulk0", "bulk1", "bulk2"]
+
+    upserted = users.upsert_many(
+        db,
+        objs_in=[
+            {"email": "bulk0@example.com", "username": "bulk0", "full_name": "New"},
+            {"email": "bulk3@example.com", "username": "bulk3", "full_name": "New"},
+        ],
+        index_elements=["email"]
+    )
+    assert len(upserted) == 2
+    assert db.query(User).filter(User.email.like("bulk%")).count() == 4
+
+    users.update_many(db, objs_in=[{"id": row.id, "full_name": "Updated"} for row in created])
+    names = {user.username: user.full_name for user in db.query(User).filter(User.email.like("bulk%"))}
+    assert names == {"bulk0": "Updated", "bulk1": "Updated", "bulk2": "Updated", "bulk3": "New"}
+
+    user = db.get(User, created[0].id)
+    users.update(db, db_obj=user, obj_in={"full_name": "Single", "not_a_column": 1})
+    assert user.full_name == "Single"
+    db.close()
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401
+from app.database.database import Base, engine, get_db
+from app.main import app
+from app.services.catalog import CatalogSnapshot
+from app.services.exercise_facets import FacetIndex
+
+def exercise(exercise_id, category, difficulty, equipment=(), muscles=(), created_by=None):
+    return {
+        "id": exercise_id,
+        "name": f"Exercise {exercise_id}",
+        "category": category,
+        "difficulty_level": difficulty,
+        "created_by": created_by,
+        "equipment": [{"id": equipment_id} for equipment_id in equipment],
+        "muscles": [{"id": muscle_id} for muscle_id in muscles],
+    }
+
+def counts(facet):
+    return {value["value"]: value["count"] for value in facet}
+
+def test_facet_counts_apply_the_other_filters():
+    snapshot = CatalogSnapshot(
+        1,
+        [
+            exercise(1, "strength", "beginner", equipment=[1], muscles=[1, 2]),
+            exercise(2, "strength", "advanced", equipment=[1, 2], muscles=[1]),
+            exercise(3, "cardio", "beginner", muscles=[2], created_by=7),
+            exercise(4, "cardio", "intermediate", equipment=[2], created_by=7),
+        ],
+        [{"id": 1, "name": "Barbell"}, {"id": 2, "name": "Kettlebell"}, {"id": 3, "name": "Rower"}],
+        [{"id": 1, "name": "Quads"}, {"id": 2, "name": "Glutes"}]
+    )
+    facets = FacetIndex.for_snapshot(snapshot)
+
+    everything = facets.counts()
+    assert everything["total"] == 4
+    assert counts(everything["category"]) == {"cardio": 2, "strength": 2}
+    assert counts(everything["equipment"]) == {1: 2, 2: 2, 3: 0}
+    assert everything["muscle"][1] == {"value": 2, "name": "Glutes", "count": 2}
+
+    # Picking a category narrows the other facets but not the category facet itself
+    strength = facets.counts(category="strength")
+    assert strength["total"] == 2
+    assert counts(strength["category"]) == {"cardio": 2, "strength": 2}
+    assert counts(strength["difficulty"]) == {"advanced": 1, "beginner": 1, "intermediate": 0}
+    assert counts(strength["equipment"]) == {1: 2, 2: 1, 3: 0}
+
+    narrowed = facets.counts(difficulty="beginner", equipment_id=1)
+    assert narrowed["total"] == 1
+    assert counts(narrowed["category"]) == {"cardio": 0, "strength": 1}
+    assert counts(narrowed["difficulty"]) == {"advanced": 1, "beginner": 1, "intermediate": 0}
+
+    custom = facets.counts(created_by=7)
+    assert custom["total"] == 2 and counts(custom["muscle"]) == {1: 0, 2: 1}
+
+def test_facets_endpoint(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = "facets@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "facetspass"})
+    token = client.post("/api/token", data={"username": email, "password": "facetspass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    facets = client.get("/api/exercises/facets", headers=headers)
+    assert facets.status_code == 200
+    assert facets.json()["total"] == len(client.get("/api/exercises/", headers=headers).json())
+    # Built for the current snapshot, so the body is cached and has an ETag
+    cached = client.get("/api/exercises/facets", headers={**headers, "If-None-Match": facets.headers["etag"]})
+    assert cached.status_code == 304
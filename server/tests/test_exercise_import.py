@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base, SessionLocal, engine, get_db
+from app.main import app
+from app.models.exercise_library import Equipment, Muscle, exercise_muscles
+from app.services.exercise_import import decode_lines, parse_csv
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+@pytest.fixture
+def headers(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    email = "importer@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "importpass"})
+    response = client.post("/api/token", data={"username": email, "password": "importpass"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="module")
+def references():
+    with SessionLocal() as db:
+        barbell = Equipment(name="Import Barbell", category="weights")
+        quads = Muscle(name="Import Quads", body_part="legs")
+        glutes = Muscle(name="Import Glutes", body_part="legs")
+        db.add_all([barbell, quads, glutes])
+        db.commit()
+        return barbell.id, quads.id, glutes.id
+
+def test_create_exercise_resolves_ids_in_bulk(headers, references, monkeypatch):
+    monkeypatch.setattr(settings, "db_query_debug_headers", True)
+    barbell, quads, glutes = references
+    body = {
+        "name": "Import Squat", "difficulty_level": "beginner", "category": "import-test",
+        "equipment_ids": [barbell],
+        "muscle_ids": [{"muscle_id": quads, "is_primary": True}, {"muscle_id": glutes}]
+    }
+    response = client.post("/api/exercises/", headers=headers, json=body)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["equipment"]] == [barbell]
+    assert sorted(item["id"] for item in response.json()["muscles"]) == sorted([quads, glutes])
+    # Auth, one IN query per id kind, three inserts, then the reload with its eager loads
+    assert int(response.headers["x-db-query-count"]) <= 10
+
+    body["equipment_ids"] = [barbell, 99999]
+    response = client.post("/api/exercises/", headers=headers, json=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown equipment ids: [99999]"
+
+def test_import_reports_bad_rows_and_keeps_the_rest(headers, references, monkeypatch):
+    monkeypatch.setattr(settings, "exercise_import_chunk_size", 2)
+    barbell, quads, glutes = references
+    csv_file = "\n".join([
+        "name,category,difficulty_level,equipment_ids,muscle_ids,form_tips",
+        f"CSV Front Squat,import-test,intermediate,{barbell},{quads}:primary;{glutes},\"Elbows up,\nchest tall\"",
+        ",import-test,beginner,,,",
+        f"CSV Lunge,import-test,beginner,,{glutes};12345,",
+        "CSV Jump,import-test,beginner,,,",
+    ])
+    response = client.post(
+        "/api/exercises/import", headers=headers, files={"file": ("library.csv", csv_file, "text/csv")}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2 and result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [4, 5]
+    assert "Unknown muscle ids: [12345]" in result["errors"][1]["error"]
+
+    ndjson = "\n".join([
+        json.dumps({"name": "NDJSON Row", "category": "import-test", "difficulty_level": "advanced", "muscle_ids": []}),
+        "{not json",
+        json.dumps({"name": "NDJSON Bad Level", "category": "import-test", "difficulty_level": "expert", "muscle_ids": []}),
+    ])
+    result = client.post(
+        "/api/exercises/import", headers=headers, files={"file": ("library.ndjson", ndjson)}
+    ).json()
+    assert result["created"] == 1
+    assert [error["line"] for error in result["errors"]] == [2, 3]
+    assert result["errors"][1]["error"].startswith("difficulty_level")
+
+    listed = client.get("/api/exercises/", params={"category": "import-test"}, headers=headers).json()
+    by_name = {exercise["name"]: exercise for exercise in listed}
+    assert set(by_name) == {"Import Squat", "CSV Front Squat", "CSV Jump", "NDJSON Row"}
+    assert by_name["CSV Front Squat"]["form_tips"] == "Elbows up,\nchest tall"
+    with SessionLocal() as db:
+        primary = db.execute(
+            exercise_muscles.select().where(exercise_muscles.c.exercise_id == by_name["CSV Front Squat"]["id"])
+        ).all()
+    assert {(row.muscle_id, row.is_primary) for row in primary} == {(quads, True), (glutes, False)}
+
+    unknown = client.post("/api/exercises/import", headers=headers, files={"file": ("library.txt", "x")})
+    assert unknown.status_code == 400
+
+def test_import_decodes_the_raw_upload(headers):
+    # Plain byte lines, as iterating the spooled upload yields; nothing
+    # here has the readable() that io.TextIOWrapper would need
+    rows = list(parse_csv(decode_lines(iter([b"\xef\xbb\xbfname,muscle_ids\r\n", b"Caf\xe9 Row,\r\n"]))))
+    assert rows == [(2, {"name": "Caf\ufffd Row", "equipment_ids": [], "muscle_ids": []})]
+
+    upload = (
+        "\ufeffname,category,difficulty_level,muscle_ids\r\n"
+        "Upload Curl,upload-test,beginner,\r\n"
+        "Upload Dip,upload-test,beginner,\r\n"
+    ).encode() + b"Upload \xff Row,upload-test,beginner,\r\n"
+    response = client.post(
+        "/api/exercises/import", headers=headers, files={"file": ("upload.csv", upload, "text/csv")}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"created": 3, "failed": 0, "errors": []}
+    listed = client.get("/api/exercises/", params={"category": "upload-test"}, headers=headers).json()
+    assert sorted(exercise["name"] for exercise in listed) == ["Upload Curl", "Upload Dip", "Upload \ufffd Row"]
@@ -0,0 +1,102 @@
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401
+from app.database.database import Base, engine, get_db
+from app.main import app
+from app.services.catalog import CatalogSnapshot
+from app.services.exercise_search import ExerciseSearchIndex, edit_distance, tokenize
+
+def exercise(exercise_id, name, category="strength", difficulty="beginner", equipment=(), **text):
+    return {
+        "id": exercise_id,
+        "name": name,
+        "description": text.get("description"),
+        "instructions": text.get("instructions"),
+        "form_tips": text.get("form_tips"),
+        "difficulty_level": difficulty,
+        "category": category,
+        "created_by": None,
+        "equipment": [{"id": equipment_id} for equipment_id in equipment],
+        "muscles": [],
+    }
+
+def index_of(exercises):
+    return ExerciseSearchIndex.for_snapshot(CatalogSnapshot(1, exercises, [], []))
+
+def names(results):
+    return [result["name"] for result in results]
+
+def test_tokenize_and_edit_distance():
+    assert tokenize("Développé Couché, 3x10!") == ["developpe", "couche", "3x10"]
+    assert edit_distance("squat", "sqaut", 1) == 1
+    assert edit_distance("deadlift", "dedlfit", 2) == 2
+    assert edit_distance("press", "curl", 1) == 2
+
+def test_search_ranking_typos_prefixes_and_filters():
+    index = index_of([
+        exercise(1, "Barbell Back Squat", equipment=[1], form_tips="Keep your chest up"),
+        exercise(2, "Goblet Squat", equipment=[2]),
+        exercise(3, "Bench Press", description="Press the bar from your chest"),
+        exercise(4, "Jumping Jacks", category="cardio", instructions="Land softly, as in a squat"),
+        exercise(5, "Romanian Deadlift", difficulty="intermediate"),
+    ])
+
+    # Name matches rank above matches in the instructions; ties go by id
+    assert names(index.search("squat")) == ["Barbell Back Squat", "Goblet Squat", "Jumping Jacks"]
+    # Every word must match, in any field
+    assert names(index.search("squat chest")) == ["Barbell Back Squat"]
+    # Typos and a partially typed last word
+    assert names(index.search("romanain dedlift")) == ["Romanian Deadlift"]
+    assert names(index.search("bench pr")) == ["Bench Press"]
+    # Combined with the list filters
+    assert names(index.search("squat", category="strength", equipment_id=1)) == ["Barbell Back Squat"]
+    assert index.search("squat", difficulty="advanced") == []
+    assert index.search("?!") == []
+
+    # Shorter names first among equally good completions
+    assert names(index.autocomplete("squ")) == ["Goblet Squat", "Barbell Back Squat"]
+    assert names(index.autocomplete("gob")) == ["Goblet Squat"]
+    assert index.autocomplete("ro")[0] == {"id": 5, "name": "Romanian Deadlift"}
+
+def test_autocomplete_is_fast_with_a_large_catalog():
+    rng = random.Random(20)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10))) for _ in range(3000)]
+    index = index_of([
+        exercise(exercise_id, " ".join(rng.sample(words, 3)), description=" ".join(rng.sample(words, 12)))
+        for exercise_id in range(1, 50001)
+    ])
+
+    queries = [word[:length] for word in rng.sample(words, 50) for length in (1, 2, 3, len(word))]
+    started = time.perf_counter()
+    for query in queries:
+        assert index.autocomplete(query)
+    assert (time.perf_counter() - started) / len(queries) < 0.02
+
+client = TestClient(app)
+
+@pytest.fixture
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+def test_search_endpoints(tables, monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    email = "search@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "searchpass"})
+    token = client.post("/api/token", data={"username": email, "password": "searchpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post("/api/exercises/", headers=headers, json={
+        "name": "Zercher Carry", "difficulty_level": "advanced", "category": "search-test",
+        "form_tips": "Brace hard", "muscle_ids": []
+    }).json()
+
+    results = client.get("/api/exercises/search", params={"q": "zerhcer", "category": "search-test"})
+    assert results.status_code == 200
+    assert [exercise["id"] for exercise in results.json()] == [created["id"]]
+    assert client.get("/api/exercises/search", params={"q": "zercher", "difficulty": "beginner"}).json() == []
+
+    suggestions = client.get("/api/exercises/autocomplete", params={"q": "Zerc"})
+    assert suggestions.json() == [{"id": created["id"], "name": "Zercher Carry"}]
@@ -0,0 +1,51 @@
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database.database import Base
+from app.database.query_stats import capture_queries, instrument_engine
+from app.models.social import friendship
+from app.models.user import User
+from app.services.friend_graph import FriendGraphService, friend_graph_cache
+
+def test_friend_sets_and_suggestions():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrument_engine(engine.sync_engine)
+        friend_graph_cache.clear()
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            friend_graph_cache.clear()
+            await engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            db.add_all([User(id=i, email=f"u{i}@example.com", username=f"u{i}") for i in range(1, 8)])
+            # 1 follows 2, 3, 4; they follow 5 (three times), 6 (twice), 7 (once) and back to 1
+            edges = [(1, 2), (1, 3), (1, 4), (2, 5), (3, 5), (4, 5), (2, 6), (3, 6), (4, 7), (2, 1)]
+            await db.execute(insert(friendship), [{"user_id": a, "friend_id": b} for a, b in edges])
+            await db.commit()
+
+            graph = FriendGraphService(db)
+            assert await graph.friend_ids(1) == {2, 3, 4}
+            with capture_queries() as stats:
+                assert await graph.is_friend(1, 3)
+                assert not await graph.is_friend(1, 5)
+            assert stats.count == 0
+
+            assert await graph.suggestions(1) == [(5, 3), (6, 2), (7, 1)]
+            assert await graph.suggestions(1, limit=1) == [(5, 3)]
+
+            # Following a suggestion drops it straight away
+            await graph.add_friend(1, 5)
+            await db.commit()
+            assert await graph.is_friend(1, 5)
+            assert await graph.suggestions(1) == [(6, 2), (7, 1)]
+
+    asyncio.run(scenario())
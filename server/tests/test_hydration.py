@@ -0,0 +1,54 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base, SessionLocal, engine, get_db
+from app.main import app
+from app.models.achievements import Achievement
+from app.models.models import Workout
+from app.models.user import User
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+def feed_query_count(headers, limit):
+    response = client.get("/api/feed", params={"limit": limit}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+    return int(response.headers["x-db-query-count"]), response.json()
+
+def test_feed_query_count_is_fixed(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    monkeypatch.setattr(settings, "db_query_debug_headers", True)
+    email = "hydration@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "hydrationpass"})
+    token = client.post("/api/token", data={"username": email, "password": "hydrationpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    db = SessionLocal()
+    user_id = db.query(User).filter_by(email=email).one().id
+    workouts = [Workout(name=f"Workout {i}", user_id=user_id) for i in range(3)]
+    achievements = [Achievement(title=f"Badge {i}", user_id=user_id) for i in range(3)]
+    db.add_all(workouts + achievements)
+    db.commit()
+    links = [(workout.id, achievement.id) for workout, achievement in zip(workouts, achievements)]
+    db.close()
+
+    for i in range(12):
+        workout_id, achievement_id = links[i % 3]
+        response = client.post("/api/posts", headers=headers, json={
+            "content": f"post {i}", "workout_id": workout_id, "achievement_id": achievement_id
+        })
+        assert response.status_code == 200
+        assert response.json()["workout"]["id"] == workout_id
+
+    # The page query, then one query each for authors, workouts and achievements
+    small, _ = feed_query_count(headers, 2)
+    large, posts = feed_query_count(headers, 12)
+    assert small == large == 4
+    assert {post["achievement"]["title"] for post in posts} == {"Badge 0", "Badge 1", "Badge 2"}
+    assert all(post["user"]["username"] == email for post in posts)
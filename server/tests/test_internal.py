@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+def test_internal_endpoints_hidden_without_token():
+    response = client.get("/api/internal/db/pool")
+    assert response.status_code == 404
+
+def test_pool_stats(monkeypatch):
+    monkeypatch.setattr(settings, "internal_api_token", "secret")
+    response = client.get("/api/internal/db/pool", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["sync"]["pool_size"] == settings.db_pool_size
+    assert "checked_out" in data["sync"]
+    assert "avg_wait_ms" in data["sync"]
+    assert "pool_class" in data["async"]
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database.database import Base
+from app.models.social import Challenge, ChallengeActivity, challenge_participants
+from app.models.user import User
+from app.services.leaderboard import LeaderboardService, rebuild_leaderboards
+
+def _run(check):
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+async def _challenge(db, user_ids):
+    db.add_all([User(id=i, email=f"u{i}@example.com", username=f"u{i}") for i in user_ids])
+    db.add(Challenge(
+        id=1, name="Steps", creator_id=user_ids[0], start_date=datetime.utcnow(),
+        end_date=datetime.utcnow(), challenge_type="steps", target_value=100
+    ))
+    await db.execute(
+        insert(challenge_participants),
+        [{"challenge_id": 1, "user_id": i} for i in user_ids]
+    )
+
+def test_standings_ranks_and_views():
+    async def check(sessions):
+        async with sessions() as db:
+            await _challenge(db, [1, 2, 3, 4])
+            service = LeaderboardService(db)
+            for user_id, total in [(1, 50), (2, 80), (3, 50), (4, 10)]:
+                await service.add_to_score(1, user_id, total)
+            await db.commit()
+
+            assert await service.top(1, 3) == [(1, 2, 80), (2, 1, 50), (2, 3, 50)]
+            assert await service.rank(1, 4) == 4
+            assert await service.around(1, 3, 1) == [(2, 1, 50), (2, 3, 50), (4, 4, 10)]
+            assert await service.around(1, 2, 2) == [(1, 2, 80), (2, 1, 50), (2, 3, 50)]
+            assert await service.for_users(1, [4, 2, 99]) == [(1, 2, 80), (4, 4, 10)]
+
+            await service.add_to_score(1, 4, 80)
+            await db.commit()
+            assert await service.rank(1, 4) == 1
+            assert await service.rank(1, 2) == 2
+            assert await service.rank(1, 99) is None
+            assert await service.around(1, 99, 2) == []
+
+    _run(check)
+
+def test_leaderboard_totals_and_rebuild():
+    async def check(sessions):
+        async with sessions() as db:
+            await _challenge(db, [1, 2, 3])
+            service = LeaderboardService(db)
+            for user_id in (1, 2, 3):
+                await service.add_participant(1, user_id)
+            await db.commit()
+            assert [user_id for _, user_id, _ in await service.top(1, 3)] == [1, 2, 3]
+
+            for user_id, value in [(2, 30), (3, 10), (2, 5), (3, 40)]:
+                db.add(ChallengeActivity(challenge_id=1, user_id=user_id, value=value))
+                await service.add_to_score(1, user_id, value)
+                await db.commit()
+            standings = await service.top(1, 3)
+            assert standings == [(1, 3, 50), (2, 2, 35), (3, 1, 0)]
+
+            # Rebuilding from the activity log yields the same totals
+            assert await db.run_sync(rebuild_leaderboards) == 3
+            assert await service.top(1, 3) == standings
+
+    _run(check)
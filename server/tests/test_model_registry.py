@@ -0,0 +1,50 @@
+import gc
+import sys
+import threading
+
+from app.core.model_registry import ModelRegistry
+
+def test_model_loads_once_and_unloads_when_idle():
+    loads = []
+    registry = ModelRegistry()
+    registry.register("model", lambda: loads.append(1) or object())
+
+    assert registry.get("model") is registry.get("model")
+    assert len(loads) == 1
+
+    assert registry.unload_idle(0) == ["model"]
+    assert registry.status()["model"]["loaded"] is False
+
+def test_preloaded_model_is_pinned(monkeypatch):
+    # A real gc.freeze() would leak into every later test in this process
+    frozen = []
+    monkeypatch.setattr(gc, "freeze", lambda: frozen.append(1), raising=False)
+    registry = ModelRegistry()
+    registry.register("model", object)
+    registry.preload(["model"])
+
+    assert frozen == [1]
+    assert registry.unload_idle(0) == []
+    assert registry.status()["model"]["pinned"] is True
+
+def test_get_never_returns_a_model_being_unloaded():
+    registry = ModelRegistry()
+    registry.register("model", object)
+    stop = threading.Event()
+
+    def unload():
+        while not stop.is_set():
+            registry.unload_idle(0)
+
+    # Switch threads as often as possible to hit the window between the
+    # load check and the return
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    unloader = threading.Thread(target=unload)
+    unloader.start()
+    try:
+        assert all(registry.get("model") is not None for _ in range(50000))
+    finally:
+        stop.set()
+        unloader.join()
+        sys.setswitchinterval(interval)
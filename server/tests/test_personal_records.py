@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database.database import Base, SessionLocal, engine, get_db
+from app.database.query_stats import capture_queries, instrument_engine
+from app.main import app
+from app.models.exercise_library import Exercise, ExerciseProgress, PersonalRecord
+from app.models.user import User
+from app.services.personal_records import PersonalRecordService, rebuild_personal_records
+
+client = TestClient(app)
+
+def test_records_are_detected_from_the_ledger():
+    async def scenario():
+        async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrument_engine(async_engine.sync_engine)
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(async_engine, expire_on_commit=False))
+        finally:
+            await async_engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            db.add_all([User(id=1, email="a@example.com", username="a"), User(id=2, email="b@example.com", username="b")])
+            db.add(Exercise(id=1, name="Squat"))
+            await db.commit()
+            service = PersonalRecordService(db)
+
+            async def log(user_id, **metrics):
+                progress = ExerciseProgress(user_id=user_id, exercise_id=1, date=datetime.utcnow(), **metrics)
+                db.add(progress)
+                await db.flush()
+                with capture_queries() as stats:
+                    broken = await service.record(progress)
+                assert stats.count == 1
+                await db.commit()
+                return broken
+
+            assert await log(1, weight=100, reps=5, sets=3) == ["weight", "estimated_1rm", "volume", "reps"]
+            # Same load for more reps: no weight PR, but 1RM, volume and reps at 100kg
+            assert await log(1, weight=100, reps=6, sets=3) == ["estimated_1rm", "volume", "reps"]
+            assert await log(1, weight=100, reps=6, sets=3) == []
+            # A heavier single; reps at 125kg are a new record of their own
+            assert await log(1, weight=125, reps=1) == ["weight", "estimated_1rm", "reps"]
+            assert await log(1, distance=400.0, duration=90) == ["distance", "duration"]
+            await log(2, weight=125, reps=3)
+
+            records = {(record.record_type, record.weight): record.value for record in await service.for_user(1)}
+            assert records[("weight", 0)] == 125 and records[("reps", 100)] == 6 and records[("volume", 0)] == 1800
+
+            board = await service.board(1, "weight")
+            assert [(entry["rank"], entry["username"], entry["value"]) for entry in board] == [(1, "a", 125), (1, "b", 125)]
+            assert [entry["username"] for entry in await service.board(1, "reps", weight=125)] == ["b", "a"]
+
+    asyncio.run(scenario())
+
+def test_backfill_replays_history():
+    sync_engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        db.add(User(id=1, email="a@example.com", username="a"))
+        db.add(Exercise(id=1, name="Deadlift"))
+        start = datetime(2024, 1, 1)
+        db.add_all([
+            ExerciseProgress(id=1, user_id=1, exercise_id=1, date=start, weight=100, reps=5),
+            ExerciseProgress(id=2, user_id=1, exercise_id=1, date=start + timedelta(days=2), weight=90, reps=5),
+            ExerciseProgress(id=3, user_id=1, exercise_id=1, date=start + timedelta(days=1), weight=100, reps=8,
+                             is_personal_record=True, pr_type="weight"),
+        ])
+        db.commit()
+
+        assert rebuild_personal_records(db) == 5
+        flags = db.execute(select(ExerciseProgress.id, ExerciseProgress.pr_type).order_by(ExerciseProgress.id)).all()
+        assert flags == [(1, "weight"), (2, "reps"), (3, "estimated_1rm")]
+        best = db.scalar(select(PersonalRecord).where(PersonalRecord.record_type == "estimated_1rm"))
+        assert best.progress_id == 3
+
+        # Idempotent
+        assert rebuild_personal_records(db) == 5
+    sync_engine.dispose()
+
+def test_log_progress_endpoint(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    Base.metadata.create_all(bind=engine)
+    email = "records@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "recordspass"})
+    token = client.post("/api/token", data={"username": email, "password": "recordspass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    with SessionLocal() as db:
+        exercise = Exercise(name="Records Press", difficulty_level="beginner", category="strength")
+        db.add(exercise)
+        db.commit()
+        exercise_id = exercise.id
+
+    logged = client.post(
+        f"/api/exercises/{exercise_id}/progress",
+        headers=headers,
+        json={"exercise_id": exercise_id, "weight": 60, "reps": 5}
+    )
+    assert logged.status_code == 200
+    assert logged.json()["is_personal_record"] and logged.json()["pr_type"] == "weight"
+
+    records = client.get("/api/progress/personal-records", params={"exercise_id": exercise_id}, headers=headers)
+    assert {record["record_type"] for record in records.json()} == {"weight", "estimated_1rm", "volume", "reps"}
+    weight = client.get(
+        "/api/progress/personal-records",
+        params={"exercise_id": exercise_id, "record_type": "weight"},
+        headers=headers
+    )
+    assert [(record["record_type"], record["value"]) for record in weight.json()] == [("weight", 60)]
+    board = client.get(
+        "/api/progress/personal-records/board", params={"exercise_id": exercise_id}, headers=headers
+    )
+    assert [entry["value"] for entry in board.json()] == [60]
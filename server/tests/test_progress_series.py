@@ -0,0 +1,74 @@
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database.database import Base
+from app.models.exercise_library import Exercise, ExerciseProgress
+from app.models.user import User
+from app.services import progress_series
+from app.services.progress_series import ProgressSeriesService, lttb
+
+def test_lttb_keeps_the_shape():
+    x = list(range(2000))
+    y = [math.sin(i / 100) for i in x]
+    y[1234] = 50  # a one-off spike must survive
+    keep = lttb(x, y, 100)
+    assert len(keep) == 100 and keep[0] == 0 and keep[-1] == 1999 and 1234 in keep
+    assert keep == sorted(set(keep))
+    assert lttb(x[:10], y[:10], 100) == list(range(10))
+
+    rng = random.Random(24)
+    noisy = [rng.random() for _ in x]
+    assert progress_series._lttb_python(x, noisy, 57) == progress_series._lttb_numpy(x, noisy, 57)
+
+def test_progress_series_buckets_and_downsampling():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            db.add(User(id=1, email="a@example.com", username="a"))
+            db.add(Exercise(id=1, name="Bench"))
+            monday = datetime(2024, 1, 1, 18)
+            db.add_all([
+                ExerciseProgress(user_id=1, exercise_id=1, date=monday, weight=100, reps=5, sets=3),
+                ExerciseProgress(user_id=1, exercise_id=1, date=monday + timedelta(hours=1), weight=110, reps=1),
+                ExerciseProgress(user_id=1, exercise_id=1, date=monday + timedelta(days=6), weight=90, reps=10),
+                ExerciseProgress(user_id=1, exercise_id=1, date=monday + timedelta(days=7), duration=60),
+                ExerciseProgress(user_id=1, exercise_id=1, date=datetime(2024, 2, 3), weight=105, reps=3),
+            ])
+            await db.commit()
+            service = ProgressSeriesService(db)
+
+            raw = await service.series(1, 1)
+            assert [point["logs"] for point in raw] == [1] * 5
+            assert raw[0]["volume"] == 1500 and raw[0]["best_e1rm"] == pytest.approx(116.67)
+
+            days = await service.series(1, 1, bucket="day")
+            assert days[0]["date"] == datetime(2024, 1, 1)
+            assert (days[0]["max_weight"], days[0]["volume"], days[0]["logs"]) == (110, 1610, 2)
+
+            weeks = await service.series(1, 1, bucket="week")
+            assert [point["date"] for point in weeks] == [datetime(2024, 1, 1), datetime(2024, 1, 8), datetime(2024, 1, 29)]
+            assert weeks[0]["best_e1rm"] == 120 and weeks[1]["max_weight"] is None
+
+            months = await service.series(1, 1, bucket="month", start=datetime(2024, 1, 2))
+            assert [(point["date"].month, point["logs"]) for point in months] == [(1, 2), (2, 1)]
+
+            # Points without the charted metric are dropped before downsampling
+            thinned = await service.series(1, 1, points=3, metric="max_weight")
+            assert [point["max_weight"] for point in thinned] == [100, 90, 105]
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base, SessionLocal, engine, get_db
+from app.database.query_stats import capture_queries, route_query_stats
+from app.main import app
+from app.models.user import User
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+def auth_headers():
+    email = "queries@example.com"
+    client.post("/api/register", json={"email": email, "username": email, "password": "queriespass"})
+    response = client.post("/api/token", data={"username": email, "password": "queriespass"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_capture_queries():
+    db = SessionLocal()
+    with capture_queries() as stats:
+        db.execute(select(User).where(User.id == 1)).all()
+        db.execute(select(User)).all()
+    assert stats.count == 2
+    assert "FROM users" in stats.slowest_statement
+    # SELECTs report no rows affected, whatever the driver's rowcount says
+    assert stats.rows_affected == 0
+
+    db.add(User(email="affected@example.com", username="affected"))
+    db.flush()
+    users = db.scalar(select(func.count()).select_from(User))
+    with capture_queries() as stats:
+        db.execute(update(User).values(is_active=User.is_active))
+    db.rollback()
+    db.close()
+    assert stats.rows_affected == users
+
+def test_exercise_list_query_budget(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    monkeypatch.setattr(settings, "db_query_debug_headers", True)
+    headers = auth_headers()
+
+    response = client.get("/api/exercises/", headers=headers)
+    assert response.status_code == 200
+    # Eager-loaded relationships: one query for the list plus one per relationship
+    assert int(response.headers["x-db-query-count"]) <= 6
+    assert float(response.headers["x-db-time-ms"]) >= 0
+
+    routes = {(row["method"], row["route"]) for row in route_query_stats.table()}
+    assert ("GET", "/api/exercises/") in routes
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base, SessionLocal, engine, get_db
+from app.main import app
+from app.models.user import User
+from app.services.realtime import InMemoryBroker, RealtimeHub, TooManyConnections, realtime_hub
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+
+def test_hub_delivery_backpressure_and_limits(monkeypatch):
+    monkeypatch.setattr(settings, "realtime_queue_size", 3)
+    monkeypatch.setattr(settings, "realtime_max_connections", 2)
+
+    async def scenario():
+        broker = InMemoryBroker()
+        hub = RealtimeHub(broker)
+        fast = await hub.connect(1, ["author:1"])
+        slow = await hub.connect(2, ["author:1", "challenge:7"])
+        with pytest.raises(TooManyConnections):
+            await hub.connect(3, ["author:1"])
+
+        await hub.publish("author:1", {"type": "post.created", "post_id": 1})
+        assert fast.queue.get_nowait()["post_id"] == 1
+
+        # The slow client never reads: its backlog collapses into one resync
+        for post_id in range(2, 7):
+            await hub.publish("author:1", {"type": "post.created", "post_id": post_id})
+            if not fast.queue.empty():
+                fast.queue.get_nowait()
+        backlog = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+        assert backlog == [
+            {"type": "resync"},
+            {"type": "post.created", "post_id": 5},
+            {"type": "post.created", "post_id": 6},
+        ]
+        assert slow.overflows == 1 and fast.overflows == 0
+
+        stats = hub.stats()
+        assert stats["connections"] == 2 and stats["rejected"] == 1 and stats["overflows"] == 1
+
+        await hub.disconnect(fast)
+        await hub.disconnect(slow)
+        assert hub.stats()["connections"] == 0
+        assert broker._handlers == {}
+
+    asyncio.run(scenario())
+
+def register(email):
+    client.post("/api/register", json={"email": email, "username": email, "password": "livepass"})
+    response = client.post("/api/token", data={"username": email, "password": "livepass"})
+    return response.json()["access_token"]
+
+def test_websocket_receives_followed_posts_and_likes(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    author_token = register("live-author@example.com")
+    follower_token = register("live-follower@example.com")
+    author = {"Authorization": f"Bearer {author_token}"}
+    follower = {"Authorization": f"Bearer {follower_token}"}
+    db = SessionLocal()
+    author_id = db.query(User).filter_by(email="live-author@example.com").one().id
+    db.close()
+    assert client.post(f"/api/friends/request/{author_id}", headers=follower).status_code == 200
+
+    with client.websocket_connect(f"/api/live?token={follower_token}") as websocket:
+        assert websocket.receive_json()["type"] == "ready"
+        assert realtime_hub.stats()["connections"] == 1
+
+        post_id = client.post("/api/posts", headers=author, json={
+            "content": "live", "workout_id": None, "achievement_id": None
+        }).json()["id"]
+        assert websocket.receive_json() == {"type": "post.created", "post_id": post_id, "user_id": author_id}
+
+        client.post(f"/api/posts/{post_id}/like", headers=author)
+        event = websocket.receive_json()
+        assert event["type"] == "post.liked" and event["post_id"] == post_id and event["delta"] == 1
+
+    with pytest.raises(Exception):
+        with client.websocket_connect("/api/live?token=invalid") as websocket:
+            websocket.receive_json()
@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.database.upgrades import upgrade_schema
+
+def test_post_likes_are_deduped_and_made_unique():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        # post_likes as it was before the unique constraint
+        connection.execute(text(
+            "CREATE TABLE post_likes (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, created_at DATETIME)"
+        ))
+        connection.execute(text(
+            "INSERT INTO post_likes (id, post_id, user_id) VALUES (1, 1, 1), (2, 1, 1), (3, 1, 2), (4, 2, 1)"
+        ))
+
+    assert "unique_post_likes" in upgrade_schema(engine)
+    with engine.begin() as connection:
+        assert connection.execute(text("SELECT id FROM post_likes ORDER BY id")).scalars().all() == [1, 3, 4]
+        inserted = connection.execute(text(
+            "INSERT INTO post_likes (post_id, user_id) VALUES (1, 1) ON CONFLICT (post_id, user_id) DO NOTHING"
+        ))
+        assert inserted.rowcount == 0
+
+    # Already applied: nothing to do
+    assert "unique_post_likes" not in upgrade_schema(engine)
+    engine.dispose()
+
+def test_challenge_activities_get_idempotency_keys():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE challenge_activities (id INTEGER PRIMARY KEY, challenge_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, activity_date DATETIME, value INTEGER NOT NULL, notes VARCHAR(200))"
+        ))
+        connection.execute(text("INSERT INTO challenge_activities (challenge_id, user_id, value) VALUES (1, 1, 5), (1, 1, 6)"))
+
+    assert "challenge_activity_idempotency_keys" in upgrade_schema(engine)
+    insert = text(
+        "INSERT INTO challenge_activities (challenge_id, user_id, value, idempotency_key) VALUES (1, 1, 7, 'a') "
+        "ON CONFLICT (user_id, idempotency_key) DO NOTHING"
+    )
+    with engine.begin() as connection:
+        assert connection.execute(insert).rowcount == 1
+        assert connection.execute(insert).rowcount == 0
+    assert upgrade_schema(engine) == []
+    engine.dispose()
@@ -0,0 +1,174 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base, engine, get_db
+from app.database.query_stats import capture_queries, instrument_engine
+from app.main import app
+from app.models.exercise_library import (
+    Equipment, Exercise, ExerciseSubstitute, Muscle, exercise_equipment, exercise_muscles
+)
+from app.services import substitutes
+from app.services.substitutes import SubstituteService, rebuild_substitutes
+
+client = TestClient(app)
+
+# id: (category, primary muscles, secondary muscles, equipment)
+CATALOG = {
+    1: ("strength", [1], [2], [1]),  # barbell bench
+    2: ("strength", [1], [2], [2]),  # dumbbell bench
+    3: ("strength", [1], [], []),    # push-up
+    4: ("strength", [3], [], [1]),   # barbell squat
+    5: ("cardio", [4], [], []),      # run
+}
+
+def _seed(db):
+    db.add_all([Muscle(id=i, name=f"m{i}") for i in range(1, 5)] + [Equipment(id=i, name=f"e{i}") for i in (1, 2)])
+    db.add_all([
+        Exercise(id=exercise_id, name=f"x{exercise_id}", category=category, difficulty_level="beginner")
+        for exercise_id, (category, *_rest) in CATALOG.items()
+    ])
+
+def _link_rows(exercise_ids):
+    muscles, equipment = [], []
+    for exercise_id in exercise_ids:
+        _, primary, secondary, needs = CATALOG[exercise_id]
+        muscles += [{"exercise_id": exercise_id, "muscle_id": m, "is_primary": True} for m in primary]
+        muscles += [{"exercise_id": exercise_id, "muscle_id": m, "is_primary": False} for m in secondary]
+        equipment += [{"exercise_id": exercise_id, "equipment_id": e} for e in needs]
+    return muscles, equipment
+
+def test_nearest_paths_agree():
+    vectors = substitutes._vectors(
+        [(i, CATALOG[i][0], "beginner") for i in CATALOG],
+        [(row["exercise_id"], row["muscle_id"], row["is_primary"]) for row in _link_rows(CATALOG)[0]],
+        [(row["exercise_id"], row["equipment_id"]) for row in _link_rows(CATALOG)[1]],
+    )
+    python = substitutes._nearest_python(vectors, vectors, 3)
+    numpy = substitutes._nearest_numpy(vectors, 3)
+    assert [item[0] for item in python[1]] == [2, 3, 4]
+    for exercise_id in CATALOG:
+        assert [i for i, _ in python[exercise_id]] == [i for i, _ in numpy[exercise_id]]
+        for (_, a), (_, b) in zip(python[exercise_id], numpy[exercise_id]):
+            assert abs(a - b) < 1e-9
+    assert python[1][0][1] == substitutes.cosine(vectors[1], vectors[2])
+
+def test_rebuild_and_incremental_add_match():
+    sync_engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        _seed(db)
+        db.flush()
+        muscles, equipment = _link_rows(CATALOG)
+        db.execute(insert(exercise_muscles), muscles)
+        db.execute(insert(exercise_equipment), equipment)
+        db.commit()
+        rebuild_substitutes(db)
+        full = set(db.execute(select(
+            ExerciseSubstitute.exercise_id, ExerciseSubstitute.substitute_id, ExerciseSubstitute.score
+        )).all())
+    sync_engine.dispose()
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrument_engine(engine.sync_engine)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await check(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            _seed(db)
+            await db.flush()
+            muscles, equipment = _link_rows(CATALOG)
+            await db.execute(insert(exercise_muscles), muscles)
+            await db.execute(insert(exercise_equipment), equipment)
+            await db.commit()
+            service = SubstituteService(db)
+            # Built up one exercise at a time, the index ends where a rebuild does
+            for exercise_id in CATALOG:
+                await service.add_exercises([exercise_id])
+                await db.commit()
+            incremental = set((await db.execute(select(
+                ExerciseSubstitute.exercise_id, ExerciseSubstitute.substitute_id, ExerciseSubstitute.score
+            ))).all())
+            assert incremental == full
+
+            with capture_queries() as stats:
+                assert [i for i, _ in await service.substitutes(1)] == [2, 3, 4]
+            assert stats.count == 1
+            # With only a barbell: the dumbbell bench is out, the push-up needs nothing
+            assert [i for i, _ in await service.substitutes(1, {1})] == [3, 4]
+            assert [i for i, _ in await service.substitutes(1, set())] == [3]
+            assert await service.substitutes(5) == []
+
+    asyncio.run(scenario())
+
+def test_substitutes_endpoint_validation(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    Base.metadata.create_all(bind=engine)
+    assert client.get("/api/exercises/1/substitutes", params={"equipment": "1,x"}).status_code == 400
+    assert client.get("/api/exercises/987654/substitutes").status_code == 404
+
+def test_refresh_batches_exercises_created_together(monkeypatch):
+    batches = []
+
+    async def add_exercises(exercise_ids):
+        batches.append(list(exercise_ids))
+
+    monkeypatch.setattr(settings, "exercise_substitutes_refresh_delay_seconds", 0.05)
+    monkeypatch.setattr(substitutes, "_add_exercises", add_exercises)
+
+    async def scenario():
+        await asyncio.gather(
+            substitutes.refresh_substitutes([2]),
+            substitutes.refresh_substitutes([1]),
+            substitutes.refresh_substitutes([3])
+        )
+        await substitutes.refresh_substitutes([4])
+
+    asyncio.run(scenario())
+    assert batches == [[1, 2, 3], [4]]
+
+def test_equipment_filter_looks_past_stored_alternatives(monkeypatch):
+    monkeypatch.setattr(settings, "exercise_substitutes_per_exercise", 1)
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                _seed(db)
+                await db.flush()
+                muscles, equipment = _link_rows(CATALOG)
+                await db.execute(insert(exercise_muscles), muscles)
+                await db.execute(insert(exercise_equipment), equipment)
+                await db.commit()
+                await db.run_sync(rebuild_substitutes)
+                service = SubstituteService(db)
+
+                # Only the dumbbell bench is stored, and it needs a dumbbell
+                assert [i for i, _ in await service.substitutes(1)] == [2]
+                found = await service.substitutes(1, {1}, 2)
+                assert [i for i, _ in found] == [3, 4]
+                vectors = substitutes._vectors(
+                    [(1, "strength", "beginner"), (3, "strength", "beginner")],
+                    [(1, 1, True), (1, 2, False), (3, 1, True)],
+                    [(1, 1)]
+                )
+                assert found[0][1] == round(substitutes.cosine(vectors[1], vectors[3]), 6)
+                assert [i for i, _ in await service.substitutes(1, set())] == [3]
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
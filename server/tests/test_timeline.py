@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.database.database import Base
+from app.models.social import FeedPullAuthor, Post, TimelineEntry, friendship
+from app.models.user import User
+from app.services.hydration import SocialHydrator
+from app.services.timeline import TimelineService, rebuild_timelines
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def make_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+async def add_users(db, count):
+    db.add_all([User(email=f"u{i}@example.com", username=f"u{i}") for i in range(1, count + 1)])
+    await db.commit()
+
+async def feed_ids(db, user_id, **kwargs):
+    posts, _ = await TimelineService(db).get_feed(user_id, **kwargs)
+    return [post.id for post in posts]
+
+async def post(db, user_id, minutes=0):
+    db_post = Post(user_id=user_id, content="hello", created_at=datetime(2024, 1, 1) + timedelta(minutes=minutes))
+    db.add(db_post)
+    await db.flush()
+    await TimelineService(db).fan_out(db_post)
+    await db.commit()
+    return db_post.id
+
+def test_fan_out_backfill_and_pull(monkeypatch):
+    async def scenario():
+        engine, sessions = await make_db()
+        try:
+            await check(sessions)
+        finally:
+            await engine.dispose()
+
+    async def check(sessions):
+        async with sessions() as db:
+            await add_users(db, 4)
+            # 2 and 3 follow 1; 4 will follow 1 later
+            await db.execute(insert(friendship), [{"user_id": 2, "friend_id": 1}, {"user_id": 3, "friend_id": 1}])
+            first = await post(db, 1, minutes=0)
+
+            feed, has_more = await TimelineService(db).get_feed(2)
+            assert [p.id for p in feed] == [first] and not has_more
+            await SocialHydrator(db).posts(feed)
+            assert feed[0].user.username == "u1"
+
+            await db.execute(insert(friendship).values(user_id=4, friend_id=1))
+            await db.commit()
+            await TimelineService(db).backfill(4, 1)
+            await TimelineService(db).backfill(4, 1)  # idempotent
+            assert await feed_ids(db, 4) == [first]
+
+            # With 3 followers, user 1 is now over the limit: no fan-out,
+            # followers pull the post at read time instead
+            monkeypatch.setattr(settings, "feed_fanout_max_followers", 2)
+            second = await post(db, 1, minutes=5)
+            assert await db.get(FeedPullAuthor, 1) is not None
+            # A concurrent post registering the author again is a no-op
+            await TimelineService(db)._add_pull_author(1)
+            await db.commit()
+            fanned_out = await db.scalars(select(TimelineEntry.user_id).where(TimelineEntry.post_id == second))
+            assert fanned_out.all() == [1]
+            assert await feed_ids(db, 3) == [second, first]
+
+            # Keyset paging on (created_at, id), both directions
+            page, has_more = await TimelineService(db).get_feed(3, limit=1)
+            assert [p.id for p in page] == [second] and has_more
+            key = (page[0].created_at, page[0].id)
+            assert await feed_ids(db, 3, before=key) == [first]
+            assert await feed_ids(db, 3, after=(datetime(2024, 1, 1), first)) == [second]
+
+            def rebuild(sync_db: Session):
+                return rebuild_timelines(sync_db)
+            # Only the own-timeline entries: user 1 is still a pull author
+            assert await db.run_sync(rebuild) == 2
+            assert await feed_ids(db, 4) == [second, first]
+
+    run(scenario())
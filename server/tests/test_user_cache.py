@@ -0,0 +1,22 @@
+from app.utils.user_cache import UserCache, UserSnapshot
+
+def make_user(user_id: int, email: str) -> UserSnapshot:
+    return UserSnapshot(id=user_id, email=email, username=email, full_name=None, is_active=True)
+
+def test_hits_misses_and_invalidation():
+    cache = UserCache(maxsize=10, ttl_seconds=60)
+    assert cache.get("a@example.com") is None
+    cache.set("a@example.com", make_user(1, "a@example.com"))
+    assert cache.get("a@example.com").id == 1
+
+    cache.invalidate(1)
+    assert cache.get("a@example.com") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+def test_evicts_least_recently_used():
+    cache = UserCache(maxsize=2, ttl_seconds=60)
+    for user_id in (1, 2, 3):
+        cache.set(f"user{user_id}", make_user(user_id, f"user{user_id}"))
+    assert cache.get("user1") is None
+    assert cache.stats()["evictions"] == 1